@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RideshareConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "rideshare"
+
+    def ready(self):
+        from . import checks, metrics, signals  # noqa: F401
@@ -0,0 +1,227 @@
+"""Custom DRF authentication
+
+Token lookups are cached as `token key -> (user id, role, is_active)`, which
+is all `IsAdminUser` needs, so that most requests authenticate without a
+database query. The rest of the user is loaded lazily if a view reads it.
+
+Entries are invalidated whenever a token is deleted, or its user is saved or
+deleted, by the receivers of `rideshare.signals`. Writes that skip model
+signals, e.g. `update`, must call `invalidate_user_tokens` themselves. An
+invalidation only reaches the processes sharing the cache, see
+`rideshare.checks`.
+"""
+
+import hashlib
+from collections import OrderedDict
+from functools import cache
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import (
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from .caching import is_shared_cache
+from .models import User
+
+CACHED_USER_FIELDS = ("id", "role", "is_active")
+
+
+class LocalTokenCache:
+    """Bounded LRU cache of token entries, private to this process"""
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key: str) -> tuple | None:
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+
+            expires_at, entry = item
+            if expires_at <= monotonic():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: tuple):
+        with self.lock:
+            self.entries[key] = (monotonic() + self.ttl, entry)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    # Nothing to wait on in memory, these are for parity with SharedTokenCache
+
+    async def aget(self, key: str) -> tuple | None:
+        return self.get(key)
+
+    async def aset(self, key: str, entry: tuple):
+        self.set(key, entry)
+
+    async def adelete(self, key: str):
+        self.delete(key)
+
+
+class SharedTokenCache:
+    """Token entries kept in one of Django's caches, shared by every process.
+
+    Token keys are hashed so that they can't be read back from the cache.
+    """
+
+    key_prefix = "rideshare:token:"
+
+    def __init__(self, alias: str, ttl: int):
+        self.cache = caches[alias]
+        self.ttl = ttl
+
+    def make_key(self, key: str) -> str:
+        return self.key_prefix + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key: str) -> tuple | None:
+        entry = self.cache.get(self.make_key(key))
+        return tuple(entry) if entry is not None else None
+
+    def set(self, key: str, entry: tuple):
+        self.cache.set(self.make_key(key), entry, timeout=self.ttl)
+
+    def delete(self, key: str):
+        self.cache.delete(self.make_key(key))
+
+    async def aget(self, key: str) -> tuple | None:
+        entry = await self.cache.aget(self.make_key(key))
+        return tuple(entry) if entry is not None else None
+
+    async def aset(self, key: str, entry: tuple):
+        await self.cache.aset(self.make_key(key), entry, timeout=self.ttl)
+
+    async def adelete(self, key: str):
+        await self.cache.adelete(self.make_key(key))
+
+
+def is_shared_token_cache() -> bool:
+    """Whether invalidations reach every process"""
+    alias = settings.TOKEN_CACHE_BACKEND
+    return alias != "local" and is_shared_cache(alias)
+
+
+@cache
+def get_token_cache() -> LocalTokenCache | SharedTokenCache:
+    """The token cache configured by the `TOKEN_CACHE_*` settings"""
+    if settings.TOKEN_CACHE_BACKEND == "local":
+        return LocalTokenCache(
+            settings.TOKEN_CACHE_MAX_SIZE, settings.TOKEN_CACHE_TTL
+        )
+    return SharedTokenCache(
+        settings.TOKEN_CACHE_BACKEND, settings.TOKEN_CACHE_TTL
+    )
+
+
+def invalidate_token(key: str):
+    """Forget a token, e.g. as it gets deleted"""
+    get_token_cache().delete(key)
+
+
+def invalidate_user_tokens(user: User):
+    """Forget the tokens of a user, e.g. as their role or status changes"""
+    for key in Token.objects.filter(user=user).values_list("key", flat=True):
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches what permissions need of the user"""
+
+    def authenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        entry = token_cache.get(key)
+        if entry is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, self.make_entry(user))
+            return user, token
+
+        user = self.get_cached_user(entry)
+        return user, Token(key=key, user=user)
+
+    async def aauthenticate(self, request):
+        """Async version of `authenticate`, for the async views"""
+
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) == 1:
+            msg = _("Invalid token header. No credentials provided.")
+            raise AuthenticationFailed(msg)
+        elif len(auth) > 2:
+            msg = _(
+                "Invalid token header. Token string should not contain spaces."
+            )
+            raise AuthenticationFailed(msg)
+
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            msg = _(
+                "Invalid token header. "
+                "Token string should not contain invalid characters."
+            )
+            raise AuthenticationFailed(msg)
+
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        """Async version of `authenticate_credentials`"""
+
+        token_cache = get_token_cache()
+        entry = await token_cache.aget(key)
+        if entry is None:
+            try:
+                token = await Token.objects.select_related("user").aget(
+                    key=key
+                )
+            except Token.DoesNotExist:
+                raise AuthenticationFailed(_("Invalid token."))
+            if not token.user.is_active:
+                raise AuthenticationFailed(_("User inactive or deleted."))
+
+            await token_cache.aset(key, self.make_entry(token.user))
+            return token.user, token
+
+        user = self.get_cached_user(entry)
+        return user, Token(key=key, user=user)
+
+    def make_entry(self, user: User) -> tuple:
+        return tuple(getattr(user, name) for name in CACHED_USER_FIELDS)
+
+    def get_cached_user(self, entry: tuple) -> User:
+        """User built from a cache entry, if they're still active"""
+
+        cached_values = dict(zip(CACHED_USER_FIELDS, entry))
+        if not cached_values["is_active"]:
+            raise AuthenticationFailed(_("User inactive or deleted."))
+
+        # Leave every other field deferred, they're loaded on first access
+        field_names = [
+            field.attname
+            for field in User._meta.concrete_fields
+            if field.attname in cached_values
+        ]
+        return User.from_db(
+            None, field_names, [cached_values[name] for name in field_names]
+        )
@@ -0,0 +1,182 @@
+"""Response cache and conditional GET validators
+
+Cached pages are keyed on the normalized query parameters and on the current
+generation of every model a page is built from. Writes bump the generation of
+their model, see `rideshare.signals`, so that the pages they affect are never
+read again and simply expire. The TTL is only a safety net. ETags come from
+the same key, and Last-Modified from when those generations were bumped, so
+neither needs a database query.
+
+Generations and hit/miss counters live in the same Django cache as the pages,
+which has to be shared by every process, see `rideshare.checks`. A local
+memory cache would keep serving the pages of a process after another process
+wrote to their models.
+"""
+
+import hashlib
+import json
+import time
+from functools import cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+RIDES = "rides"
+RIDE_EVENTS = "ride_events"
+USERS = "users"
+
+# Query parameters holding coordinates, quantized before building a key
+COORDINATE_PARAMS = ("lat", "lon")
+
+
+class ResponseCache:
+    """Pages of response data, invalidated through generation counters"""
+
+    key_prefix = "rideshare:response:"
+    generation_prefix = "rideshare:generation:"
+    modified_prefix = "rideshare:modified:"
+    stats_prefix = "rideshare:response-stats:"
+
+    def __init__(self, alias: str, ttl: int, coordinate_precision: int):
+        self.cache = caches[alias]
+        self.ttl = ttl
+        self.coordinate_precision = coordinate_precision
+
+    def get_generations(
+        self, names: tuple[str, ...]
+    ) -> tuple[list[int], float]:
+        """Current generation of each model, and when the latest of them was
+        bumped
+        """
+
+        generation_keys = [self.generation_prefix + name for name in names]
+        modified_keys = [self.modified_prefix + name for name in names]
+        values = self.cache.get_many(generation_keys + modified_keys)
+        for generation_key, modified_key in zip(
+            generation_keys, modified_keys
+        ):
+            if generation_key not in values:
+                # Start from the clock rather than 0, so that an evicted
+                # counter can't come back to a generation already used.
+                self.cache.add(generation_key, time.time_ns(), timeout=None)
+                self.cache.add(modified_key, time.time(), timeout=None)
+                values[generation_key] = self.cache.get(generation_key)
+                values[modified_key] = self.cache.get(modified_key)
+
+        generations = [values[key] for key in generation_keys]
+        last_modified = max(values.get(key, 0) for key in modified_keys)
+        return generations, last_modified
+
+    def bump_generations(self, names: tuple[str, ...]):
+        now = time.time()
+        for name in names:
+            key = self.generation_prefix + name
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.add(key, time.time_ns(), timeout=None)
+            self.cache.set(self.modified_prefix + name, now, timeout=None)
+
+    def quantize(self, name: str, value: str) -> str:
+        if name not in COORDINATE_PARAMS:
+            return value
+        try:
+            return str(round(float(value), self.coordinate_precision))
+        except ValueError:
+            return value
+
+    def describe(
+        self,
+        request,
+        depends_on: tuple[str, ...],
+        period: int | None = None,
+    ) -> tuple[str, float]:
+        """Digest identifying the response to the request, for the current
+        generation of the models it depends on, and when it last changed.
+
+        Responses that also change as time passes give the `period` after
+        which they're considered changed anyway.
+        """
+
+        params = sorted(
+            (name, self.quantize(name, value))
+            for name, values in request.query_params.lists()
+            for value in values
+            if value
+        )
+        generations, last_modified = self.get_generations(depends_on)
+        parts = [request.get_host(), request.path, params, generations]
+        if period:
+            period_start = time.time() // period * period
+            parts.append(period_start)
+            last_modified = max(last_modified, period_start)
+
+        digest = hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+        return digest, last_modified
+
+    def get(self, digest: str):
+        data = self.cache.get(self.key_prefix + digest)
+        self.count("hits" if data is not None else "misses")
+        return data
+
+    def set(self, digest: str, data):
+        self.cache.set(self.key_prefix + digest, data, timeout=self.ttl)
+
+    def count(self, name: str):
+        key = self.stats_prefix + name
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            if not self.cache.add(key, 1, timeout=None):
+                self.cache.incr(key)
+
+    def get_stats(self) -> dict:
+        names = ("hits", "misses")
+        counts = self.cache.get_many([self.stats_prefix + n for n in names])
+        stats = {
+            name: counts.get(self.stats_prefix + name, 0) for name in names
+        }
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else None
+        return stats
+
+
+def is_shared_cache(alias: str) -> bool:
+    """Whether the Django cache is shared by every process, rather than kept
+    in the memory of each
+    """
+    return not isinstance(caches[alias], LocMemCache)
+
+
+@cache
+def get_response_cache() -> ResponseCache | None:
+    """The response cache configured by the `RESPONSE_CACHE_*` settings, or
+    None if it's turned off
+    """
+    if not settings.RESPONSE_CACHE_BACKEND:
+        return None
+    return ResponseCache(
+        settings.RESPONSE_CACHE_BACKEND,
+        settings.RESPONSE_CACHE_TTL,
+        settings.RESPONSE_CACHE_COORDINATE_PRECISION,
+    )
+
+
+def bump_generations(*names: str):
+    """Drop every cached page built from the given models.
+
+    Writes that skip model signals, e.g. `bulk_create` and `update`, must call
+    this themselves. Inside a transaction, the generations are bumped again
+    once it commits, as pages may have been cached from the old rows in the
+    meantime.
+    """
+
+    response_cache = get_response_cache()
+    if response_cache is None:
+        return
+
+    response_cache.bump_generations(names)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: response_cache.bump_generations(names))
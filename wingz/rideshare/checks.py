@@ -0,0 +1,66 @@
+"""System checks of the settings that only work across processes with a
+shared Django cache
+"""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+from rideshare.authentication import is_shared_token_cache
+from rideshare.caching import is_shared_cache
+from rideshare.routers import can_pin_to_primary
+
+
+@register(Tags.caches)
+def check_response_cache(app_configs, **kwargs):
+    alias = settings.RESPONSE_CACHE_BACKEND
+    if not alias or is_shared_cache(alias):
+        return []
+    return [
+        Warning(
+            f"RESPONSE_CACHE_BACKEND uses the local memory cache {alias!r}.",
+            hint=(
+                "Pages cached by one process are still served after another "
+                "process writes to their models. Set CACHE_BACKEND to a "
+                "cache shared by every process, or RESPONSE_CACHE_BACKEND to "
+                "an empty string."
+            ),
+            id="rideshare.W001",
+        )
+    ]
+
+
+@register(Tags.caches, Tags.database)
+def check_replica_pinning(app_configs, **kwargs):
+    if not settings.DATABASE_REPLICA_ALIASES or can_pin_to_primary():
+        return []
+    return [
+        Warning(
+            "DATABASE_REPLICAS are configured with a local memory cache.",
+            hint=(
+                "Users are pinned to the primary after a write in the default "
+                "cache, which other processes don't see, so every request "
+                "reads from the primary. Set CACHE_BACKEND to a cache shared "
+                "by every process."
+            ),
+            id="rideshare.W002",
+        )
+    ]
+
+
+@register(Tags.caches, Tags.security)
+def check_token_cache(app_configs, **kwargs):
+    # Development servers run a single process
+    if settings.DEBUG or is_shared_token_cache():
+        return []
+    return [
+        Warning(
+            "TOKEN_CACHE_BACKEND keeps the tokens of each process apart.",
+            hint=(
+                "Logging out, deactivating a user or changing their role "
+                "only reaches the process that handles it, the others keep "
+                "the token for up to TOKEN_CACHE_TTL. Set CACHE_BACKEND to a "
+                "cache shared by every process, or silence rideshare.W003 "
+                "when serving from a single process."
+            ),
+            id="rideshare.W003",
+        )
+    ]
@@ -0,0 +1,326 @@
+"""In-memory spatial index of the available drivers
+
+Each process keeps the last reported coordinates of every available driver in
+flat arrays, bucketed by a grid of cells much finer than the one of
+`rideshare.geo`. A nearest driver search walks the rings of cells around the
+given coordinates outwards, and stops as soon as no unvisited cell can hold a
+driver closer than the k-th one found, so it only measures the distance to the
+drivers around it, and never queries the database.
+
+Locations written through this process are applied right away. Those written
+by other processes are read back from `DriverLocation` by `sync`, at most once
+every DRIVER_INDEX_SYNC_SECONDS, taking in only the rows written since the
+last sync. Rows are found by when they were written rather than when their
+location was reported, as buffered pings are written some time after.
+"""
+
+import heapq
+import math
+import threading
+import time
+from array import array
+from datetime import UTC, datetime, timedelta
+from functools import cache
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .geo import EARTH_RADIUS_KM, KM_PER_DEGREE_LATITUDE, haversine_km
+from .models import DriverLocation
+
+# About 1.1 km along a meridian
+CELL_DEGREES = 0.01
+ROWS = round(180 / CELL_DEGREES)
+COLUMNS = round(360 / CELL_DEGREES)
+# No point of a cell is farther than this from its center
+CELL_HALF_DIAGONAL_KM = CELL_DEGREES * KM_PER_DEGREE_LATITUDE / math.sqrt(2)
+
+# Rows committed a little after a sync can carry a `received_at` older than
+# the newest one it read, so each sync reads this far back again
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class NearestDriver(NamedTuple):
+    driver_id: int
+    latitude: float
+    longitude: float
+    distance_km: float
+    updated_at: datetime
+
+
+def get_row(latitude: float) -> int:
+    return min(max(int((latitude + 90) // CELL_DEGREES), 0), ROWS - 1)
+
+
+def get_column(longitude: float) -> int:
+    return min(
+        max(int(((longitude + 180) % 360) // CELL_DEGREES), 0), COLUMNS - 1
+    )
+
+
+def get_ring_cells(row: int, column: int, radius: int):
+    """Cells whose row or column is `radius` cells away from the given ones,
+    and neither is farther. Columns wrap around the antimeridian.
+    """
+
+    if radius == 0:
+        yield row * COLUMNS + column
+        return
+
+    first_column, last_column = column - radius, column + radius
+    for ring_row in (row - radius, row + radius):
+        if 0 <= ring_row < ROWS:
+            for ring_column in range(first_column, last_column + 1):
+                yield ring_row * COLUMNS + ring_column % COLUMNS
+    for ring_row in range(max(row - radius + 1, 0), min(row + radius, ROWS)):
+        yield ring_row * COLUMNS + first_column % COLUMNS
+        yield ring_row * COLUMNS + last_column % COLUMNS
+
+
+def get_ring_bound_km(latitude: float, radius: int) -> float:
+    """Distance under which every driver is within `radius` rings of cells
+    around the given latitude.
+
+    A driver outside of them is at least `radius` cells away in latitude or in
+    longitude. The latter is the closer of the two, its distance being the one
+    to the meridian that many degrees of longitude away.
+    """
+
+    delta_longitude = math.radians(min(radius * CELL_DEGREES, 90))
+    return EARTH_RADIUS_KM * math.asin(
+        math.cos(math.radians(latitude)) * math.sin(delta_longitude)
+    )
+
+
+class DriverIndex:
+    """Coordinates of the available drivers, bucketed by grid cell"""
+
+    def __init__(self, ttl_seconds: int, sync_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.sync_seconds = sync_seconds
+
+        # One slot per driver, reused once the driver leaves the index
+        self.driver_ids = array("q")
+        self.latitudes = array("d")
+        self.longitudes = array("d")
+        self.timestamps = array("d")
+        self.slot_cells = array("q")
+        self.slots: dict[int, int] = {}
+        self.free_slots: list[int] = []
+        self.cells: dict[int, set[int]] = {}
+
+        self.lock = threading.Lock()
+        self.synced_at: float | None = None
+        self.synced_through: datetime | None = None
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def update(
+        self,
+        driver_id: int,
+        latitude: float,
+        longitude: float,
+        updated_at: datetime,
+        is_available: bool = True,
+    ):
+        """Move a driver, or drop them if they no longer take rides. Updates
+        older than the driver's current location are ignored.
+        """
+
+        timestamp = updated_at.timestamp()
+        with self.lock:
+            slot = self.slots.get(driver_id)
+            if slot is not None and self.timestamps[slot] > timestamp:
+                return
+            if not is_available:
+                self.remove_slot(driver_id)
+                return
+
+            cell = get_row(latitude) * COLUMNS + get_column(longitude)
+            if slot is None:
+                slot = self.add_slot(driver_id)
+            elif self.slot_cells[slot] != cell:
+                self.leave_cell(slot)
+            else:
+                cell = None
+
+            self.latitudes[slot] = latitude
+            self.longitudes[slot] = longitude
+            self.timestamps[slot] = timestamp
+            if cell is not None:
+                self.slot_cells[slot] = cell
+                self.cells.setdefault(cell, set()).add(slot)
+
+    def remove(self, driver_id: int):
+        with self.lock:
+            self.remove_slot(driver_id)
+
+    def add_slot(self, driver_id: int) -> int:
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.driver_ids[slot] = driver_id
+        else:
+            slot = len(self.driver_ids)
+            self.driver_ids.append(driver_id)
+            self.latitudes.append(0.0)
+            self.longitudes.append(0.0)
+            self.timestamps.append(0.0)
+            self.slot_cells.append(-1)
+        self.slots[driver_id] = slot
+        return slot
+
+    def remove_slot(self, driver_id: int):
+        slot = self.slots.pop(driver_id, None)
+        if slot is not None:
+            self.leave_cell(slot)
+            self.slot_cells[slot] = -1
+            self.free_slots.append(slot)
+
+    def leave_cell(self, slot: int):
+        cell = self.slot_cells[slot]
+        slots = self.cells[cell]
+        slots.discard(slot)
+        if not slots:
+            del self.cells[cell]
+
+    def nearest(
+        self, latitude: float, longitude: float, k: int
+    ) -> list[NearestDriver]:
+        """The `k` drivers closest to the given coordinates, closest first.
+
+        Drivers who haven't reported in the last DRIVER_LOCATION_TTL_SECONDS
+        are left out.
+        """
+
+        min_timestamp = time.time() - self.ttl_seconds
+        row, column = get_row(latitude), get_column(longitude)
+        # Max-heap of the closest drivers so far, as (-distance, slot)
+        closest: list[tuple[float, int]] = []
+
+        def visit(slots):
+            for slot in slots:
+                if self.timestamps[slot] < min_timestamp:
+                    continue
+                distance = haversine_km(
+                    latitude,
+                    longitude,
+                    self.latitudes[slot],
+                    self.longitudes[slot],
+                )
+                if len(closest) < k:
+                    heapq.heappush(closest, (-distance, slot))
+                elif distance < -closest[0][0]:
+                    heapq.heapreplace(closest, (-distance, slot))
+
+        with self.lock:
+            radius = 0
+            while True:
+                # Once the rings span more cells than there are drivers'
+                # cells, going through those cells, closest first, is cheaper
+                side = 2 * radius + 1
+                if side**2 > len(self.cells) or side >= COLUMNS:
+                    closest.clear()
+                    for bound, cell in sorted(
+                        (
+                            self.get_cell_bound_km(latitude, longitude, cell),
+                            cell,
+                        )
+                        for cell in self.cells
+                    ):
+                        if len(closest) == k and -closest[0][0] <= bound:
+                            break
+                        visit(self.cells[cell])
+                    break
+
+                for cell in get_ring_cells(row, column, radius):
+                    slots = self.cells.get(cell)
+                    if slots:
+                        visit(slots)
+                bound = get_ring_bound_km(latitude, radius)
+                if len(closest) == k and -closest[0][0] <= bound:
+                    break
+                radius += 1
+
+            results = [
+                NearestDriver(
+                    driver_id=self.driver_ids[slot],
+                    latitude=self.latitudes[slot],
+                    longitude=self.longitudes[slot],
+                    distance_km=-negative_distance,
+                    updated_at=datetime.fromtimestamp(
+                        self.timestamps[slot], tz=UTC
+                    ),
+                )
+                for negative_distance, slot in closest
+            ]
+        results.sort(key=lambda result: result.distance_km)
+        return results
+
+    def get_cell_bound_km(
+        self, latitude: float, longitude: float, cell: int
+    ) -> float:
+        """Distance under which no driver of the given cell can be"""
+        row, column = divmod(cell, COLUMNS)
+        return (
+            haversine_km(
+                latitude,
+                longitude,
+                (row + 0.5) * CELL_DEGREES - 90,
+                (column + 0.5) * CELL_DEGREES - 180,
+            )
+            - CELL_HALF_DIAGONAL_KM
+        )
+
+    def sync(self, force: bool = False):
+        """Take in the driver locations written since the last sync, by any
+        process. Unless forced, does nothing until DRIVER_INDEX_SYNC_SECONDS
+        have passed since the last one.
+        """
+
+        now = time.monotonic()
+        if (
+            not force
+            and self.synced_at is not None
+            and now - self.synced_at < self.sync_seconds
+        ):
+            return
+        self.synced_at = now
+
+        locations = DriverLocation.objects.order_by()
+        if self.synced_through is None:
+            # Drivers who left, or stopped reporting, can be skipped
+            locations = locations.filter(
+                is_available=True,
+                updated_at__gte=timezone.now()
+                - timedelta(seconds=self.ttl_seconds),
+            )
+        else:
+            locations = locations.filter(
+                received_at__gte=self.synced_through - SYNC_OVERLAP
+            )
+
+        synced_through = self.synced_through or timezone.now()
+        for *location, received_at in locations.values_list(
+            "driver_id",
+            "latitude",
+            "longitude",
+            "updated_at",
+            "is_available",
+            "received_at",
+        ).iterator():
+            self.update(*location)
+            synced_through = max(synced_through, received_at)
+        self.synced_through = synced_through
+
+
+@cache
+def get_driver_index() -> DriverIndex:
+    """The driver index of this process, configured by the `DRIVER_*`
+    settings
+    """
+    return DriverIndex(
+        settings.DRIVER_LOCATION_TTL_SECONDS,
+        settings.DRIVER_INDEX_SYNC_SECONDS,
+    )
@@ -17,3 +17,12 @@ class RideStatusChoices(models.TextChoices):
     PICKUP = ("pickup", "Driver to pick up rider.")
     ENROUTE = ("enroute", "Ride commenced to destination.")
     DROPOFF = ("dropoff", "Rider dropped off.")
+
+
+# The statuses each status may move on to, rides only ever move forward
+RIDE_STATUS_TRANSITIONS = {
+    RideStatusChoices.INIT: {RideStatusChoices.PICKUP},
+    RideStatusChoices.PICKUP: {RideStatusChoices.ENROUTE},
+    RideStatusChoices.ENROUTE: {RideStatusChoices.DROPOFF},
+    RideStatusChoices.DROPOFF: set(),
+}
@@ -0,0 +1,139 @@
+"""Spatial grid helpers used to index and prefilter coordinates.
+
+The globe is divided into a fixed grid of square cells (in degrees). Each cell
+is numbered row by row, starting from the south-west corner, so the cells of a
+single grid row form one contiguous range of integers. This lets a bounding box
+be expressed as a handful of `BETWEEN` lookups on an indexed integer column.
+"""
+
+import math
+
+EARTH_RADIUS_KM = 6371
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+KM_PER_DEGREE_LATITUDE = MAX_DISTANCE_KM / 180
+
+GRID_CELL_DEGREES = 0.1
+GRID_ROWS = round(180 / GRID_CELL_DEGREES)
+GRID_COLUMNS = round(360 / GRID_CELL_DEGREES)
+
+# Past this many ranges, a bounding box is widened to whole grid rows so that
+# the generated SQL stays small.
+MAX_CELL_RANGES = 64
+
+
+def get_grid_row(latitude: float) -> int:
+    """Row of the grid cell containing the given latitude"""
+    row = int((latitude + 90) // GRID_CELL_DEGREES)
+    return min(max(row, 0), GRID_ROWS - 1)
+
+
+def get_grid_column(longitude: float) -> int:
+    """Column of the grid cell containing the given longitude"""
+    column = int(((longitude + 180) % 360) // GRID_CELL_DEGREES)
+    return min(max(column, 0), GRID_COLUMNS - 1)
+
+
+def get_grid_cell(latitude: float, longitude: float) -> int:
+    """Number of the grid cell containing the given coordinates"""
+    return get_grid_row(latitude) * GRID_COLUMNS + get_grid_column(longitude)
+
+
+def haversine_km(
+    latitude_a: float,
+    longitude_a: float,
+    latitude_b: float,
+    longitude_b: float,
+) -> float:
+    """Great-circle distance between two coordinates, in kilometers"""
+    delta_latitude = math.radians(latitude_b - latitude_a)
+    delta_longitude = math.radians(longitude_b - longitude_a)
+    a = (
+        math.sin(delta_latitude / 2) ** 2
+        + math.cos(math.radians(latitude_a))
+        * math.cos(math.radians(latitude_b))
+        * math.sin(delta_longitude / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def get_bounding_box(
+    latitude: float, longitude: float, radius_km: float
+) -> tuple[float, float, list[tuple[float, float]]]:
+    """Smallest latitude/longitude box containing the circle of `radius_km`
+    around the given coordinates.
+
+    Returns the latitude bounds, and a list of longitude ranges. There are two
+    longitude ranges when the box crosses the antimeridian.
+    """
+
+    delta_latitude = radius_km / KM_PER_DEGREE_LATITUDE
+    min_latitude = latitude - delta_latitude
+    max_latitude = latitude + delta_latitude
+    full_longitude = [(-180.0, 180.0)]
+
+    if min_latitude <= -90 or max_latitude >= 90:
+        # The circle contains a pole, so every longitude is reachable
+        return (
+            max(min_latitude, -90.0),
+            min(max_latitude, 90.0),
+            full_longitude,
+        )
+
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    ratio = math.sin(angular_radius) / math.cos(math.radians(latitude))
+    if angular_radius >= math.pi / 2 or ratio >= 1:
+        return min_latitude, max_latitude, full_longitude
+
+    delta_longitude = math.degrees(math.asin(ratio))
+    min_longitude = longitude - delta_longitude
+    max_longitude = longitude + delta_longitude
+
+    if min_longitude < -180:
+        longitude_ranges = [
+            (min_longitude + 360, 180.0),
+            (-180.0, max_longitude),
+        ]
+    elif max_longitude > 180:
+        longitude_ranges = [
+            (min_longitude, 180.0),
+            (-180.0, max_longitude - 360),
+        ]
+    else:
+        longitude_ranges = [(min_longitude, max_longitude)]
+
+    return min_latitude, max_latitude, longitude_ranges
+
+
+def get_cell_ranges(
+    latitude: float, longitude: float, radius_km: float
+) -> list[tuple[int, int]]:
+    """Inclusive ranges of grid cells covering the circle of `radius_km`
+    around the given coordinates.
+    """
+
+    min_latitude, max_latitude, longitude_ranges = get_bounding_box(
+        latitude, longitude, radius_km
+    )
+    first_row = get_grid_row(min_latitude)
+    last_row = get_grid_row(max_latitude)
+    row_band = (first_row * GRID_COLUMNS, (last_row + 1) * GRID_COLUMNS - 1)
+
+    if longitude_ranges == [(-180.0, 180.0)]:
+        return [row_band]
+
+    # Range ends are not wrapped, so that 180 stays in the last column
+    column_ranges = [
+        (
+            max(int((low + 180) // GRID_CELL_DEGREES), 0),
+            min(int((high + 180) // GRID_CELL_DEGREES), GRID_COLUMNS - 1),
+        )
+        for low, high in longitude_ranges
+    ]
+    if (last_row - first_row + 1) * len(column_ranges) > MAX_CELL_RANGES:
+        return [row_band]
+
+    return [
+        (row * GRID_COLUMNS + first_column, row * GRID_COLUMNS + last_column)
+        for row in range(first_row, last_row + 1)
+        for first_column, last_column in column_ranges
+    ]
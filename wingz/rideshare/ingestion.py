@@ -0,0 +1,217 @@
+"""Buffered ingestion of driver location pings
+
+Driver apps report where they are every few seconds. Rather than writing each
+ping on its own, every process keeps the latest ping of each driver in memory,
+and a background thread writes them all with one bulk upsert every
+DRIVER_PING_FLUSH_SECONDS. Pings of a driver arriving in between replace each
+other, so the database takes at most one write per driver per flush.
+
+Once DRIVER_PING_BUFFER_SIZE drivers are waiting for a flush, batches bringing
+in other drivers are turned away until the next one, so that a slow database
+can't make the buffer grow without bounds. Pings still in the buffer when a
+process stops are lost, the next ping of each driver makes up for it.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Iterable
+from datetime import datetime
+from functools import cache
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .drivers import get_driver_index
+from .models import DriverLocation
+
+logger = logging.getLogger(__name__)
+
+# Rows of each INSERT of a flush, SQLite allows 32766 parameters per query
+FLUSH_BATCH_SIZE = 1000
+
+
+class Ping(NamedTuple):
+    driver_id: int
+    latitude: float
+    longitude: float
+    recorded_at: datetime
+    is_available: bool
+
+
+class PingBuffer:
+    """Latest ping of each driver, waiting to be written"""
+
+    def __init__(self, max_size: int, flush_seconds: float):
+        self.max_size = max_size
+        self.flush_seconds = flush_seconds
+        self.pending: dict[int, Ping] = {}
+        self.lock = threading.Lock()
+        # Held for the whole of a flush, so that flushes don't overlap
+        self.flush_lock = threading.Lock()
+        self.flusher: threading.Thread | None = None
+
+        self.received = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.flush_seconds_total = 0.0
+        self.last_flush_seconds: float | None = None
+        self.max_flush_seconds = 0.0
+
+    def add(self, pings: list[Ping]) -> bool:
+        """Buffer a batch of pings, or turn all of them away if there is no
+        room left for their drivers. Returns whether they were buffered.
+
+        A ping replaces the one of its driver already in the buffer, unless
+        it was recorded before it.
+        """
+
+        with self.lock:
+            new_drivers = {ping.driver_id for ping in pings}.difference(
+                self.pending
+            )
+            if len(self.pending) + len(new_drivers) > self.max_size:
+                self.rejected += len(pings)
+                return False
+
+            for ping in pings:
+                current = self.pending.get(ping.driver_id)
+                if current is not None:
+                    self.coalesced += 1
+                    if current.recorded_at > ping.recorded_at:
+                        continue
+                self.pending[ping.driver_id] = ping
+            self.received += len(pings)
+
+        if self.flush_seconds <= 0:
+            self.flush()
+        return True
+
+    def flush(self) -> int:
+        """Write the buffered pings with one bulk upsert, and apply them to
+        the driver index of the process. Returns how many were written.
+        """
+
+        with self.flush_lock:
+            with self.lock:
+                pings, self.pending = self.pending, {}
+            if not pings:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                write_pings(pings.values())
+            except Exception:
+                with self.lock:
+                    self.flush_errors += 1
+                    # Unless newer pings of their drivers came in meanwhile
+                    for driver_id, ping in pings.items():
+                        self.pending.setdefault(driver_id, ping)
+                raise
+            elapsed = time.perf_counter() - started
+
+            driver_index = get_driver_index()
+            for ping in pings.values():
+                driver_index.update(*ping)
+
+            with self.lock:
+                self.flushed += len(pings)
+                self.flushes += 1
+                self.flush_seconds_total += elapsed
+                self.last_flush_seconds = elapsed
+                self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            return len(pings)
+
+    def start_flusher(self):
+        """Flush every `flush_seconds` from a background thread"""
+        if self.flusher is None:
+            self.flusher = threading.Thread(
+                target=self.run_flusher, name="ping-flusher", daemon=True
+            )
+            self.flusher.start()
+
+    def run_flusher(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            # Like a request would, so that connections past their
+            # CONN_MAX_AGE or broken ones are replaced
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush the driver location pings")
+            finally:
+                close_old_connections()
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {
+                "queue_depth": len(self.pending),
+                "max_queue_depth": self.max_size,
+                "received": self.received,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "flushed": self.flushed,
+                "flushes": self.flushes,
+                "flush_errors": self.flush_errors,
+                "last_flush_ms": (
+                    round(self.last_flush_seconds * 1000, 3)
+                    if self.last_flush_seconds is not None
+                    else None
+                ),
+                "mean_flush_ms": (
+                    round(self.flush_seconds_total / self.flushes * 1000, 3)
+                    if self.flushes
+                    else None
+                ),
+                "max_flush_ms": round(self.max_flush_seconds * 1000, 3),
+            }
+
+
+def write_pings(pings: Iterable[Ping]):
+    """Upsert the location of each ping's driver. Pings are received when
+    written, however long before that they were recorded.
+    """
+    received_at = timezone.now()
+    DriverLocation.objects.bulk_create(
+        [
+            DriverLocation(
+                driver_id=ping.driver_id,
+                latitude=ping.latitude,
+                longitude=ping.longitude,
+                is_available=ping.is_available,
+                updated_at=ping.recorded_at,
+                received_at=received_at,
+            )
+            for ping in pings
+        ],
+        batch_size=FLUSH_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["driver"],
+        update_fields=[
+            "latitude",
+            "longitude",
+            "is_available",
+            "updated_at",
+            "received_at",
+        ],
+    )
+
+
+@cache
+def get_ping_buffer() -> PingBuffer:
+    """The ping buffer of this process, configured by the `DRIVER_PING_*`
+    settings. Its flusher starts along with it.
+    """
+
+    ping_buffer = PingBuffer(
+        settings.DRIVER_PING_BUFFER_SIZE, settings.DRIVER_PING_FLUSH_SECONDS
+    )
+    if ping_buffer.flush_seconds > 0:
+        ping_buffer.start_flusher()
+    return ping_buffer
@@ -0,0 +1,72 @@
+"""Move old ride events out of the hot RideEvent table"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rideshare.models import RideEvent, RideEventArchive
+
+# The ride list reads today's ride events from the hot table only
+MIN_HOT_HOURS = 24
+
+
+class Command(BaseCommand):
+    help = (
+        "Move ride events older than RIDE_EVENT_HOT_HOURS to the archive. "
+        "Meant to be run periodically, e.g. hourly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        hot_hours = settings.RIDE_EVENT_HOT_HOURS
+        if hot_hours < MIN_HOT_HOURS:
+            raise CommandError(
+                "RIDE_EVENT_HOT_HOURS must be at least "
+                f"{MIN_HOT_HOURS} hours"
+            )
+
+        cutoff = timezone.now() - timedelta(hours=hot_hours)
+        archived = 0
+        while moved := self.archive_batch(cutoff, options["batch_size"]):
+            archived += moved
+
+        self.stdout.write(f"Archived {archived} ride events")
+
+    def archive_batch(self, cutoff, batch_size: int) -> int:
+        """Move one batch of ride events created before the cutoff, returns
+        how many were moved.
+        """
+
+        with transaction.atomic():
+            ride_events = list(
+                RideEvent.objects.filter(created_at__lt=cutoff).order_by("id")[
+                    :batch_size
+                ]
+            )
+            if not ride_events:
+                return 0
+
+            RideEventArchive.objects.bulk_create(
+                [
+                    RideEventArchive(
+                        id=ride_event.id,
+                        created_at=ride_event.created_at,
+                        ride_id=ride_event.ride_id,
+                        description=ride_event.description,
+                    )
+                    for ride_event in ride_events
+                ],
+                # Left behind by an earlier run, and maybe edited since
+                update_conflicts=True,
+                unique_fields=["id"],
+                update_fields=["created_at", "ride", "description"],
+            )
+            RideEvent.objects.filter(
+                id__in=[ride_event.id for ride_event in ride_events]
+            ).delete()
+
+        return len(ride_events)
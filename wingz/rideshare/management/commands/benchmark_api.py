@@ -0,0 +1,355 @@
+"""Benchmark the API endpoints in process, reporting JSON results"""
+
+import itertools
+import json
+import statistics
+import subprocess
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rideshare.authentication import get_token_cache
+from rideshare.caching import get_response_cache
+from rideshare.enums import RideStatusChoices, UserRoleChoices
+from rideshare.models import Ride, RideEvent, User
+
+BENCHMARK_USERNAME = "benchmark-admin"
+BENCHMARK_PASSWORD = "benchmark"
+
+# Every combination of these ride list parameters is benchmarked
+RIDE_LIST_OPTIONS = {
+    "status": [None, RideStatusChoices.DROPOFF],
+    "email": [None, "<rider email>"],
+    "sort_by": ["pickup_time", "distance"],
+    "radius_km": [None, "10"],
+    "pagination": [None, "cursor"],
+}
+
+
+def percentile(latencies: list[float], percent: int) -> float:
+    if len(latencies) < 2:
+        return latencies[0]
+    return statistics.quantiles(latencies, n=100)[percent - 1]
+
+
+def get_git_commit() -> str | None:
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        return None
+    return completed.stdout.strip() or None
+
+
+class Command(BaseCommand):
+    help = (
+        "Request the ride list with every combination of filters and sorts, "
+        "the ride event and user lists, and the auth endpoints, through "
+        "Django's test client. Reports the throughput, latency percentiles "
+        "and queries per request of each as JSON, e.g. to compare commits. "
+        "Uses the data in the database, see generate_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=50,
+            help="Requests to each endpoint, after one to warm it up",
+        )
+        parser.add_argument("--page-size", type=int, default=10)
+        parser.add_argument(
+            "--lat",
+            type=float,
+            default=14.5995,
+            help="Latitude sent to the ride list, in Metro Manila by default",
+        )
+        parser.add_argument("--lon", type=float, default=120.9842)
+        parser.add_argument(
+            "--with-cache",
+            action="store_true",
+            help="Turn the response cache on, it's off by default",
+        )
+        parser.add_argument(
+            "--output", help="Write the JSON results to this file"
+        )
+        parser.add_argument(
+            "--compare",
+            help="Print how the results compare to those in this file",
+        )
+
+    def handle(self, *args, **options):
+        if not Ride.objects.exists():
+            raise CommandError(
+                "There are no rides to list, run generate_data first"
+            )
+
+        middleware = [
+            name
+            for name in settings.MIDDLEWARE
+            if not name.startswith("silk.")
+        ]
+        overrides = {
+            "ALLOWED_HOSTS": ["testserver"],
+            # Silk's own queries and overhead would dwarf the differences
+            "MIDDLEWARE": middleware,
+        }
+        if not options["with_cache"]:
+            overrides["RESPONSE_CACHE_BACKEND"] = ""
+        elif not settings.RESPONSE_CACHE_BACKEND:
+            # Every request is made by this process
+            overrides["RESPONSE_CACHE_BACKEND"] = "default"
+
+        with override_settings(**overrides):
+            get_response_cache.cache_clear()
+            get_token_cache.cache_clear()
+            try:
+                results = self.run_benchmarks(options)
+            finally:
+                get_response_cache.cache_clear()
+                get_token_cache.cache_clear()
+
+        report = {
+            "commit": get_git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "response_cache": options["with_cache"],
+            "requests": options["requests"],
+            "page_size": options["page_size"],
+            "data": {
+                "users": User.objects.count(),
+                "rides": Ride.objects.count(),
+                "ride_events": RideEvent.objects.count(),
+            },
+            "results": results,
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                self.compare(json.load(file), report)
+
+    def run_benchmarks(self, options: dict) -> list[dict]:
+        token = self.get_token()
+        client = Client(HTTP_AUTHORIZATION=f"Token {token}")
+        page_size = options["page_size"]
+        requests = options["requests"]
+
+        results = []
+        for params in self.get_ride_list_params(options):
+            results.append(
+                self.benchmark(
+                    client, "GET", "/rides/", params, requests=requests
+                )
+            )
+        results.append(
+            self.benchmark(
+                client,
+                "GET",
+                "/ride-events/",
+                {"page_size": page_size},
+                requests=requests,
+            )
+        )
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        results.append(
+            self.benchmark(
+                client,
+                "GET",
+                "/ride-events/",
+                {"page_size": page_size, "since": an_hour_ago.isoformat()},
+                requests=requests,
+                name="GET /ride-events/?since=<an hour ago>",
+            )
+        )
+        results.append(
+            self.benchmark(
+                client,
+                "GET",
+                "/users/",
+                {"page_size": page_size},
+                requests=requests,
+            )
+        )
+        # Logging out deletes the token used above, which is the one that
+        # logging in returns
+        results.append(self.benchmark_auth(requests))
+        return results
+
+    def get_ride_list_params(self, options: dict):
+        rider_email = (
+            User.objects.filter(
+                id=Ride.objects.order_by("-pickup_time")
+                .values("rider_id")[:1]
+                .get()["rider_id"]
+            )
+            .values_list("email", flat=True)
+            .get()
+        )
+        names = list(RIDE_LIST_OPTIONS)
+        for values in itertools.product(*RIDE_LIST_OPTIONS.values()):
+            params = {
+                "lat": options["lat"],
+                "lon": options["lon"],
+                "page_size": options["page_size"],
+            }
+            for name, value in zip(names, values):
+                if value is not None:
+                    params[name] = value
+            if "email" in params:
+                params["email"] = rider_email
+            yield params
+
+    def benchmark(
+        self,
+        client: Client,
+        method: str,
+        path: str,
+        params: dict,
+        requests: int,
+        name: str | None = None,
+    ) -> dict:
+        send = getattr(client, method.lower())
+        if name is None:
+            shown = {
+                key: value
+                for key, value in params.items()
+                if key not in ("lat", "lon", "page_size", "email")
+            }
+            if "email" in params:
+                shown["email"] = "<email>"
+            query = "&".join(f"{key}={value}" for key, value in shown.items())
+            name = f"{method} {path}" + (f"?{query}" if query else "")
+
+        send(path, params)  # Warm up
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as context:
+                request_started = time.perf_counter()
+                response = send(path, params)
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(len(context.captured_queries))
+            if response.status_code >= 400:
+                errors += 1
+        elapsed = time.perf_counter() - started
+
+        return self.summarize(name, latencies, queries, errors, elapsed)
+
+    def benchmark_auth(self, requests: int) -> dict:
+        """A login followed by a logout, per request"""
+
+        client = Client()
+        self.log_in_and_out(client)  # Warm up
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as context:
+                request_started = time.perf_counter()
+                response = self.log_in_and_out(client)
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(len(context.captured_queries))
+            if response.status_code >= 400:
+                errors += 1
+        elapsed = time.perf_counter() - started
+
+        return self.summarize(
+            "POST /auth/login/ + DELETE /auth/logout/",
+            latencies,
+            queries,
+            errors,
+            elapsed,
+        )
+
+    def log_in_and_out(self, client: Client):
+        response = client.post(
+            "/auth/login/",
+            {"username": BENCHMARK_USERNAME, "password": BENCHMARK_PASSWORD},
+            content_type="application/json",
+        )
+        if response.status_code != 200:
+            return response
+        token = response.json()["token"]
+        return client.delete(
+            "/auth/logout/", HTTP_AUTHORIZATION=f"Token {token}"
+        )
+
+    def summarize(
+        self,
+        name: str,
+        latencies: list[float],
+        queries: list[int],
+        errors: int,
+        elapsed: float,
+    ) -> dict:
+        return {
+            "name": name,
+            "requests": len(latencies),
+            "errors": errors,
+            "throughput_rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(statistics.median(latencies) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "queries_per_request": round(statistics.mean(queries), 2),
+        }
+
+    def get_token(self) -> str:
+        """Token of an admin user kept for benchmarks"""
+        user, created = User.objects.get_or_create(
+            username=BENCHMARK_USERNAME,
+            defaults={
+                "email": "benchmark-admin@example.com",
+                "role": UserRoleChoices.ADMIN,
+            },
+        )
+        if created or not user.check_password(BENCHMARK_PASSWORD):
+            user.set_password(BENCHMARK_PASSWORD)
+            user.save()
+        token, _ = Token.objects.get_or_create(user=user)
+        return token.key
+
+    def compare(self, baseline: dict, report: dict):
+        """Print the change of each result from the baseline's"""
+
+        baseline_results = {
+            result["name"]: result for result in baseline["results"]
+        }
+        self.stderr.write(
+            f"Compared to {baseline['commit'] or baseline['created_at']}"
+        )
+        self.stderr.write(
+            f"{'endpoint':<70}{'p50':>10}{'p99':>10}{'queries':>10}"
+        )
+        for result in report["results"]:
+            before = baseline_results.get(result["name"])
+            if before is None:
+                continue
+            queries = (
+                result["queries_per_request"] - before["queries_per_request"]
+            )
+            self.stderr.write(
+                f"{result['name'][:69]:<70}"
+                f"{self.change(before['p50_ms'], result['p50_ms']):>10}"
+                f"{self.change(before['p99_ms'], result['p99_ms']):>10}"
+                f"{queries:>+10.2f}"
+            )
+
+    def change(self, before: float, after: float) -> str:
+        if not before:
+            return "-"
+        return f"{(after - before) / before:+.0%}"
@@ -0,0 +1,221 @@
+"""Compare the ride list under WSGI and ASGI servers, with concurrent load"""
+
+import http.client
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+from rideshare.enums import UserRoleChoices
+from rideshare.models import Ride, User
+
+BENCHMARK_USERNAME = "benchmark-admin"
+
+
+def run_load(
+    port: int, path: str, token: str, concurrency: int, requests: int
+) -> tuple[list[float], int, float]:
+    """Send `requests` GETs from `concurrency` keep-alive connections.
+
+    Returns the latency of every successful request in seconds, the number of
+    failed ones, and the wall time taken.
+    """
+
+    headers = {"Authorization": f"Token {token}"}
+    latencies, failures = [], []
+    remaining = iter(range(requests))
+    lock = threading.Lock()
+
+    def worker():
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    break
+            started = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                (latencies if ok else failures).append(elapsed)
+        connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, len(failures), time.perf_counter() - started
+
+
+def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"Server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"Server didn't listen on port {port} in time")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput and latency of the ride list served by "
+        "gunicorn (WSGI), and by uvicorn (ASGI) through both the sync and "
+        "the async views. Uses the rides already in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path", default="/rides/?lat=10.31445&lon=123.9781"
+        )
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="Threads of each gunicorn worker",
+        )
+        parser.add_argument("--port", type=int, default=8765)
+
+    def handle(self, *args, **options):
+        for server in ("gunicorn", "uvicorn"):
+            if shutil.which(server) is None:
+                raise CommandError(
+                    f"{server} is needed, pip install -r requirements.txt"
+                )
+        if not Ride.objects.exists():
+            raise CommandError("There are no rides to list, add some first")
+
+        token = self.get_token()
+        path = options["path"]
+        port = options["port"]
+        workers = str(options["workers"])
+        deployments = [
+            (
+                "WSGI (gunicorn)",
+                [
+                    "gunicorn",
+                    "wingz.wsgi",
+                    "--workers",
+                    workers,
+                    "--threads",
+                    str(options["threads"]),
+                    "--bind",
+                    f"127.0.0.1:{port}",
+                ],
+                path,
+            ),
+            (
+                "ASGI (uvicorn), sync views",
+                [
+                    "uvicorn",
+                    "wingz.asgi:application",
+                    "--workers",
+                    workers,
+                    "--port",
+                    str(port),
+                    "--no-access-log",
+                ],
+                path,
+            ),
+            (
+                "ASGI (uvicorn), async views",
+                [
+                    "uvicorn",
+                    "wingz.asgi:application",
+                    "--workers",
+                    workers,
+                    "--port",
+                    str(port),
+                    "--no-access-log",
+                ],
+                f"/async{path}",
+            ),
+        ]
+
+        # Profiling and response caching would each dwarf the difference
+        env = {
+            **os.environ,
+            "SILK_ENABLED": "False",
+            "RESPONSE_CACHE_BACKEND": "",
+        }
+
+        self.stdout.write(
+            f"{options['requests']} requests to {path}, "
+            f"{options['concurrency']} at a time"
+        )
+        self.stdout.write(
+            f"{'deployment':<30}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+            f"{'errors':>8}"
+        )
+        for name, command, request_path in deployments:
+            process = subprocess.Popen(
+                command,
+                cwd=settings.BASE_DIR,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            try:
+                wait_for_port(port, process)
+                # Warm up connections, imports and caches
+                run_load(port, request_path, token, options["concurrency"], 50)
+                latencies, failures, elapsed = run_load(
+                    port,
+                    request_path,
+                    token,
+                    options["concurrency"],
+                    options["requests"],
+                )
+            finally:
+                process.terminate()
+                process.wait()
+
+            self.report(name, latencies, failures, elapsed)
+
+    def get_token(self) -> str:
+        """Token of an admin user kept for benchmarks"""
+        user, _ = User.objects.get_or_create(
+            username=BENCHMARK_USERNAME,
+            defaults={
+                "email": "benchmark-admin@example.com",
+                "role": UserRoleChoices.ADMIN,
+            },
+        )
+        token, _ = Token.objects.get_or_create(user=user)
+        return token.key
+
+    def report(
+        self, name: str, latencies: list[float], failures: int, elapsed: float
+    ):
+        if len(latencies) < 2:
+            self.stdout.write(f"{name:<30}{'-':>10}{'-':>10}{'-':>10}")
+            return
+
+        quantiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{name:<30}"
+            f"{len(latencies) / elapsed:>10.1f}"
+            f"{statistics.median(latencies) * 1000:>10.1f}"
+            f"{quantiles[98] * 1000:>10.1f}"
+            f"{failures:>8}"
+        )
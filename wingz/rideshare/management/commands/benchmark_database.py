@@ -0,0 +1,223 @@
+"""Compare the database profiles under a mixed read/write load"""
+
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from rideshare.enums import RideStatusChoices
+from rideshare.geo import get_grid_cell
+from rideshare.models import Ride, RideEvent, User
+
+PROFILES = ("development", "production")
+
+
+def seed(rides: int) -> list[int]:
+    """Riders, drivers and rides to read and write, returns the ride ids"""
+
+    users = User.objects.bulk_create(
+        User(username=f"user{index}", email=f"user{index}@example.com")
+        for index in range(100)
+    )
+    now = timezone.now()
+    new_rides = []
+    for index in range(rides):
+        latitude = 10 + random.random()
+        longitude = 123 + random.random()
+        new_rides.append(
+            Ride(
+                status=RideStatusChoices.INIT,
+                rider=random.choice(users),
+                driver=random.choice(users),
+                pickup_latitude=latitude,
+                pickup_longitude=longitude,
+                # bulk_create skips Ride.save(), which sets the grid cell
+                pickup_grid_cell=get_grid_cell(latitude, longitude),
+                dropoff_latitude=14.6091,
+                dropoff_longitude=121.0223,
+                pickup_time=now - timedelta(minutes=index),
+            )
+        )
+    return [ride.id for ride in Ride.objects.bulk_create(new_rides)]
+
+
+def read_ride_page():
+    """The count, page and ride event queries of a ride list page"""
+
+    ride_events = RideEvent.objects.filter(
+        created_at__gte=timezone.now() - timedelta(hours=24)
+    ).order_by("created_at")
+    rides = (
+        Ride.objects.select_related("rider", "driver")
+        .order_by("pickup_time", "id")
+        .prefetch_related(
+            Prefetch(
+                "ride_events",
+                queryset=ride_events,
+                to_attr="todays_ride_events",
+            )
+        )
+    )
+    offset = random.randrange(rides.count() - 10)
+    list(rides[offset : offset + 10])
+
+
+def write_ride_event(ride_ids: list[int]):
+    """A status change of a ride, recorded with its ride event"""
+    ride_id = random.choice(ride_ids)
+    with transaction.atomic():
+        Ride.objects.filter(id=ride_id).update(status=RideStatusChoices.PICKUP)
+        RideEvent.for_status_change(
+            ride_id, RideStatusChoices.PICKUP, timezone.now()
+        ).save()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of concurrent ride list reads and ride event "
+        "writes with each DATABASE_PROFILE, on a scratch SQLite database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=10)
+        parser.add_argument("--rides", type=int, default=5000)
+        parser.add_argument(
+            "--worker",
+            action="store_true",
+            help="Run the load in this process, with the current settings",
+        )
+
+    def handle(self, *args, **options):
+        if options["worker"]:
+            result = self.run_worker(options)
+            self.stdout.write(json.dumps(result))
+            return
+
+        self.stdout.write(
+            f"{options['readers']} readers and {options['writers']} writers "
+            f"for {options['seconds']:g}s on {options['rides']} rides"
+        )
+        self.stdout.write(
+            f"{'profile':<14}{'reads/s':>10}{'writes/s':>10}"
+            f"{'write p99 ms':>14}{'locked':>8}"
+        )
+        for profile in PROFILES:
+            self.report(profile, self.run_profile(profile, options))
+
+    def run_profile(self, profile: str, options: dict) -> dict:
+        """Run the load in a new process, with the given profile and a
+        scratch database
+        """
+
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                "DATABASE_PROFILE": profile,
+                "DATABASE_NAME": str(Path(directory) / "db.sqlite3"),
+                "RESPONSE_CACHE_BACKEND": "",
+                "SILK_ENABLED": "False",
+            }
+            command = [
+                sys.executable,
+                str(settings.BASE_DIR / "manage.py"),
+                "benchmark_database",
+                "--worker",
+                "--readers",
+                str(options["readers"]),
+                "--writers",
+                str(options["writers"]),
+                "--seconds",
+                str(options["seconds"]),
+                "--rides",
+                str(options["rides"]),
+            ]
+            completed = subprocess.run(
+                command, env=env, capture_output=True, text=True
+            )
+
+        if completed.returncode != 0:
+            raise CommandError(completed.stderr)
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def run_worker(self, options: dict) -> dict:
+        call_command("migrate", verbosity=0)
+        ride_ids = seed(options["rides"])
+        connection.close()
+
+        deadline = time.monotonic() + options["seconds"]
+        lock = threading.Lock()
+        reads, write_latencies, locked = [0], [], [0]
+
+        def reader():
+            while time.monotonic() < deadline:
+                try:
+                    read_ride_page()
+                except OperationalError:
+                    with lock:
+                        locked[0] += 1
+                    continue
+                with lock:
+                    reads[0] += 1
+            connection.close()
+
+        def writer():
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    write_ride_event(ride_ids)
+                except OperationalError:
+                    with lock:
+                        locked[0] += 1
+                    continue
+                with lock:
+                    write_latencies.append(time.perf_counter() - started)
+            connection.close()
+
+        threads = [
+            threading.Thread(target=reader) for _ in range(options["readers"])
+        ] + [
+            threading.Thread(target=writer) for _ in range(options["writers"])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        seconds = options["seconds"]
+        write_p99 = (
+            statistics.quantiles(write_latencies, n=100)[98]
+            if len(write_latencies) > 1
+            else None
+        )
+        return {
+            "reads_per_second": reads[0] / seconds,
+            "writes_per_second": len(write_latencies) / seconds,
+            "write_p99_ms": write_p99 * 1000 if write_p99 else None,
+            "locked": locked[0],
+        }
+
+    def report(self, profile: str, result: dict):
+        write_p99 = result["write_p99_ms"]
+        write_p99 = f"{write_p99:.1f}" if write_p99 is not None else "-"
+        self.stdout.write(
+            f"{profile:<14}"
+            f"{result['reads_per_second']:>10.1f}"
+            f"{result['writes_per_second']:>10.1f}"
+            f"{write_p99:>14}"
+            f"{result['locked']:>8}"
+        )
@@ -0,0 +1,114 @@
+"""Compare the distance engines of the ride list on the data in the database"""
+
+import json
+import math
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from rideshare.caching import get_response_cache
+from rideshare.models import Ride
+from rideshare.ranking import DISTANCE_ENGINES, np
+
+from . import benchmark_api
+
+# Ride list parameters sorting by distance, on top of the coordinates
+DISTANCE_QUERIES = [
+    {"sort_by": "distance"},
+    {"sort_by": "distance", "page": "5"},
+    {"sort_by": "distance", "page_size": "50"},
+    {"sort_by": "distance", "radius_km": "10"},
+    {"sort_by": "distance", "radius_km": "50", "status": "dropoff"},
+    {"sort_by": "distance", "pagination": "cursor"},
+    {"sort_by": "distance", "pagination": "cursor", "radius_km": "10"},
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Request the ride list sorted by distance with each "
+        "RIDE_DISTANCE_ENGINE, check that they list the same rides, and "
+        "report the latency of each as JSON. Uses the data in the database, "
+        "see generate_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20)
+        parser.add_argument("--lat", type=float, default=14.5995)
+        parser.add_argument("--lon", type=float, default=120.9842)
+
+    def handle(self, *args, **options):
+        if not Ride.objects.exists():
+            raise CommandError(
+                "There are no rides to list, run generate_data first"
+            )
+
+        api_benchmark = benchmark_api.Command(
+            stdout=self.stdout, stderr=self.stderr
+        )
+        client = Client(
+            HTTP_AUTHORIZATION=f"Token {api_benchmark.get_token()}"
+        )
+        middleware = [
+            name
+            for name in settings.MIDDLEWARE
+            if not name.startswith("silk.")
+        ]
+
+        results = []
+        for query in DISTANCE_QUERIES:
+            params = {"lat": options["lat"], "lon": options["lon"], **query}
+            name = "GET /rides/?" + "&".join(
+                f"{key}={value}" for key, value in query.items()
+            )
+            result = {"name": name}
+            pages = {}
+            for engine in DISTANCE_ENGINES:
+                with override_settings(
+                    ALLOWED_HOSTS=["testserver"],
+                    MIDDLEWARE=middleware,
+                    RESPONSE_CACHE_BACKEND="",
+                    RIDE_DISTANCE_ENGINE=engine,
+                ):
+                    get_response_cache.cache_clear()
+                    pages[engine] = client.get("/rides/", params).json()
+                    summary = api_benchmark.benchmark(
+                        client,
+                        "GET",
+                        "/rides/",
+                        params,
+                        requests=options["requests"],
+                        name=name,
+                    )
+                get_response_cache.cache_clear()
+                result[engine] = {
+                    key: summary[key]
+                    for key in ("p50_ms", "p99_ms", "queries_per_request")
+                }
+
+            self.check_same_rides(name, *pages.values())
+            result["speedup"] = round(
+                result["sql"]["p50_ms"] / result["vectorized"]["p50_ms"], 2
+            )
+            results.append(result)
+
+        report = {"numpy": np is not None, "results": results}
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def check_same_rides(self, name: str, sql_page: dict, ranked_page: dict):
+        sql_rides = [
+            (ride["id"], ride["distance"]) for ride in sql_page["results"]
+        ]
+        ranked_rides = [
+            (ride["id"], ride["distance"]) for ride in ranked_page["results"]
+        ]
+        same = len(sql_rides) == len(ranked_rides) and all(
+            sql_id == ranked_id
+            and math.isclose(sql_distance, ranked_distance, abs_tol=1e-6)
+            for (sql_id, sql_distance), (ranked_id, ranked_distance) in zip(
+                sql_rides, ranked_rides
+            )
+        )
+        if not same:
+            raise AssertionError(f"The distance engines disagree on {name}")
@@ -0,0 +1,100 @@
+"""Compare the JSON renderers on a page of the ride list"""
+
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rideshare.enums import RideStatusChoices
+from rideshare.models import Ride, RideEvent, User
+from rideshare.renderers import ORJSONRenderer
+from rideshare.serializers import RideComplexSerializer
+
+
+def build_ride_page(rides: int, events_per_ride: int) -> list[Ride]:
+    """Unsaved rides shaped like those of the ride list, with their riders,
+    drivers, distance and today's ride events.
+    """
+
+    now = timezone.now()
+    page = []
+    for index in range(rides):
+        rider = User(
+            id=2 * index + 1,
+            username=f"rider{index}",
+            first_name="Miss",
+            last_name="Daisy",
+            email=f"rider{index}@example.com",
+            phone_number="+639180876543",
+        )
+        driver = User(
+            id=2 * index + 2,
+            username=f"driver{index}",
+            first_name="Speed",
+            last_name="Racer",
+            email=f"driver{index}@example.com",
+            phone_number="+639189876543",
+        )
+        ride = Ride(
+            id=index + 1,
+            status=RideStatusChoices.ENROUTE,
+            rider=rider,
+            driver=driver,
+            pickup_latitude=10.352651 + index / 1000,
+            pickup_longitude=123.945389,
+            dropoff_latitude=14.6091,
+            dropoff_longitude=121.0223,
+            pickup_time=now - timedelta(minutes=index),
+        )
+        ride.distance = 11.059547836721924 + index
+        ride.todays_ride_events = [
+            RideEvent(
+                id=index * events_per_ride + event_index + 1,
+                ride=ride,
+                description=f"Status changed to {RideStatusChoices.PICKUP}",
+                created_at=now - timedelta(seconds=event_index),
+            )
+            for event_index in range(events_per_ride)
+        ]
+        page.append(ride)
+    return page
+
+
+class Command(BaseCommand):
+    help = "Compare the throughput of the JSON renderers on a ride list page"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rides", type=int, default=50)
+        parser.add_argument("--events-per-ride", type=int, default=3)
+        parser.add_argument("--iterations", type=int, default=500)
+
+    def handle(self, *args, **options):
+        rides = build_ride_page(options["rides"], options["events_per_ride"])
+        data = {
+            "count": len(rides),
+            "next": None,
+            "previous": None,
+            "results": RideComplexSerializer(rides, many=True).data,
+        }
+
+        results = {}
+        for renderer in (JSONRenderer(), ORJSONRenderer()):
+            iterations = options["iterations"]
+            start = time.perf_counter()
+            for _ in range(iterations):
+                content = renderer.render(data, "application/json")
+            elapsed = time.perf_counter() - start
+
+            results[type(renderer).__name__] = {
+                "bytes": len(content),
+                "seconds_per_page": elapsed / iterations,
+                "bytes_per_second": len(content) * iterations / elapsed,
+            }
+
+        baseline = results["JSONRenderer"]["bytes_per_second"]
+        results["speedup"] = (
+            results["ORJSONRenderer"]["bytes_per_second"] / baseline
+        )
+        self.stdout.write(json.dumps(results, indent=2))
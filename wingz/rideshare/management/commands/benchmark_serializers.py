@@ -0,0 +1,63 @@
+"""Compare the ride list serialization paths on a page of the ride list"""
+
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework import serializers
+from rideshare.serializers import RideComplexSerializer, RideEventSerializer
+
+from .benchmark_renderers import build_ride_page
+
+
+class PerItemRideSerializer(RideComplexSerializer):
+    """Serializes rides the stock DRF way: one serializer per ride event,
+    and `Serializer.to_representation` for every ride.
+    """
+
+    def get_todays_ride_events(self, obj):
+        if hasattr(obj, "todays_ride_events"):
+            return RideEventSerializer(obj.todays_ride_events, many=True).data
+        return []
+
+
+def serialize_per_item(rides) -> list:
+    return serializers.ListSerializer(
+        child=PerItemRideSerializer(), instance=rides
+    ).data
+
+
+def serialize_planned(rides) -> list:
+    return RideComplexSerializer(rides, many=True).data
+
+
+class Command(BaseCommand):
+    help = "Compare the serialization paths of the ride list on one page"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rides", type=int, default=50)
+        parser.add_argument("--events-per-ride", type=int, default=3)
+        parser.add_argument("--iterations", type=int, default=100)
+
+    def handle(self, *args, **options):
+        rides = build_ride_page(options["rides"], options["events_per_ride"])
+        if serialize_per_item(rides) != serialize_planned(rides):
+            raise AssertionError("Serialization paths disagree")
+
+        results = {}
+        for serialize in (serialize_per_item, serialize_planned):
+            iterations = options["iterations"]
+            start = time.perf_counter()
+            for _ in range(iterations):
+                serialize(rides)
+            elapsed = time.perf_counter() - start
+            results[serialize.__name__] = {
+                "seconds_per_page": elapsed / iterations,
+                "pages_per_second": iterations / elapsed,
+            }
+
+        results["speedup"] = (
+            results["serialize_per_item"]["seconds_per_page"]
+            / results["serialize_planned"]["seconds_per_page"]
+        )
+        self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,235 @@
+"""Generate synthetic users, rides and ride events at realistic volumes"""
+
+import math
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rideshare.caching import RIDE_EVENTS, RIDES, USERS, bump_generations
+from rideshare.enums import RideStatusChoices, UserRoleChoices
+from rideshare.geo import KM_PER_DEGREE_LATITUDE, get_grid_cell
+from rideshare.models import Ride, RideEvent, User
+from rideshare.summaries import get_recent_cutoff, refresh_event_summaries
+
+# Centers of the areas rides cluster in, with how many of the rides each one
+# gets relative to the others
+CLUSTERS = [
+    ("Metro Manila", 14.5995, 120.9842, 10),
+    ("Cebu City", 10.3157, 123.8854, 4),
+    ("Davao City", 7.1907, 125.4553, 3),
+    ("Baguio", 16.4023, 120.5960, 1),
+    ("Iloilo City", 10.7202, 122.5621, 1),
+    ("Cagayan de Oro", 8.4542, 124.6319, 1),
+]
+
+# Spread of pickups around their cluster's center, and of trips, in km
+PICKUP_SPREAD_KM = 4.0
+TRIP_DISTANCE_KM = 6.0
+
+# Pickups are scheduled up to this far ahead
+UPCOMING_MINUTES = 30
+
+# Shared by every generated user, hashing one password per user would take
+# longer than generating everything else
+PASSWORD = "synthetic"
+
+
+def offset_coordinates(
+    latitude: float, longitude: float, spread_km: float, rng: random.Random
+) -> tuple[float, float]:
+    """Coordinates normally distributed around the given ones"""
+    north_km = rng.gauss(0, spread_km)
+    east_km = rng.gauss(0, spread_km)
+    km_per_degree_longitude = KM_PER_DEGREE_LATITUDE * math.cos(
+        math.radians(latitude)
+    )
+    return (
+        latitude + north_km / KM_PER_DEGREE_LATITUDE,
+        longitude + east_km / km_per_degree_longitude,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate users, rides clustered around a few cities, and the status "
+        "change ride events of each ride. Old ride events are archived "
+        "afterwards, as archive_ride_events would."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--rides", type=int, default=100_000)
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=90,
+            help="Spread the pickup times over this many past days",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Seed of the generator"
+        )
+        parser.add_argument(
+            "--prefix",
+            default="synthetic",
+            help="Prefix of the generated usernames",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 2 and options["rides"]:
+            raise CommandError("At least 2 users are needed to make rides")
+
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+
+        user_ids = self.generate_users(
+            options["users"], options["prefix"], batch_size
+        )
+        self.stdout.write(f"Generated {len(user_ids)} users")
+
+        now = timezone.now()
+        rides = events = 0
+        while rides < options["rides"]:
+            count = min(batch_size, options["rides"] - rides)
+            events += self.generate_rides(
+                count, user_ids, now, options["days"], rng
+            )
+            rides += count
+            self.stdout.write(f"Generated {rides} rides, {events} ride events")
+
+        bump_generations(RIDES, RIDE_EVENTS, USERS)
+        call_command("archive_ride_events", stdout=self.stdout)
+
+    def generate_users(
+        self, count: int, prefix: str, batch_size: int
+    ) -> list[int]:
+        """Users with unique usernames and emails, one in a hundred of them
+        an admin. Returns their ids.
+        """
+
+        password = make_password(PASSWORD)
+        offset = User.objects.filter(username__startswith=prefix).count()
+        users = [
+            User(
+                username=f"{prefix}{index}",
+                email=f"{prefix}{index}@example.com",
+                first_name=f"First{index}",
+                last_name=f"Last{index}",
+                password=password,
+                role=(
+                    UserRoleChoices.ADMIN
+                    if index % 100 == 0
+                    else UserRoleChoices.REGULAR
+                ),
+            )
+            for index in range(offset, offset + count)
+        ]
+        users = User.objects.bulk_create(users, batch_size=batch_size)
+        return [user.id for user in users]
+
+    def generate_rides(
+        self,
+        count: int,
+        user_ids: list[int],
+        now,
+        days: int,
+        rng: random.Random,
+    ) -> int:
+        """One batch of rides and their ride events, returns how many ride
+        events were made
+        """
+
+        clusters = rng.choices(
+            CLUSTERS, weights=[cluster[3] for cluster in CLUSTERS], k=count
+        )
+        rides, timelines = [], []
+        for _, center_latitude, center_longitude, _ in clusters:
+            pickup = offset_coordinates(
+                center_latitude, center_longitude, PICKUP_SPREAD_KM, rng
+            )
+            dropoff = offset_coordinates(*pickup, TRIP_DISTANCE_KM, rng)
+            rider_id, driver_id = rng.sample(user_ids, 2)
+            # More rides in recent days, as a growing service would have,
+            # and a few still to be picked up
+            pickup_time = (
+                now
+                + timedelta(minutes=UPCOMING_MINUTES)
+                - timedelta(days=days * (1 - math.sqrt(rng.random())))
+            )
+            timeline = self.get_timeline(pickup_time, now, rng)
+            last_status, last_moved_at = timeline[-1]
+            has_events = len(timeline) > 1
+
+            rides.append(
+                Ride(
+                    status=last_status,
+                    rider_id=rider_id,
+                    driver_id=driver_id,
+                    pickup_latitude=pickup[0],
+                    pickup_longitude=pickup[1],
+                    # bulk_create skips Ride.save(), which sets the grid cell
+                    pickup_grid_cell=get_grid_cell(*pickup),
+                    dropoff_latitude=dropoff[0],
+                    dropoff_longitude=dropoff[1],
+                    pickup_time=pickup_time,
+                    last_event_at=last_moved_at if has_events else None,
+                    last_event_description=(
+                        RideEvent.STATUS_CHANGE_DESCRIPTION.format(
+                            status=last_status
+                        )
+                        if has_events
+                        else ""
+                    ),
+                )
+            )
+            timelines.append(timeline)
+
+        with transaction.atomic():
+            rides = Ride.objects.bulk_create(rides)
+            ride_events = [
+                RideEvent.for_status_change(ride.id, ride_status, created_at)
+                for ride, timeline in zip(rides, timelines)
+                for ride_status, created_at in timeline[1:]
+            ]
+            RideEvent.objects.bulk_create(ride_events, batch_size=5000)
+            # The last events were set above, only the recent events need
+            # the ids of the ride events
+            recent_cutoff = get_recent_cutoff()
+            refresh_event_summaries(
+                ride.id
+                for ride in rides
+                if ride.last_event_at is not None
+                and ride.last_event_at >= recent_cutoff
+            )
+
+        return len(ride_events)
+
+    def get_timeline(
+        self, pickup_time, now, rng: random.Random
+    ) -> list[tuple[str, object]]:
+        """The statuses a ride went through by now, each with when it moved
+        there, starting with its request
+        """
+
+        # Drivers arrive a few minutes after the pickup time, trips last 25
+        # minutes on average, a few of them well over an hour
+        requested_at = pickup_time - timedelta(minutes=rng.uniform(2, 15))
+        enroute_at = pickup_time + timedelta(minutes=rng.expovariate(1 / 4))
+        dropoff_at = enroute_at + timedelta(
+            minutes=rng.lognormvariate(math.log(20), 0.6)
+        )
+
+        timeline = [(RideStatusChoices.INIT, requested_at)]
+        for ride_status, moved_at in (
+            (RideStatusChoices.PICKUP, pickup_time),
+            (RideStatusChoices.ENROUTE, enroute_at),
+            (RideStatusChoices.DROPOFF, dropoff_at),
+        ):
+            if moved_at > now:
+                break
+            timeline.append((ride_status, moved_at))
+        return timeline
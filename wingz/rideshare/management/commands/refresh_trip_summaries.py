@@ -0,0 +1,166 @@
+"""Roll the pickup and dropoff ride events up into trip summaries"""
+
+from datetime import UTC
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rideshare.enums import RideStatusChoices
+from rideshare.models import (
+    Ride,
+    RideEvent,
+    RideEventArchive,
+    RideTripSummary,
+    RollupWatermark,
+)
+
+PICKUP_DESCRIPTION = RideEvent.STATUS_CHANGE_DESCRIPTION.format(
+    status=RideStatusChoices.PICKUP
+)
+DROPOFF_DESCRIPTION = RideEvent.STATUS_CHANGE_DESCRIPTION.format(
+    status=RideStatusChoices.DROPOFF
+)
+
+# Ids are handed out before their rows commit, so with concurrent writers a
+# row can commit after the watermark moved past its id. Each batch reads this
+# many ids back again, merging the summaries of a ride event twice is harmless
+WATERMARK_OVERLAP = 1000
+
+
+def latest(*values):
+    """The latest of the given times, ignoring the missing ones"""
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+class Command(BaseCommand):
+    help = (
+        "Take the pickup and dropoff ride events added since the last run, "
+        "hot and archived, into the trip summaries. Meant to be run "
+        "periodically, e.g. every few minutes from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help=(
+                "Start over from the first ride event, e.g. after ride events "
+                "were edited or deleted"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            with transaction.atomic():
+                RideTripSummary.objects.all().delete()
+                RollupWatermark.objects.filter(
+                    name=RideTripSummary.WATERMARK_NAME
+                ).delete()
+
+        taken = 0
+        while events := self.refresh_batch(options["batch_size"]):
+            taken += events
+
+        self.stdout.write(f"Took {taken} ride events into trip summaries")
+
+    def refresh_batch(self, batch_size: int) -> int:
+        """Take in one batch of ride events past the watermark, along with
+        those committed late behind it, returns how many were past it
+        """
+
+        with transaction.atomic():
+            watermarks = RollupWatermark.objects.select_for_update()
+            watermark, _ = watermarks.get_or_create(
+                name=RideTripSummary.WATERMARK_NAME
+            )
+            ride_events = self.get_ride_events(
+                max(watermark.last_event_id - WATERMARK_OVERLAP, 0),
+                batch_size + WATERMARK_OVERLAP,
+            )
+            if not ride_events:
+                return 0
+
+            self.save_summaries(ride_events)
+            taken = sum(
+                ride_event[0] > watermark.last_event_id
+                for ride_event in ride_events
+            )
+            if taken:
+                watermark.last_event_id = ride_events[-1][0]
+                watermark.save(update_fields=["last_event_id"])
+
+        return taken
+
+    def get_ride_events(self, after_id: int, batch_size: int) -> list[tuple]:
+        """Pickup and dropoff ride events past the given id, from both the
+        hot and the archive tables, read in one statement so that none is
+        missed while being archived
+        """
+
+        fields = ("id", "ride_id", "created_at", "description")
+        descriptions = (PICKUP_DESCRIPTION, DROPOFF_DESCRIPTION)
+        hot = RideEvent.objects.filter(
+            id__gt=after_id, description__in=descriptions
+        ).values_list(*fields)
+        archived = RideEventArchive.objects.filter(
+            id__gt=after_id, description__in=descriptions
+        ).values_list(*fields)
+        return list(hot.union(archived, all=True).order_by("id")[:batch_size])
+
+    def save_summaries(self, ride_events: list[tuple]):
+        """Merge the ride events into the summaries of their rides"""
+
+        times = {}
+        for _, ride_id, created_at, description in ride_events:
+            pickup_time, dropoff_time = times.get(ride_id, (None, None))
+            if description == PICKUP_DESCRIPTION:
+                pickup_time = latest(pickup_time, created_at)
+            else:
+                dropoff_time = latest(dropoff_time, created_at)
+            times[ride_id] = (pickup_time, dropoff_time)
+
+        drivers = dict(
+            Ride.objects.filter(id__in=times).values_list("id", "driver_id")
+        )
+        summaries = RideTripSummary.objects.in_bulk(list(times))
+
+        new_summaries = []
+        for ride_id, (pickup_time, dropoff_time) in times.items():
+            if ride_id not in drivers:
+                # The ride was deleted since
+                continue
+
+            summary = summaries.get(ride_id)
+            if summary is not None:
+                pickup_time = latest(pickup_time, summary.pickup_time)
+                dropoff_time = latest(dropoff_time, summary.dropoff_time)
+
+            both = pickup_time is not None and dropoff_time is not None
+            new_summaries.append(
+                RideTripSummary(
+                    ride_id=ride_id,
+                    driver_id=drivers[ride_id],
+                    pickup_time=pickup_time,
+                    dropoff_time=dropoff_time,
+                    duration=dropoff_time - pickup_time if both else None,
+                    month=(
+                        dropoff_time.astimezone(UTC).strftime("%Y-%m")
+                        if dropoff_time is not None
+                        else ""
+                    ),
+                )
+            )
+
+        RideTripSummary.objects.bulk_create(
+            new_summaries,
+            update_conflicts=True,
+            unique_fields=["ride"],
+            update_fields=[
+                "driver",
+                "pickup_time",
+                "dropoff_time",
+                "duration",
+                "month",
+            ],
+        )
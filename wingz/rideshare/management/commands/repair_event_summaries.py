@@ -0,0 +1,41 @@
+"""Recompute the ride event fields denormalized onto every ride"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rideshare.caching import RIDE_EVENTS, RIDES, bump_generations
+from rideshare.models import Ride
+from rideshare.summaries import refresh_event_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the last event and recent events of every ride from its "
+        "ride events, fixing rides that drifted after ride events were "
+        "written outside the API. Also run it once after migrating."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        rides = Ride.objects.order_by("id").values_list(
+            "id", *Ride.EVENT_SUMMARY_FIELDS
+        )
+
+        checked = changed = 0
+        last_id = 0
+        while batch := list(rides.filter(id__gt=last_id)[:batch_size]):
+            ride_ids = [row[0] for row in batch]
+            with transaction.atomic():
+                refresh_event_summaries(ride_ids)
+                refreshed = rides.filter(id__in=ride_ids)
+            changed += sum(
+                before != after for before, after in zip(batch, refreshed)
+            )
+            checked += len(batch)
+            last_id = ride_ids[-1]
+
+        if changed:
+            bump_generations(RIDES, RIDE_EVENTS)
+        self.stdout.write(f"Repaired {changed} of {checked} rides")
@@ -0,0 +1,36 @@
+"""Copy the primary SQLite database over its local read replicas"""
+
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the SQLite database of 'default' over the files of the read "
+        "replicas. Stands in for replication when trying replicas locally, "
+        "the replicas lag behind until this is run again."
+    )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICA_ALIASES:
+            raise CommandError("No replicas are set in DATABASE_REPLICAS")
+
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != "sqlite":
+            raise CommandError(
+                "Only SQLite replicas can be synced, use the replication of "
+                "the database server otherwise"
+            )
+
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICA_ALIASES:
+            connections[alias].close()
+            replica = sqlite3.connect(settings.DATABASES[alias]["NAME"])
+            try:
+                primary.connection.backup(replica)
+            finally:
+                replica.close()
+            self.stdout.write(f"Synced {alias}")
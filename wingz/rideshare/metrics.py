@@ -0,0 +1,309 @@
+"""In-memory request metrics, exported in the Prometheus text format
+
+`MetricsMiddleware` counts every request and its latency by endpoint, the
+route its URL resolved to rather than the URL itself, so that ride ids don't
+make a new series each. A sample of METRICS_SAMPLE_RATE of the requests is
+broken down further into the time spent in SQL, and in serializers rendering
+`.data`.
+
+Every process keeps its own metrics, and Prometheus adds them up across the
+processes it scrapes. Latencies are measured until the view returns, which
+leaves out the streaming of a streamed response.
+"""
+
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Seconds spent in each phase of the sampled request being handled, or None
+# when it isn't sampled
+current_timings: ContextVar[dict | None] = ContextVar(
+    "current_timings", default=None
+)
+
+
+@contextmanager
+def timed(phase: str):
+    """Add the time spent in the block to the phase of the sampled request.
+    Blocks nested in one of the same phase aren't counted twice.
+    """
+
+    timings = current_timings.get()
+    if timings is None or phase in timings["active"]:
+        yield
+        return
+
+    timings["active"].add(phase)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = timings.get(phase, 0.0) + (
+            time.perf_counter() - started
+        )
+        timings["active"].discard(phase)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper counting the queries of sampled requests"""
+
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings["sql"] = timings.get("sql", 0.0) + (
+            time.perf_counter() - started
+        )
+        timings["queries"] = timings.get("queries", 0) + 1
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """Wrap every query of every connection, whichever thread opens it, so
+    that the queries async views run through `sync_to_async` count too.
+    The wrapper stays in place when the connection is reopened.
+    """
+
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class EndpointStats:
+    """Totals of the requests to one endpoint"""
+
+    def __init__(self):
+        self.statuses: dict[int, int] = defaultdict(int)
+        # Requests per latency bucket, the last one is past every bound
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.seconds = 0.0
+        self.sampled = 0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serializer_seconds = 0.0
+
+    def copy(self) -> "EndpointStats":
+        stats = EndpointStats()
+        stats.__dict__.update(self.__dict__)
+        stats.statuses = dict(self.statuses)
+        stats.buckets = list(self.buckets)
+        return stats
+
+
+class RequestMetrics:
+    """Totals of the requests this process handled, by endpoint"""
+
+    def __init__(self, sample_rate: float):
+        self.sample_rate = sample_rate
+        self.endpoints: dict[tuple[str, str], EndpointStats] = defaultdict(
+            EndpointStats
+        )
+        self.lock = threading.Lock()
+
+    def should_sample(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(
+        self,
+        method: str,
+        endpoint: str,
+        status: int,
+        seconds: float,
+        timings: dict | None,
+    ):
+        with self.lock:
+            stats = self.endpoints[method, endpoint]
+            stats.statuses[status] += 1
+            stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            stats.seconds += seconds
+            if timings is not None:
+                stats.sampled += 1
+                stats.queries += timings.get("queries", 0)
+                stats.sql_seconds += timings.get("sql", 0.0)
+                stats.serializer_seconds += timings.get("serialize", 0.0)
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format"""
+
+        with self.lock:
+            endpoints = [
+                (method, endpoint, stats.copy())
+                for (method, endpoint), stats in sorted(self.endpoints.items())
+            ]
+
+        lines = [
+            "# HELP wingz_http_requests_total Requests handled.",
+            "# TYPE wingz_http_requests_total counter",
+        ]
+        for method, endpoint, stats in endpoints:
+            labels = format_labels(method=method, endpoint=endpoint)
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(
+                    f'wingz_http_requests_total{{{labels},status="{status}"}}'
+                    f" {count}"
+                )
+
+        lines += [
+            "# HELP wingz_http_request_duration_seconds Time until the view"
+            " returned.",
+            "# TYPE wingz_http_request_duration_seconds histogram",
+        ]
+        for method, endpoint, stats in endpoints:
+            labels = format_labels(method=method, endpoint=endpoint)
+            cumulative = 0
+            bounds = [*map(repr, LATENCY_BUCKETS), "+Inf"]
+            for bound, count in zip(bounds, stats.buckets):
+                cumulative += count
+                lines.append(
+                    "wingz_http_request_duration_seconds_bucket"
+                    f'{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines += [
+                f"wingz_http_request_duration_seconds_sum{{{labels}}}"
+                f" {stats.seconds!r}",
+                f"wingz_http_request_duration_seconds_count{{{labels}}}"
+                f" {cumulative}",
+            ]
+
+        for name, kind, description, attribute in (
+            (
+                "wingz_sampled_requests_total",
+                "counter",
+                "Requests broken down into SQL and serializer time.",
+                "sampled",
+            ),
+            (
+                "wingz_db_queries_total",
+                "counter",
+                "SQL queries of the sampled requests.",
+                "queries",
+            ),
+            (
+                "wingz_db_query_duration_seconds_total",
+                "counter",
+                "Time spent in SQL by the sampled requests.",
+                "sql_seconds",
+            ),
+            (
+                "wingz_serializer_duration_seconds_total",
+                "counter",
+                "Time spent serializing by the sampled requests.",
+                "serializer_seconds",
+            ),
+        ):
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+            for method, endpoint, stats in endpoints:
+                labels = format_labels(method=method, endpoint=endpoint)
+                lines.append(
+                    f"{name}{{{labels}}} {getattr(stats, attribute)!r}"
+                )
+
+        lines += [
+            "# HELP wingz_metrics_sample_rate Share of the requests sampled.",
+            "# TYPE wingz_metrics_sample_rate gauge",
+            f"wingz_metrics_sample_rate {self.sample_rate!r}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(**labels: str) -> str:
+    return ",".join(
+        f'{name}="{escape_label_value(value)}"'
+        for name, value in labels.items()
+    )
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+@cache
+def get_request_metrics() -> RequestMetrics:
+    """The request metrics of this process"""
+    return RequestMetrics(settings.METRICS_SAMPLE_RATE)
+
+
+class MetricsMiddleware:
+    """Record the request count and latency of every endpoint, and the SQL
+    and serializer time of a sample of the requests, see the module docstring.
+
+    Async capable, so that it doesn't push the async views onto a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics, timings, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                current_timings.reset(token)
+        self.finish(metrics, request, response, timings, started)
+        return response
+
+    async def __acall__(self, request):
+        metrics, timings, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                current_timings.reset(token)
+        self.finish(metrics, request, response, timings, started)
+        return response
+
+    def start(self) -> tuple:
+        metrics = get_request_metrics()
+        timings = token = None
+        if metrics.should_sample():
+            timings = {"active": set()}
+            token = current_timings.set(timings)
+        return metrics, timings, token, time.perf_counter()
+
+    def finish(self, metrics, request, response, timings, started):
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        metrics.record(
+            request.method,
+            match.route if match is not None else "<unmatched>",
+            response.status_code,
+            elapsed,
+            timings,
+        )
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+from rideshare.geo import get_grid_cell
+
+
+def populate_pickup_grid_cell(apps, schema_editor):
+    Ride = apps.get_model("rideshare", "Ride")
+    rides = Ride.objects.only("pickup_latitude", "pickup_longitude")
+    batch = []
+    for ride in rides.iterator(chunk_size=2000):
+        ride.pickup_grid_cell = get_grid_cell(
+            ride.pickup_latitude, ride.pickup_longitude
+        )
+        batch.append(ride)
+        if len(batch) >= 2000:
+            Ride.objects.bulk_update(batch, ["pickup_grid_cell"])
+            batch = []
+    Ride.objects.bulk_update(batch, ["pickup_grid_cell"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rideshare", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ride",
+            name="pickup_grid_cell",
+            field=models.PositiveIntegerField(
+                db_index=True, default=0, editable=False
+            ),
+        ),
+        migrations.RunPython(
+            populate_pickup_grid_cell, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:05
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("rideshare", "0002_ride_pickup_grid_cell"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ride",
+            index=models.Index(
+                fields=["pickup_time"], name="ride_pickup_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ride",
+            index=models.Index(
+                fields=["status", "pickup_time"],
+                name="ride_status_pickup_time_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ride",
+            index=models.Index(
+                fields=["rider", "pickup_time"],
+                name="ride_rider_pickup_time_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="rideevent",
+            index=models.Index(
+                fields=["created_at"], name="rideevent_created_at_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="rideevent",
+            index=models.Index(
+                fields=["ride", "created_at"],
+                name="rideevent_ride_created_at_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                django.db.models.functions.text.Lower("email"),
+                name="user_email_lower_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rideshare", "0003_list_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RideEventArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigIntegerField(primary_key=True, serialize=False),
+                ),
+                ("created_at", models.DateTimeField()),
+                ("description", models.CharField(blank=True, max_length=1024)),
+                (
+                    "ride",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_ride_events",
+                        to="rideshare.ride",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["created_at"],
+                        name="rideeventarch_created_at_idx",
+                    ),
+                    models.Index(
+                        fields=["ride", "created_at"],
+                        name="rideeventarch_ride_created_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rideshare", "0004_ride_event_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        max_length=64, primary_key=True, serialize=False
+                    ),
+                ),
+                ("last_event_id", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="RideTripSummary",
+            fields=[
+                (
+                    "ride",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="trip_summary",
+                        serialize=False,
+                        to="rideshare.ride",
+                    ),
+                ),
+                ("pickup_time", models.DateTimeField(null=True)),
+                ("dropoff_time", models.DateTimeField(null=True)),
+                ("duration", models.DurationField(null=True)),
+                ("month", models.CharField(blank=True, max_length=7)),
+                (
+                    "driver",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="trip_summaries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["duration", "month", "driver"],
+                        name="tripsummary_duration_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rideshare", "0005_ride_trip_summary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ride",
+            name="last_event_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="ride",
+            name="last_event_description",
+            field=models.CharField(
+                blank=True, editable=False, max_length=1024
+            ),
+        ),
+        migrations.AddField(
+            model_name="ride",
+            name="recent_events",
+            field=models.JSONField(default=list, editable=False),
+        ),
+    ]
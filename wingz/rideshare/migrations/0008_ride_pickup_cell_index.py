@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rideshare", "0007_driver_location"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="ride",
+            name="pickup_grid_cell",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="ride",
+            index=models.Index(
+                fields=[
+                    "pickup_grid_cell",
+                    "pickup_latitude",
+                    "pickup_longitude",
+                ],
+                name="ride_pickup_cell_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rideshare", "0008_ride_pickup_cell_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="driverlocation",
+            name="received_at",
+            field=models.DateTimeField(
+                db_index=True, default=django.utils.timezone.now
+            ),
+        ),
+    ]
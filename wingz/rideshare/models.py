@@ -1,8 +1,11 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
 
 from .enums import RideStatusChoices, UserRoleChoices
+from .geo import get_grid_cell
 
 
 class User(AbstractUser):
@@ -23,6 +26,12 @@ class User(AbstractUser):
     email = models.EmailField(unique=True, blank=False, null=False)
     phone_number = PhoneNumberField(blank=True, null=False)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Serves case-insensitive lookups on the email
+            models.Index(Lower("email"), name="user_email_lower_idx"),
+        ]
+
 
 class Ride(models.Model):
     """Represents details of a Ride."""
@@ -43,13 +52,185 @@ class Ride(models.Model):
     dropoff_latitude = models.FloatField(default=0.0, null=False)
     dropoff_longitude = models.FloatField(default=0.0, null=False)
     pickup_time = models.DateTimeField(blank=True, null=False)
+    # Spatial index on the pickup coordinates, see `rideshare.geo`
+    pickup_grid_cell = models.PositiveIntegerField(default=0, editable=False)
+    # Denormalized from the ride's Ride Events, see `rideshare.summaries`
+    last_event_at = models.DateTimeField(null=True, editable=False)
+    last_event_description = models.CharField(
+        max_length=1024, blank=True, null=False, editable=False
+    )
+    recent_events = models.JSONField(default=list, editable=False)
+
+    # Most Ride Events kept in `recent_events`
+    RECENT_EVENTS_LIMIT = 50
+
+    # Fields only ever written by `rideshare.summaries`
+    EVENT_SUMMARY_FIELDS = (
+        "last_event_at",
+        "last_event_description",
+        "recent_events",
+    )
+
+    def save(self, *args, **kwargs):
+        """Keep the pickup grid cell in sync with the pickup coordinates"""
+        self.pickup_grid_cell = get_grid_cell(
+            self.pickup_latitude, self.pickup_longitude
+        )
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {
+            "pickup_latitude",
+            "pickup_longitude",
+        }.intersection(update_fields):
+            kwargs["update_fields"] = {*update_fields, "pickup_grid_cell"}
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["pickup_time"], name="ride_pickup_time_idx"),
+            models.Index(
+                fields=["status", "pickup_time"],
+                name="ride_status_pickup_time_idx",
+            ),
+            models.Index(
+                fields=["rider", "pickup_time"],
+                name="ride_rider_pickup_time_idx",
+            ),
+            # Covers the reads of `rideshare.ranking`, which only need the
+            # pickup coordinates of the rides in the searched cells
+            models.Index(
+                fields=[
+                    "pickup_grid_cell",
+                    "pickup_latitude",
+                    "pickup_longitude",
+                ],
+                name="ride_pickup_cell_idx",
+            ),
+        ]
 
 
 class RideEvent(models.Model):
     """Represents an Event that takes place over the course of a Ride"""
 
+    STATUS_CHANGE_DESCRIPTION = "Status changed to {status}"
+
     created_at = models.DateTimeField(blank=False, null=False)
     ride = models.ForeignKey(
         Ride, related_name="ride_events", on_delete=models.CASCADE
     )
     description = models.CharField(max_length=1024, blank=True, null=False)
+
+    @classmethod
+    def for_status_change(cls, ride_id: int, status: str, created_at):
+        """Unsaved event recording that a ride moved to the given status"""
+        return cls(
+            ride_id=ride_id,
+            created_at=created_at,
+            description=cls.STATUS_CHANGE_DESCRIPTION.format(status=status),
+        )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created_at"], name="rideevent_created_at_idx"
+            ),
+            models.Index(
+                fields=["ride", "created_at"],
+                name="rideevent_ride_created_at_idx",
+            ),
+        ]
+
+
+class RideEventArchive(models.Model):
+    """Ride Events too old to be kept in the hot `RideEvent` table.
+
+    Rows are moved here by the `archive_ride_events` command, and keep the id
+    they had in `RideEvent`. The columns are in the same order as those of
+    `RideEvent`, so that both tables can be read as one through a UNION.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    created_at = models.DateTimeField(blank=False, null=False)
+    ride = models.ForeignKey(
+        Ride, related_name="archived_ride_events", on_delete=models.CASCADE
+    )
+    description = models.CharField(max_length=1024, blank=True, null=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created_at"], name="rideeventarch_created_at_idx"
+            ),
+            models.Index(
+                fields=["ride", "created_at"],
+                name="rideeventarch_ride_created_idx",
+            ),
+        ]
+
+
+class RideTripSummary(models.Model):
+    """When a ride's trip started and ended, rolled up from its pickup and
+    dropoff Ride Events by the `refresh_trip_summaries` command.
+
+    Like the bonus SQL report, a trip counts towards the month of its
+    dropoff, in UTC.
+    """
+
+    # Name of the `RollupWatermark` of the summaries
+    WATERMARK_NAME = "ride_trip_summaries"
+
+    ride = models.OneToOneField(
+        Ride,
+        primary_key=True,
+        related_name="trip_summary",
+        on_delete=models.CASCADE,
+    )
+    driver = models.ForeignKey(
+        User, related_name="trip_summaries", on_delete=models.CASCADE
+    )
+    pickup_time = models.DateTimeField(null=True)
+    dropoff_time = models.DateTimeField(null=True)
+    # Only set once both the pickup and the dropoff are known
+    duration = models.DurationField(null=True)
+    month = models.CharField(max_length=7, blank=True, null=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["duration", "month", "driver"],
+                name="tripsummary_duration_idx",
+            ),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """The last Ride Event a rollup has taken in, by id.
+
+    Ride Events keep their id when archived, so one watermark covers both the
+    hot and the archived ride events.
+    """
+
+    name = models.CharField(max_length=64, primary_key=True)
+    last_event_id = models.BigIntegerField(default=0)
+
+
+class DriverLocation(models.Model):
+    """Where a driver last reported to be, and whether they take rides.
+
+    Searched through the in-memory index of `rideshare.drivers` rather than
+    with SQL.
+    """
+
+    driver = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name="location",
+        on_delete=models.CASCADE,
+    )
+    latitude = models.FloatField(null=False)
+    longitude = models.FloatField(null=False)
+    is_available = models.BooleanField(default=True)
+    # When the driver reported the location
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+    # When the location was written, which `DriverIndex.sync` reads the rows
+    # written since its last sync by
+    received_at = models.DateTimeField(default=timezone.now, db_index=True)
@@ -16,3 +16,9 @@ class IsAdminUser(IsAuthenticated):
 
         user: User = request.user
         return user.role == UserRoleChoices.ADMIN
+
+    async def ahas_permission(self, request, view):
+        """For the async views. Only the role is read, which authentication
+        has already loaded, so the sync check never hits the database.
+        """
+        return self.has_permission(request, view)
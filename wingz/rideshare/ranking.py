@@ -0,0 +1,272 @@
+"""Ranking rides by distance outside of SQL
+
+SQLite has no trigonometric functions, so Django registers Python callbacks
+for them, and the Haversine annotation of `RideViewSet` makes several Python
+calls per row it's computed on. The "vectorized" RIDE_DISTANCE_ENGINE reads
+the ids and pickup coordinates of the candidate rides in bulk instead, computes
+every distance in one NumPy pass, selects the page's rides with
+`argpartition`, and only then loads those rides.
+
+NumPy is optional. Without it, the distances are computed in a plain Python
+loop over the same bulk read, which is slower than NumPy but still skips the
+SQL callbacks.
+"""
+
+import heapq
+import math
+from collections.abc import Iterator
+from itertools import islice
+
+from django.db.models import Q, QuerySet
+
+from .geo import EARTH_RADIUS_KM, MAX_DISTANCE_KM, get_cell_ranges
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SQL = "sql"
+VECTORIZED = "vectorized"
+DISTANCE_ENGINES = (SQL, VECTORIZED)
+
+
+def compute_distances(
+    latitude: float, longitude: float, latitudes, longitudes
+):
+    """Haversine distance, in km, from the given coordinates to each of the
+    others. Same formula as `RideViewSet.apply_distance_annotation`.
+    """
+
+    if np is not None:
+        a = (
+            np.sin(np.radians(latitude - latitudes) / 2) ** 2
+            + np.cos(np.radians(latitudes))
+            * math.cos(math.radians(latitude))
+            * np.sin(np.radians(longitude - longitudes) / 2) ** 2
+        )
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    cos_latitude = math.cos(math.radians(latitude))
+    distances = []
+    for row_latitude, row_longitude in zip(latitudes, longitudes):
+        a = (
+            math.sin(math.radians(latitude - row_latitude) / 2) ** 2
+            + math.cos(math.radians(row_latitude))
+            * cos_latitude
+            * math.sin(math.radians(longitude - row_longitude) / 2) ** 2
+        )
+        distances.append(
+            2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+        )
+    return distances
+
+
+class RankedRides:
+    """Candidate rides ordered by `(distance, id)`, sliced like a queryset.
+
+    Only the ids and distances are held, the rides of a slice are loaded from
+    `queryset` when it's taken, with their `distance` set.
+    """
+
+    sort_key = "distance"
+
+    def __init__(
+        self, queryset: QuerySet, ids, distances, total: int | None = None
+    ):
+        self.queryset = queryset
+        self.ids = ids
+        self.distances = distances
+        # Every ride matching the filters, beyond the candidates held, counted
+        # only when asked for if not given
+        self.total = total
+
+    def count(self) -> int:
+        if self.total is None:
+            self.total = self.queryset.count()
+        return self.total
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def after(self, distance: float, last_id: int) -> "RankedRides":
+        """The candidates past the given position"""
+        if np is not None:
+            keep = (self.distances > distance) | (
+                (self.distances == distance) & (self.ids > last_id)
+            )
+            ids, distances = self.ids[keep], self.distances[keep]
+        else:
+            kept = [
+                (ride_id, ride_distance)
+                for ride_id, ride_distance in zip(self.ids, self.distances)
+                if (ride_distance, ride_id) > (distance, last_id)
+            ]
+            ids = [ride_id for ride_id, _ in kept]
+            distances = [ride_distance for _, ride_distance in kept]
+        return RankedRides(self.queryset, ids, distances, self.total)
+
+    def get_order(self, stop: int | None = None) -> list[int]:
+        """Positions of the first `stop` candidates, in order"""
+
+        size = len(self.ids)
+        if stop is None or stop > size:
+            stop = size
+        if stop <= 0:
+            return []
+
+        if np is None:
+            return heapq.nsmallest(
+                stop,
+                range(size),
+                key=lambda position: (
+                    self.distances[position],
+                    self.ids[position],
+                ),
+            )
+
+        if stop < size:
+            # Whatever ties with the last selected candidate is sorted along,
+            # so that ties are broken on the id as in SQL
+            selected = np.argpartition(self.distances, stop - 1)[:stop]
+            last_distance = self.distances[selected].max()
+            positions = np.flatnonzero(self.distances <= last_distance)
+        else:
+            positions = np.arange(size)
+        order = np.lexsort((self.ids[positions], self.distances[positions]))
+        return positions[order][:stop].tolist()
+
+    def load(self, positions: list[int]) -> list:
+        """The rides at the given positions, in that order"""
+        ids = [int(self.ids[position]) for position in positions]
+        rides = self.queryset.filter(id__in=ids).in_bulk()
+        page = []
+        for position, ride_id in zip(positions, ids):
+            ride = rides[ride_id]
+            ride.distance = float(self.distances[position])
+            page.append(ride)
+        return page
+
+    def __getitem__(self, key: slice) -> list:
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError("RankedRides only support slices")
+        start = key.start or 0
+        return self.load(self.get_order(key.stop)[start:])
+
+    def __iter__(self) -> Iterator:
+        return self.iterator()
+
+    def iterator(self, chunk_size: int = 2000) -> Iterator:
+        """Every candidate ride, loaded `chunk_size` at a time"""
+        positions = iter(self.get_order())
+        while chunk := list(islice(positions, chunk_size)):
+            yield from self.load(chunk)
+
+
+def fetch_candidates(queryset: QuerySet) -> tuple:
+    """Ids, pickup latitudes and pickup longitudes of the rides"""
+
+    rows = queryset.order_by().values_list(
+        "id", "pickup_latitude", "pickup_longitude"
+    )
+    if np is None:
+        ids, latitudes, longitudes = [], [], []
+        for ride_id, latitude, longitude in rows:
+            ids.append(ride_id)
+            latitudes.append(latitude)
+            longitudes.append(longitude)
+        return ids, latitudes, longitudes
+
+    columns = np.array(list(rows), dtype=np.float64).reshape(-1, 3)
+    return (
+        columns[:, 0].astype(np.int64),
+        columns[:, 1],
+        columns[:, 2],
+    )
+
+
+def within_cells(
+    queryset: QuerySet, latitude: float, longitude: float, radius_km: float
+) -> QuerySet:
+    """Rides in the grid cells around the given coordinates, see
+    `RideViewSet.filter_within_radius`
+    """
+
+    if radius_km >= MAX_DISTANCE_KM:
+        return queryset
+    in_nearby_cells = Q()
+    for cell_range in get_cell_ranges(latitude, longitude, radius_km):
+        in_nearby_cells |= Q(pickup_grid_cell__range=cell_range)
+    return queryset.filter(in_nearby_cells)
+
+
+def rank_within(
+    queryset: QuerySet, latitude: float, longitude: float, radius_km: float
+) -> RankedRides:
+    """The rides within `radius_km` of the given coordinates"""
+
+    ids, distances = find_within(queryset, latitude, longitude, radius_km)
+    return RankedRides(queryset, ids, distances, len(ids))
+
+
+def find_within(
+    queryset: QuerySet, latitude: float, longitude: float, radius_km: float
+) -> tuple:
+    """The ids and distances of the rides within `radius_km` of the given
+    coordinates
+    """
+
+    ids, latitudes, longitudes = fetch_candidates(
+        within_cells(queryset, latitude, longitude, radius_km)
+    )
+    distances = compute_distances(latitude, longitude, latitudes, longitudes)
+    if np is not None:
+        keep = distances <= radius_km
+        ids, distances = ids[keep], distances[keep]
+    else:
+        kept = [
+            (ride_id, distance)
+            for ride_id, distance in zip(ids, distances)
+            if distance <= radius_km
+        ]
+        ids = [ride_id for ride_id, _ in kept]
+        distances = [distance for _, distance in kept]
+    return ids, distances
+
+
+def rank_by_distance(
+    queryset: QuerySet,
+    latitude: float,
+    longitude: float,
+    radius_km: float | None = None,
+    rows_needed: int | None = None,
+    after: tuple[float, int] | None = None,
+    initial_radius_km: float = 5.0,
+    radius_growth: int = 4,
+) -> RankedRides:
+    """Rank the rides of the queryset by their distance to the given
+    coordinates, keeping those within `radius_km` if given.
+
+    Otherwise, when only the first `rows_needed` past the `after` position
+    are needed, the candidates are searched for in rings of grid cells growing
+    outward, as `RideViewSet.apply_radius_filter` does.
+    """
+
+    if radius_km is not None:
+        ranked = rank_within(queryset, latitude, longitude, radius_km)
+        return ranked.after(*after) if after else ranked
+
+    search_radius_km = initial_radius_km if rows_needed else MAX_DISTANCE_KM
+    while True:
+        # The candidates found are only part of the rides to count
+        ranked = RankedRides(
+            queryset,
+            *find_within(queryset, latitude, longitude, search_radius_km),
+        )
+        if after:
+            ranked = ranked.after(*after)
+        if search_radius_km >= MAX_DISTANCE_KM or len(ranked.ids) >= (
+            rows_needed or 0
+        ):
+            return ranked
+        search_radius_km *= radius_growth
@@ -0,0 +1,73 @@
+"""Database router sending the reads of API requests to read replicas
+
+Reads go to a replica only while a view allows it, see
+`rideshare.views.replicas`. Everything else, including any read following a
+write in the same request, goes to the primary "default" database.
+
+Users are pinned to the primary after a write through the default Django
+cache, which has to be shared by every process for the pin to hold whichever
+process serves their next request. Views only read from the replicas when it
+is, see `rideshare.checks`.
+"""
+
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+from django.db import DEFAULT_DB_ALIAS
+from rideshare.caching import is_shared_cache
+
+replica_reads_allowed = ContextVar("replica_reads_allowed", default=False)
+
+PINNED_KEY_PREFIX = "rideshare:primary-pinned:"
+
+
+def pin_to_primary(user):
+    """Keep the reads of the user on the primary for a while, so that they
+    see their own writes whatever the replication lag
+    """
+    cache.set(
+        PINNED_KEY_PREFIX + str(user.pk),
+        True,
+        timeout=settings.DATABASE_REPLICA_STICKY_SECONDS,
+    )
+
+
+def is_pinned_to_primary(user) -> bool:
+    return cache.get(PINNED_KEY_PREFIX + str(user.pk)) is not None
+
+
+def can_pin_to_primary() -> bool:
+    """Whether pins hold across processes"""
+    return is_shared_cache(DEFAULT_CACHE_ALIAS)
+
+
+def reads_from_replicas() -> bool:
+    """Whether the reads of the current request go to the replicas"""
+    return bool(settings.DATABASE_REPLICA_ALIASES) and (
+        replica_reads_allowed.get()
+    )
+
+
+class ReplicaRouter:
+    """Spreads allowed reads over the replicas, and everything else to the
+    primary
+    """
+
+    def db_for_read(self, model, **hints):
+        if reads_from_replicas():
+            return random.choice(settings.DATABASE_REPLICA_ALIASES)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Whatever is read next in this request must see the write
+        replica_reads_allowed.set(False)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICA_ALIASES}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
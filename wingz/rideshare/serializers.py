@@ -1,11 +1,169 @@
 """Serializers used by the REST endpoints"""
 
+from collections.abc import Callable
+from datetime import datetime
+from functools import cached_property
+from operator import attrgetter
+
+from django.db import models
 from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+
+from .enums import RideStatusChoices
+from .metrics import timed
+from .models import DriverLocation, Ride, RideEvent, User
+
+
+def compile_field_reader(serializer, field) -> Callable:
+    """Build a function that gives the representation of one field of an
+    instance, exactly as `Serializer.to_representation` would.
+
+    It raises `SkipField` whenever the field would be left out.
+    """
+
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(serializer, field.method_name)
+
+    if isinstance(field, serializers.BaseSerializer) and not isinstance(
+        field, serializers.ListSerializer
+    ):
+        plan = compile_representation_plan(field)
+
+        def read_nested(instance):
+            attribute = field.get_attribute(instance)
+            if attribute is None:
+                return None
+            return represent(plan, attribute)
+
+        return read_nested
+
+    if (
+        isinstance(field, serializers.PrimaryKeyRelatedField)
+        and field.use_pk_only_optimization()
+        and field.pk_field is None
+        and len(field.source_attrs) == 1
+    ):
+        # Read the foreign key column, and skip the `PKOnlyObject` wrapper
+        source = field.source_attrs[0]
+
+        def read_primary_key(instance):
+            try:
+                return instance.serializable_value(source)
+            except AttributeError:
+                attribute = field.get_attribute(instance)
+                if attribute is None:
+                    return None
+                return field.to_representation(attribute)
+
+        return read_primary_key
+
+    if isinstance(field, serializers.DateTimeField) and not hasattr(
+        field, "timezone"
+    ):
+        # Look the current timezone up once, rather than for every value
+        field.timezone = field.default_timezone()
+
+    to_representation = field.to_representation
+    get_attribute = field.get_attribute
+    if len(field.source_attrs) == 1:
+        getter = attrgetter(field.source_attrs[0])
+    else:
+        getter = get_attribute
+
+    def read(instance):
+        try:
+            attribute = getter(instance)
+        except AttributeError:
+            # Let the field apply its defaults, or raise `SkipField`
+            attribute = get_attribute(instance)
+        else:
+            if callable(attribute):
+                attribute = get_attribute(instance)
+        check_for_none = (
+            attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        )
+        if check_for_none is None:
+            return None
+        return to_representation(attribute)
+
+    return read
+
 
-from .models import Ride, RideEvent, User
+def compile_representation_plan(serializer) -> list[tuple[str, Callable]]:
+    """Field names of a serializer, paired with their compiled readers"""
+    return [
+        (field.field_name, compile_field_reader(serializer, field))
+        for field in serializer._readable_fields
+    ]
 
 
-class UserSerializer(serializers.ModelSerializer):
+def get_model_columns(serializer, prefix: str = "") -> list[str]:
+    """Names of the model fields that a serializer renders, for `.only()`.
+
+    Nested serializers add their relation, and the fields they render through
+    it, e.g. `rider` and `rider__email`.
+    """
+
+    model_fields = {
+        field.name for field in serializer.Meta.model._meta.concrete_fields
+    }
+    columns = []
+    for field in serializer._readable_fields:
+        if field.source not in model_fields:
+            continue
+        columns.append(prefix + field.source)
+        if isinstance(field, serializers.BaseSerializer):
+            columns += get_model_columns(field, f"{prefix}{field.source}__")
+    return columns
+
+
+def represent(plan: list[tuple[str, Callable]], instance) -> dict:
+    """Representation of an instance following a compiled plan"""
+    ret = {}
+    for field_name, read in plan:
+        try:
+            ret[field_name] = read(instance)
+        except SkipField:
+            continue
+    return ret
+
+
+class TimedDataMixin:
+    """Counts the rendering of `.data` as serializer time in the request
+    metrics, see `rideshare.metrics`
+    """
+
+    @property
+    def data(self):
+        with timed("serialize"):
+            return super().data
+
+
+class PlannedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    """Read-only list serializer for large pages.
+
+    Rather than going through `Serializer.to_representation` for every item,
+    how each field is read and represented is worked out once per list, and
+    then applied to every item. The output is identical.
+    """
+
+    @cached_property
+    def representation_plan(self) -> list[tuple[str, Callable]]:
+        return compile_representation_plan(self.child)
+
+    def to_representation(self, data):
+        return list(self.iter_representation(data))
+
+    def iter_representation(self, data):
+        """Representations of the items, one at a time"""
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        plan = self.representation_plan
+        for item in iterable:
+            yield represent(plan, item)
+
+
+class UserSerializer(TimedDataMixin, serializers.ModelSerializer):
 
     password = serializers.CharField(write_only=True)
 
@@ -23,19 +181,20 @@ class UserSerializer(serializers.ModelSerializer):
             "password",
         ]
         read_only_fields = ["id"]
+        list_serializer_class = PlannedListSerializer
 
     def create(self, validated_data):
         return User.objects.create_user(**validated_data)
 
     def update(self, instance, validated_data):
-        password = validated_data.pop("password") or None
+        password = validated_data.pop("password", None) or None
         if password:
             # We cannot accept blank passwords
             instance.set_password(password)
         return super().update(instance, validated_data)
 
 
-class RideBasicSerializer(serializers.ModelSerializer):
+class RideBasicSerializer(TimedDataMixin, serializers.ModelSerializer):
     rider = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
     driver = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
 
@@ -55,12 +214,63 @@ class RideBasicSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
-class RideComplexSerializer(serializers.ModelSerializer):
+class RideComplexSerializer(TimedDataMixin, serializers.ModelSerializer):
+    """Takes the optional `fields` to render, every one but
+    `OPTIONAL_FIELDS` by default, and the related objects to `expand`. Unless
+    expanded, the rider and driver are rendered as ids and today's ride
+    events are left out. Everything is expanded by default.
+
+    Today's ride events are read from the prefetched `todays_ride_events`,
+    or, given `recent_events_since`, from the rides' denormalized
+    `recent_events`. The view prefetches `todays_ride_events` in that case
+    too, for the rides whose `recent_events` may have been cut short by
+    `Ride.RECENT_EVENTS_LIMIT`.
+    """
+
+    # Only rendered when asked for in `fields`
+    OPTIONAL_FIELDS = ("last_event_at", "last_event_description")
+
+    # Names of the expansions, and the field each one applies to
+    EXPANSIONS = {
+        "rider": "rider",
+        "driver": "driver",
+        "events": "todays_ride_events",
+    }
+
     rider = UserSerializer(read_only=True)
     driver = UserSerializer(read_only=True)
     distance = serializers.FloatField(read_only=True)
     todays_ride_events = serializers.SerializerMethodField()
 
+    def __init__(
+        self,
+        *args,
+        fields=None,
+        expand=None,
+        recent_events_since=None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.recent_events_since = recent_events_since
+
+        if fields is None:
+            fields = set(self.fields) - set(self.OPTIONAL_FIELDS)
+        for field_name in set(self.fields) - set(fields):
+            self.fields.pop(field_name)
+
+        self.expanded = set()
+        for name, field_name in self.EXPANSIONS.items():
+            if field_name not in self.fields:
+                continue
+            if expand is None or name in expand:
+                self.expanded.add(name)
+            elif name == "events":
+                self.fields.pop(field_name)
+            else:
+                self.fields[field_name] = serializers.PrimaryKeyRelatedField(
+                    read_only=True
+                )
+
     class Meta:
         model = Ride
         fields = [
@@ -73,18 +283,35 @@ class RideComplexSerializer(serializers.ModelSerializer):
             "dropoff_latitude",
             "dropoff_longitude",
             "pickup_time",
+            "last_event_at",
+            "last_event_description",
             "distance",
             "todays_ride_events",
         ]
         read_only_fields = ["id"]
+        list_serializer_class = PlannedListSerializer
+
+    @cached_property
+    def ride_events_serializer(self):
+        """Shared by every ride, rather than building one per ride"""
+        return RideEventSerializer(many=True)
 
     def get_todays_ride_events(self, obj):
         if hasattr(obj, "todays_ride_events"):
-            return RideEventSerializer(obj.todays_ride_events, many=True).data
+            return self.ride_events_serializer.to_representation(
+                obj.todays_ride_events
+            )
+        if self.recent_events_since is not None:
+            return [
+                ride_event
+                for ride_event in obj.recent_events
+                if datetime.fromisoformat(ride_event["created_at"])
+                >= self.recent_events_since
+            ]
         return []
 
 
-class RideEventSerializer(serializers.ModelSerializer):
+class RideEventSerializer(TimedDataMixin, serializers.ModelSerializer):
     class Meta:
         model = RideEvent
         fields = [
@@ -94,3 +321,66 @@ class RideEventSerializer(serializers.ModelSerializer):
             "created_at",
         ]
         read_only_fields = ["id"]
+        list_serializer_class = PlannedListSerializer
+
+
+class RideEventBulkItemSerializer(serializers.ModelSerializer):
+    """One item of a bulk write of ride events.
+
+    The ride is taken as a plain id, so that the rides of a whole batch can be
+    checked with a single query rather than one per item. Items with an `id`
+    update that ride event, the others create one.
+    """
+
+    id = serializers.IntegerField(required=False)
+    ride = serializers.IntegerField(source="ride_id")
+
+    class Meta:
+        model = RideEvent
+        fields = [
+            "id",
+            "ride",
+            "description",
+            "created_at",
+        ]
+
+
+class RideStatusTransitionSerializer(serializers.Serializer):
+    """Moves many rides to the same status at once"""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=1000
+    )
+    status = serializers.ChoiceField(choices=RideStatusChoices.choices)
+
+
+class DriverLocationSerializer(TimedDataMixin, serializers.ModelSerializer):
+    """A driver's report of where they are"""
+
+    driver = serializers.PrimaryKeyRelatedField(
+        queryset=User.objects.filter(is_active=True)
+    )
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+
+    class Meta:
+        model = DriverLocation
+        fields = [
+            "driver",
+            "latitude",
+            "longitude",
+            "is_available",
+            "updated_at",
+        ]
+        read_only_fields = ["updated_at"]
+
+
+class DriverPingSerializer(serializers.Serializer):
+    """One location ping of a batch, see `rideshare.ingestion`"""
+
+    driver = serializers.IntegerField(min_value=1)
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    is_available = serializers.BooleanField(default=True)
+    # When the driver's app took it, defaults to when it's received
+    recorded_at = serializers.DateTimeField(required=False)
@@ -0,0 +1,50 @@
+"""Model signal receivers that invalidate cached responses and tokens"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token, invalidate_user_tokens
+from .caching import RIDE_EVENTS, RIDES, USERS, bump_generations
+from .models import Ride, RideEvent, User
+
+
+@receiver(post_save, sender=Ride)
+def ride_changed(sender, **kwargs):
+    bump_generations(RIDES)
+
+
+@receiver(post_delete, sender=Ride)
+def ride_deleted(sender, **kwargs):
+    # Its ride events are deleted along with it
+    bump_generations(RIDES, RIDE_EVENTS)
+
+
+# Not on delete: a delete receiver would keep the archive command from
+# deleting ride events in bulk. Views deleting one bump the generation.
+@receiver(post_save, sender=RideEvent)
+def ride_event_changed(sender, **kwargs):
+    bump_generations(RIDE_EVENTS)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, update_fields=None, **kwargs):
+    # Logging in only touches `last_login`, which no cached page shows
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    bump_generations(USERS)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # Cached tokens hold the role and status of their user
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    invalidate_user_tokens(instance)
+
+
+# Also sent for the tokens of a user being deleted
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
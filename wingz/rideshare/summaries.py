@@ -0,0 +1,81 @@
+"""Ride Event data denormalized onto their Rides
+
+Each ride keeps its last Ride Event, and the representations of its recent
+ones, so that the ride list can render today's ride events without a second
+query. Writes to ride events through the API refresh the rides they touch in
+the same transaction. Writes made elsewhere, e.g. from the admin or a shell,
+leave the rides to drift until the `repair_event_summaries` command is run.
+"""
+
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Ride, RideEvent, RideEventArchive
+from .serializers import RideEventSerializer
+
+# The ride list renders the ride events of this many past hours
+RECENT_EVENTS_HOURS = 24
+
+
+def get_recent_cutoff() -> datetime:
+    """Ride events created from this time on are recent"""
+    return timezone.now() - timedelta(hours=RECENT_EVENTS_HOURS)
+
+
+def may_be_truncated(recent_events: list[dict], since: datetime) -> bool:
+    """Whether a ride's `recent_events` may leave out some of its ride events
+    created from `since` on, having been cut at `Ride.RECENT_EVENTS_LIMIT`
+    """
+    return len(recent_events) >= Ride.RECENT_EVENTS_LIMIT and (
+        datetime.fromisoformat(recent_events[0]["created_at"]) >= since
+    )
+
+
+def refresh_event_summaries(ride_ids: Iterable[int]):
+    """Recompute the denormalized ride event fields of the given rides"""
+
+    ride_ids = set(ride_ids)
+    if not ride_ids:
+        return
+
+    # Archived ride events are all older than the hot ones, so the archive
+    # only holds the last one of rides without any hot ride event left
+    latest = [
+        model.objects.filter(ride=OuterRef("pk")).order_by(
+            "-created_at", "-id"
+        )
+        for model in (RideEvent, RideEventArchive)
+    ]
+    Ride.objects.filter(id__in=ride_ids).update(
+        last_event_at=Coalesce(
+            *(Subquery(events.values("created_at")[:1]) for events in latest)
+        ),
+        last_event_description=Coalesce(
+            *(Subquery(events.values("description")[:1]) for events in latest),
+            Value(""),
+        ),
+    )
+
+    recent_events = {ride_id: [] for ride_id in ride_ids}
+    for ride_event in RideEvent.objects.filter(
+        ride_id__in=ride_ids, created_at__gte=get_recent_cutoff()
+    ).order_by("created_at", "id"):
+        recent_events[ride_event.ride_id].append(ride_event)
+
+    serializer = RideEventSerializer(many=True)
+    Ride.objects.bulk_update(
+        [
+            Ride(
+                id=ride_id,
+                recent_events=serializer.to_representation(
+                    ride_events[-Ride.RECENT_EVENTS_LIMIT :]
+                ),
+            )
+            for ride_id, ride_events in recent_events.items()
+        ],
+        ["recent_events"],
+    )
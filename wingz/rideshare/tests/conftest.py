@@ -1,11 +1,72 @@
+import os
+import time
+from contextlib import contextmanager
+
 import pytest
 import pytz
 from datetime import datetime
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
+from rideshare.authentication import get_token_cache
+from rideshare.caching import get_response_cache
+from rideshare.drivers import get_driver_index
+from rideshare.ingestion import get_ping_buffer
+from rideshare.metrics import get_request_metrics
 from rideshare.enums import UserRoleChoices, RideStatusChoices
 from rideshare.models import User, Ride, RideEvent
 
 
+@pytest.fixture(autouse=True)
+def token_cache():
+    """Every test starts with an empty token cache"""
+    get_token_cache.cache_clear()
+    yield get_token_cache()
+    get_token_cache.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def response_cache(settings):
+    """Every test starts with an empty response cache, in the local memory
+    cache as the tests run in one process
+    """
+    settings.RESPONSE_CACHE_BACKEND = "default"
+    get_response_cache.cache_clear()
+    response_cache = get_response_cache()
+    response_cache.cache.clear()
+    yield response_cache
+    response_cache.cache.clear()
+    get_response_cache.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def driver_index():
+    """Every test starts with an empty driver index"""
+    get_driver_index.cache_clear()
+    yield get_driver_index()
+    get_driver_index.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def ping_buffer(settings):
+    """Every test starts with an empty ping buffer, which writes each batch
+    right away rather than from a background thread
+    """
+    settings.DRIVER_PING_FLUSH_SECONDS = 0
+    get_ping_buffer.cache_clear()
+    yield get_ping_buffer()
+    get_ping_buffer.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def request_metrics():
+    """Every test starts without request metrics"""
+    get_request_metrics.cache_clear()
+    yield
+    get_request_metrics.cache_clear()
+
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -62,3 +123,83 @@ def ride_event(ride):
 def authenticated_client(api_client, admin):
     api_client.force_authenticate(user=admin)
     return api_client
+
+
+@pytest.fixture
+def admin_token(admin):
+    return Token.objects.create(user=admin)
+
+
+@pytest.fixture
+def token_client(api_client, admin_token):
+    """Client authenticated through the Authorization header"""
+    api_client.credentials(HTTP_AUTHORIZATION=f"Token {admin_token.key}")
+    return api_client
+
+
+# Scales every latency budget, e.g. 3 on slow CI runners, or 0 to only check
+# the query budgets
+LATENCY_BUDGET_FACTOR = float(os.environ.get("LATENCY_BUDGET_FACTOR", "1"))
+
+
+def is_app_query(sql: str) -> bool:
+    """Leave out the queries Silk makes, and its EXPLAIN of each query"""
+    return not sql.startswith("EXPLAIN") and '"silk_' not in sql
+
+
+@pytest.fixture
+def budget(request, settings):
+    """Context manager failing the test if its block runs more than `queries`
+    queries, or takes longer than `ms` milliseconds. Either defaults to that
+    of the test's `budget` marker.
+
+    The failure lists every query run, to show where an N+1 comes from.
+    Silk is turned off, as its own queries and overhead would count against
+    every budget, and whatever it still runs is left out.
+    """
+
+    settings.MIDDLEWARE = [
+        middleware
+        for middleware in settings.MIDDLEWARE
+        if not middleware.startswith("silk.")
+    ]
+    marker = request.node.get_closest_marker("budget")
+    defaults = marker.kwargs if marker is not None else {}
+
+    @contextmanager
+    def check(queries: int | None = None, ms: float | None = None):
+        queries = defaults.get("queries") if queries is None else queries
+        ms = defaults.get("ms") if ms is None else ms
+
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            yield context
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+        captured = [
+            query
+            for query in context.captured_queries
+            if is_app_query(query["sql"])
+        ]
+        sql = "\n".join(
+            f"{index}. ({query['time']}s) {query['sql']}"
+            for index, query in enumerate(captured, start=1)
+        )
+        if queries is not None and len(captured) > queries:
+            pytest.fail(
+                f"{len(captured)} queries, over the budget of {queries}:\n"
+                f"{sql}",
+                pytrace=False,
+            )
+        if (
+            ms is not None
+            and LATENCY_BUDGET_FACTOR
+            and elapsed_ms > ms * LATENCY_BUDGET_FACTOR
+        ):
+            pytest.fail(
+                f"Took {elapsed_ms:.1f} ms, over the budget of "
+                f"{ms * LATENCY_BUDGET_FACTOR:g} ms:\n{sql}",
+                pytrace=False,
+            )
+
+    return check
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+from io import StringIO
+
+import pytest
+import pytz
+from django.core.management import call_command
+from rideshare.models import (
+    RideEvent,
+    RideEventArchive,
+    RideTripSummary,
+    RollupWatermark,
+)
+
+
+def refresh(*args):
+    call_command("refresh_trip_summaries", *args, stdout=StringIO())
+
+
+@pytest.mark.django_db
+class TestLongTrips:
+    url = "/analytics/long-trips/"
+
+    @pytest.fixture
+    def trip(self, ride, driver):
+        driver.first_name, driver.last_name = "Juan", "Dela Cruz"
+        driver.save()
+        pickup = datetime(2025, 1, 31, 23, 30, 0, 0, pytz.UTC)
+        RideEventArchive.objects.create(
+            id=1,
+            ride=ride,
+            created_at=pickup,
+            description="Status changed to pickup",
+        )
+        RideEvent.objects.create(
+            id=2,
+            ride=ride,
+            created_at=pickup + timedelta(minutes=10),
+            description="Driver is stuck in traffic",
+        )
+        RideEvent.objects.create(
+            id=3,
+            ride=ride,
+            created_at=pickup + timedelta(hours=1, minutes=1),
+            description="Status changed to dropoff",
+        )
+        return ride
+
+    def test_refresh_pairs_both_tiers(self, trip):
+        refresh()
+
+        summary = RideTripSummary.objects.get(ride=trip)
+        assert summary.driver_id == trip.driver_id
+        assert summary.duration == timedelta(hours=1, minutes=1)
+        # Counts towards the month of the dropoff
+        assert summary.month == "2025-02"
+        assert RollupWatermark.objects.get().last_event_id == 3
+
+    def test_refresh_is_incremental(self, ride):
+        pickup = datetime(2025, 3, 1, 0, 0, 0, 0, pytz.UTC)
+        RideEvent.objects.create(
+            ride=ride,
+            created_at=pickup,
+            description="Status changed to pickup",
+        )
+        refresh()
+        summary = RideTripSummary.objects.get(ride=ride)
+        assert summary.pickup_time == pickup
+        assert summary.duration is None
+
+        RideEvent.objects.create(
+            ride=ride,
+            created_at=pickup + timedelta(minutes=30),
+            description="Status changed to dropoff",
+        )
+        refresh("--batch-size", "1")
+        summary.refresh_from_db()
+        assert summary.duration == timedelta(minutes=30)
+        assert summary.month == "2025-03"
+
+    def test_refresh_takes_ride_events_committed_late(self, trip):
+        """A ride event whose id is behind the watermark by the time it
+        commits is still taken in
+        """
+        RideEvent.objects.filter(id=3).delete()
+        RideEvent.objects.create(
+            id=4,
+            ride=trip,
+            created_at=datetime(2025, 1, 31, 23, 30, 0, 0, pytz.UTC),
+            description="Status changed to pickup",
+        )
+        refresh()
+        assert RollupWatermark.objects.get().last_event_id == 4
+
+        RideEvent.objects.create(
+            id=3,
+            ride=trip,
+            created_at=datetime(2025, 2, 1, 0, 31, 0, 0, pytz.UTC),
+            description="Status changed to dropoff",
+        )
+        refresh()
+
+        summary = RideTripSummary.objects.get(ride=trip)
+        assert summary.duration == timedelta(hours=1, minutes=1)
+        assert RollupWatermark.objects.get().last_event_id == 4
+
+    def test_rebuild_drops_deleted_events(self, trip):
+        refresh()
+        RideEvent.objects.filter(id=3).delete()
+
+        refresh("--rebuild")
+        summary = RideTripSummary.objects.get(ride=trip)
+        assert summary.dropoff_time is None
+        assert summary.duration is None
+
+    def test_long_trips_report(self, authenticated_client, trip):
+        refresh()
+
+        response = authenticated_client.get(self.url)
+        assert response.status_code == 200
+        assert response.data["last_event_id"] == 3
+        assert response.data["results"] == [
+            {
+                "month": "2025-02",
+                "driver_id": trip.driver_id,
+                "driver": "Juan D",
+                "count_of_trips_gt_1hr": 1,
+            }
+        ]
+
+    def test_long_trips_report_for_admins_only(self, api_client, rider):
+        api_client.force_authenticate(user=rider)
+        response = api_client.get(self.url)
+        assert response.status_code == 403
@@ -0,0 +1,84 @@
+import pytest
+from rest_framework.authtoken.models import Token
+from rideshare.models import User
+
+
+@pytest.mark.django_db
+class TestAsyncRides:
+    params = {"lat": 10.31445, "lon": 123.9781}
+
+    def test_list_matches_sync_list(self, token_client, ride, ride_event):
+        for params in (
+            self.params,
+            {**self.params, "sort_by": "distance", "page_size": 1},
+            {**self.params, "pagination": "cursor", "fields": "id,rider"},
+        ):
+            response = token_client.get("/async/rides/", params)
+            assert response.status_code == 200
+            assert (
+                response.json() == token_client.get("/rides/", params).json()
+            )
+
+    def test_retrieve(self, token_client, ride):
+        response = token_client.get(f"/async/rides/{ride.id}/", self.params)
+        assert response.status_code == 200
+        assert response.json()["id"] == ride.id
+        assert response.json()["rider"] == ride.rider_id
+
+        response = token_client.get("/async/rides/404/", self.params)
+        assert response.status_code == 404
+
+    def test_invalid_params(self, token_client):
+        response = token_client.get("/async/rides/", {"lat": "north"})
+        assert response.status_code == 400
+
+    def test_requires_admin_token(self, api_client, rider, ride):
+        response = api_client.get("/async/rides/", self.params)
+        assert response.status_code == 401
+        assert response["WWW-Authenticate"] == "Token"
+
+        token = Token.objects.create(user=rider)
+        api_client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        response = api_client.get("/async/rides/", self.params)
+        assert response.status_code == 403
+
+
+@pytest.mark.django_db
+class TestAsyncAuth:
+
+    def test_signup_login_logout(self, api_client):
+        response = api_client.post(
+            "/async/auth/signup/",
+            {
+                "username": "newbie",
+                "password": "pass",
+                "email": "newbie@example.com",
+            },
+            format="json",
+        )
+        assert response.status_code == 201
+        assert User.objects.filter(username="newbie").exists()
+
+        response = api_client.post(
+            "/async/auth/login/",
+            {"username": "newbie", "password": "pass"},
+            format="json",
+        )
+        assert response.status_code == 200
+        key = response.json()["token"]
+
+        api_client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+        response = api_client.delete("/async/auth/logout/")
+        assert response.status_code == 200
+        assert not Token.objects.filter(key=key).exists()
+
+        response = api_client.delete("/async/auth/logout/")
+        assert response.status_code == 401
+
+    def test_login_invalid_credentials(self, api_client, rider):
+        response = api_client.post(
+            "/async/auth/login/",
+            {"username": "rider", "password": "wrong"},
+            format="json",
+        )
+        assert response.status_code == 401
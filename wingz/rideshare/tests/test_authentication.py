@@ -0,0 +1,166 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rideshare.authentication import (
+    CachedTokenAuthentication,
+    LocalTokenCache,
+    SharedTokenCache,
+    get_token_cache,
+)
+from rideshare.checks import check_token_cache
+from rideshare.enums import UserRoleChoices
+
+
+def authtoken_queries(context) -> list[str]:
+    """Token lookups, leaving out what Silk records about them"""
+    return [
+        query["sql"]
+        for query in context.captured_queries
+        if query["sql"].startswith("SELECT")
+        and 'FROM "authtoken_token"' in query["sql"]
+    ]
+
+
+@pytest.mark.django_db
+class TestCachedTokenAuthentication:
+    def test_token_is_looked_up_once(self, token_client):
+        """Only the first request with a token looks it up"""
+
+        with CaptureQueriesContext(connection) as context:
+            response = token_client.get("/users/")
+        assert response.status_code == 200
+        assert len(authtoken_queries(context)) == 1
+
+        with CaptureQueriesContext(connection) as context:
+            response = token_client.get("/users/")
+        assert response.status_code == 200
+        assert not authtoken_queries(context)
+
+    def test_invalid_token(self, api_client):
+        api_client.credentials(HTTP_AUTHORIZATION="Token invalid")
+        response = api_client.get("/users/")
+        assert response.status_code == 401
+
+    def test_logout_revokes_token(self, token_client):
+        assert token_client.get("/users/").status_code == 200
+
+        response = token_client.delete("/auth/logout/")
+        assert response.status_code == 200
+        assert response.data["message"] == "You have successfully logged out."
+
+        assert token_client.get("/users/").status_code == 401
+
+    def test_role_change_is_immediate(self, token_client, admin):
+        assert token_client.get("/users/").status_code == 200
+
+        response = token_client.patch(
+            f"/users/{admin.id}/", {"role": UserRoleChoices.REGULAR}
+        )
+        assert response.status_code == 200
+
+        assert token_client.get("/users/").status_code == 403
+
+    def test_deactivation_is_immediate(self, token_client, rider):
+        rider_token = Token.objects.create(user=rider)
+        rider.role = UserRoleChoices.ADMIN
+        rider.save()
+
+        rider_client = APIClient()
+        rider_client.credentials(HTTP_AUTHORIZATION=f"Token {rider_token}")
+        assert rider_client.get("/users/").status_code == 200
+
+        response = token_client.patch(
+            f"/users/{rider.id}/", {"is_active": False}
+        )
+        assert response.status_code == 200
+
+        assert rider_client.get("/users/").status_code == 401
+
+    def test_changes_outside_the_api_are_immediate(
+        self, token_client, admin, admin_token
+    ):
+        """Saving a user or deleting a token, e.g. from the admin or a
+        shell, drops the cached tokens too
+        """
+        assert token_client.get("/users/").status_code == 200
+
+        admin.role = UserRoleChoices.REGULAR
+        admin.save()
+        assert token_client.get("/users/").status_code == 403
+
+        admin.role = UserRoleChoices.ADMIN
+        admin.save()
+        assert token_client.get("/users/").status_code == 200
+
+        admin_token.delete()
+        assert token_client.get("/users/").status_code == 401
+
+    def test_other_user_fields_load_lazily(self, admin, admin_token):
+        """Any field of a user authenticated from the cache can be read"""
+        authentication = CachedTokenAuthentication()
+        authentication.authenticate_credentials(admin_token.key)
+
+        with CaptureQueriesContext(connection) as context:
+            user, token = authentication.authenticate_credentials(
+                admin_token.key
+            )
+        assert not context.captured_queries
+        assert user.pk == admin.pk
+        assert user.role == UserRoleChoices.ADMIN
+        assert token.key == admin_token.key
+
+        assert user.username == admin.username
+
+
+class TestTokenCaches:
+    def test_local_cache_evicts_least_recently_used(self):
+        token_cache = LocalTokenCache(max_size=2, ttl=60)
+        token_cache.set("a", (1, "admin", True))
+        token_cache.set("b", (2, "admin", True))
+        assert token_cache.get("a") == (1, "admin", True)
+
+        token_cache.set("c", (3, "admin", True))
+
+        assert token_cache.get("a") is not None
+        assert token_cache.get("b") is None
+        assert token_cache.get("c") is not None
+
+    def test_local_cache_expires_entries(self):
+        token_cache = LocalTokenCache(max_size=2, ttl=0)
+        token_cache.set("a", (1, "admin", True))
+
+        assert token_cache.get("a") is None
+
+    @override_settings(TOKEN_CACHE_BACKEND="default")
+    def test_shared_cache(self):
+        get_token_cache.cache_clear()
+        token_cache = get_token_cache()
+        assert isinstance(token_cache, SharedTokenCache)
+
+        token_cache.set("secret", (1, "admin", True))
+        assert token_cache.get("secret") == (1, "admin", True)
+        assert "secret" not in token_cache.make_key("secret")
+
+        token_cache.delete("secret")
+        assert token_cache.get("secret") is None
+
+    def test_warns_of_a_cache_local_to_each_process(self, settings):
+        settings.DEBUG = False
+        assert [warning.id for warning in check_token_cache(None)] == [
+            "rideshare.W003"
+        ]
+
+        settings.TOKEN_CACHE_BACKEND = "local"
+        assert [warning.id for warning in check_token_cache(None)] == [
+            "rideshare.W003"
+        ]
+
+        settings.TOKEN_CACHE_BACKEND = "default"
+        settings.CACHES = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+            }
+        }
+        assert check_token_cache(None) == []
@@ -0,0 +1,117 @@
+"""Query count and latency budgets of the list and detail endpoints
+
+Each endpoint is requested with a page of 1 and of 50 rows, over rides that
+all have riders, drivers and ride events of their own, so that anything
+queried per row shows up as a blown query budget.
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rideshare.geo import get_grid_cell
+from rideshare.models import Ride, RideEvent, User
+
+RIDE_LIST_URL = "/rides/?lat=10.31445&lon=123.9781"
+
+
+@pytest.fixture
+def rides():
+    """60 rides near each other, shared by 20 users, with two of today's
+    ride events each
+    """
+
+    users = User.objects.bulk_create(
+        User(username=f"user{index}", email=f"user{index}@example.com")
+        for index in range(20)
+    )
+    now = timezone.now()
+    new_rides = []
+    for index in range(60):
+        latitude = 10.3 + index * 0.001
+        new_rides.append(
+            Ride(
+                rider=users[index % 20],
+                driver=users[(index + 1) % 20],
+                pickup_latitude=latitude,
+                pickup_longitude=123.9,
+                # bulk_create skips Ride.save(), which sets the grid cell
+                pickup_grid_cell=get_grid_cell(latitude, 123.9),
+                pickup_time=now - timedelta(minutes=index),
+            )
+        )
+    new_rides = Ride.objects.bulk_create(new_rides)
+    RideEvent.objects.bulk_create(
+        RideEvent(ride=ride, description="Ride event", created_at=now)
+        for ride in new_rides
+        for _ in range(2)
+    )
+    return new_rides
+
+
+@pytest.mark.django_db
+@pytest.mark.budget(ms=300)
+@pytest.mark.parametrize("page_size", [1, 50])
+class TestBudgets:
+    @pytest.mark.parametrize(
+        "params, queries",
+        [
+            # Count, page, and today's ride events
+            ("", 3),
+            ("&status=init", 3),
+            ("&email=user3@example.com", 3),
+            ("&sort_by=distance&radius_km=50", 3),
+            # Plus the counts of the rings searched for the nearest rides
+            ("&sort_by=distance", 6),
+            # No count with cursors
+            ("&pagination=cursor", 2),
+            ("&pagination=cursor&sort_by=distance", 5),
+            # Ride events are read from the rides, or not rendered
+            ("&single_query=true", 2),
+            ("&fields=id,status&expand=", 2),
+        ],
+    )
+    def test_ride_list(
+        self, authenticated_client, rides, budget, page_size, params, queries
+    ):
+        with budget(queries=queries):
+            response = authenticated_client.get(
+                f"{RIDE_LIST_URL}&page_size={page_size}{params}"
+            )
+        assert response.status_code == 200
+        assert 0 < len(response.data["results"]) <= page_size
+
+    def test_ride_detail(self, authenticated_client, rides, budget, page_size):
+        with budget(queries=1):
+            response = authenticated_client.get(
+                f"/rides/{rides[0].id}/?lat=10.31445&lon=123.9781"
+            )
+        assert response.status_code == 200
+
+    def test_ride_event_list(
+        self, authenticated_client, rides, budget, page_size
+    ):
+        with budget(queries=2):
+            response = authenticated_client.get(
+                f"/ride-events/?page_size={page_size}"
+            )
+        assert 0 < len(response.data["results"]) <= page_size
+
+    def test_user_list(self, authenticated_client, rides, budget, page_size):
+        with budget(queries=2):
+            response = authenticated_client.get(
+                f"/users/?page_size={page_size}"
+            )
+        assert 0 < len(response.data["results"]) <= page_size
+
+
+@pytest.mark.django_db
+def test_blown_budget_lists_the_queries(budget):
+    with pytest.raises(pytest.fail.Exception) as exc_info:
+        with budget(queries=1):
+            User.objects.count()
+            User.objects.exists()
+
+    message = str(exc_info.value)
+    assert message.startswith("2 queries, over the budget of 1")
+    assert 'SELECT COUNT(*) AS "__count" FROM "rideshare_user"' in message
@@ -0,0 +1,91 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rideshare.enums import RideStatusChoices
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    ride_list_url = "/rides/?lat=10.31445&lon=123.9781"
+
+    def get_selects(self, context):
+        return [
+            query
+            for query in context.captured_queries
+            if query["sql"].startswith('SELECT "rideshare_')
+        ]
+
+    def test_unchanged_ride_list_is_not_modified(
+        self, authenticated_client, ride
+    ):
+        response = authenticated_client.get(self.ride_list_url)
+        etag = response["ETag"]
+
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get(
+                self.ride_list_url, HTTP_IF_NONE_MATCH=etag
+            )
+
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+        assert not response.content
+        assert not self.get_selects(context)
+
+    def test_changed_ride_list_is_sent_again(self, authenticated_client, ride):
+        etag = authenticated_client.get(self.ride_list_url)["ETag"]
+
+        ride.status = RideStatusChoices.PICKUP
+        ride.save()
+        response = authenticated_client.get(
+            self.ride_list_url, HTTP_IF_NONE_MATCH=etag
+        )
+
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+        assert response.data["results"][0]["status"] == "pickup"
+
+    def test_ride_event_detail_is_not_modified(
+        self, authenticated_client, ride_event
+    ):
+        url = f"/ride-events/{ride_event.id}/"
+        etag = authenticated_client.get(url)["ETag"]
+
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+        authenticated_client.patch(
+            url, {"description": "Ride resumed"}, format="json"
+        )
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.data["description"] == "Ride resumed"
+
+    def test_deleting_a_ride_changes_the_ride_event_list(
+        self, authenticated_client, ride, ride_event
+    ):
+        etag = authenticated_client.get("/ride-events/")["ETag"]
+
+        response = authenticated_client.delete(
+            f"/rides/{ride.id}/?lat=10.31445&lon=123.9781"
+        )
+        assert response.status_code == 204
+        response = authenticated_client.get(
+            "/ride-events/", HTTP_IF_NONE_MATCH=etag
+        )
+
+        assert response.status_code == 200
+        assert response.data["results"] == []
+
+    def test_user_list_if_modified_since(self, authenticated_client, rider):
+        response = authenticated_client.get("/users/")
+        last_modified = response["Last-Modified"]
+
+        response = authenticated_client.get(
+            "/users/", HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        assert response.status_code == 304
+
+    def test_missing_object_has_no_validators(self, authenticated_client):
+        response = authenticated_client.get("/ride-events/404/")
+        assert response.status_code == 404
+        assert not response.has_header("ETag")
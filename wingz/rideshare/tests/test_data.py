@@ -0,0 +1,95 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from rideshare.geo import get_grid_cell
+from rideshare.models import Ride, RideEvent, RideEventArchive, User
+
+
+def generate(*args) -> str:
+    stdout = StringIO()
+    call_command("generate_data", *args, stdout=stdout)
+    return stdout.getvalue()
+
+
+@pytest.mark.django_db
+class TestGenerateData:
+    def test_generates_the_requested_volumes(self):
+        output = generate("--users", "20", "--rides", "150", "--days", "3")
+
+        assert User.objects.count() == 20
+        assert Ride.objects.count() == 150
+        assert "Generated 150 rides" in output
+        # Every ride was at least requested
+        events = RideEvent.objects.count() + RideEventArchive.objects.count()
+        assert events >= 150
+
+    def test_rides_match_their_ride_events(self):
+        generate("--users", "10", "--rides", "50", "--days", "2")
+
+        for ride in Ride.objects.all():
+            assert ride.rider_id != ride.driver_id
+            assert ride.pickup_grid_cell == get_grid_cell(
+                ride.pickup_latitude, ride.pickup_longitude
+            )
+            assert ride.last_event_description.endswith(ride.status)
+
+        # The denormalized fields are already what a repair computes
+        stdout = StringIO()
+        call_command("repair_event_summaries", stdout=stdout)
+        assert stdout.getvalue().startswith("Repaired 0 of 50")
+
+    def test_is_reproducible(self):
+        generate("--users", "5", "--rides", "10", "--prefix", "first")
+        generate("--users", "5", "--rides", "10", "--prefix", "second")
+
+        first, second = (
+            list(
+                Ride.objects.filter(rider__username__startswith=prefix)
+                .order_by("id")
+                .values_list("pickup_latitude", "pickup_longitude")
+            )
+            for prefix in ("first", "second")
+        )
+        assert len(first) == 10 and first == second
+
+    def test_needs_two_users_for_rides(self):
+        with pytest.raises(CommandError):
+            generate("--users", "1", "--rides", "1")
+
+
+@pytest.mark.django_db
+class TestBenchmarkAPI:
+    def test_reports_every_endpoint(self, tmp_path):
+        generate("--users", "10", "--rides", "30", "--days", "2")
+        baseline = tmp_path / "baseline.json"
+
+        call_command(
+            "benchmark_api", "--requests", "2", "--output", str(baseline)
+        )
+        stderr = StringIO()
+        call_command(
+            "benchmark_api",
+            "--requests",
+            "2",
+            "--compare",
+            str(baseline),
+            stdout=StringIO(),
+            stderr=stderr,
+        )
+
+        report = json.loads(baseline.read_text())
+        assert report["data"]["rides"] == 30
+        # 32 ride list combinations, two ride event lists, users and auth
+        assert len(report["results"]) == 36
+        for result in report["results"]:
+            assert result["requests"] == 2
+            assert result["errors"] == 0
+            assert result["queries_per_request"] > 0
+        assert "GET /users/" in stderr.getvalue()
+
+    def test_needs_rides(self):
+        with pytest.raises(CommandError):
+            call_command("benchmark_api", stdout=StringIO())
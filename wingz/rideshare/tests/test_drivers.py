@@ -0,0 +1,384 @@
+import random
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rideshare.drivers import DriverIndex
+from rideshare.geo import haversine_km
+from rideshare.ingestion import Ping, PingBuffer, write_pings
+from rideshare.models import DriverLocation, User
+
+
+def brute_force(drivers: dict, latitude: float, longitude: float, k: int):
+    return sorted(
+        drivers,
+        key=lambda driver_id: haversine_km(
+            latitude, longitude, *drivers[driver_id]
+        ),
+    )[:k]
+
+
+class TestDriverIndex:
+    def make_index(self) -> DriverIndex:
+        return DriverIndex(ttl_seconds=300, sync_seconds=60)
+
+    @pytest.mark.parametrize(
+        "latitude,longitude",
+        [
+            (14.5995, 120.9842),
+            # Across the antimeridian, and close to a pole
+            (-16.5, 179.99),
+            (89.9, 10.0),
+        ],
+    )
+    def test_matches_brute_force(self, latitude, longitude):
+        rng = random.Random(0)
+        index = self.make_index()
+        now = timezone.now()
+        drivers = {}
+        for driver_id in range(500):
+            drivers[driver_id] = (
+                max(min(latitude + rng.gauss(0, 0.2), 90), -90),
+                (longitude + rng.gauss(0, 0.2) + 180) % 360 - 180,
+            )
+            index.update(driver_id, *drivers[driver_id], now)
+
+        for k in (1, 5, 50):
+            nearest = index.nearest(latitude, longitude, k)
+            assert [driver.driver_id for driver in nearest] == brute_force(
+                drivers, latitude, longitude, k
+            )
+
+    def test_finds_far_away_drivers(self):
+        index = self.make_index()
+        now = timezone.now()
+        index.update(1, 14.5995, 120.9842, now)
+        index.update(2, 10.3157, 123.8854, now)
+
+        nearest = index.nearest(40.7128, -74.0060, 5)
+
+        assert [driver.driver_id for driver in nearest] == [1, 2]
+        assert nearest[0].distance_km == pytest.approx(13700, rel=0.01)
+
+    def test_moves_and_removes_drivers(self):
+        index = self.make_index()
+        now = timezone.now()
+        index.update(1, 14.5995, 120.9842, now)
+        index.update(2, 14.6, 120.99, now)
+
+        index.update(1, 10.3157, 123.8854, now + timedelta(seconds=1))
+        index.update(2, 14.6, 120.99, now + timedelta(seconds=1), False)
+        # Older than the location it already has
+        index.update(1, 14.5995, 120.9842, now)
+
+        nearest = index.nearest(14.5995, 120.9842, 5)
+        assert [driver.driver_id for driver in nearest] == [1]
+        assert nearest[0].latitude == 10.3157
+        assert len(index) == 1
+        assert len(index.cells) == 1
+
+    def test_skips_drivers_who_stopped_reporting(self):
+        index = self.make_index()
+        now = timezone.now()
+        index.update(1, 14.5995, 120.9842, now - timedelta(seconds=301))
+        index.update(2, 14.7, 121.0, now)
+
+        nearest = index.nearest(14.5995, 120.9842, 5)
+
+        assert [driver.driver_id for driver in nearest] == [2]
+
+
+@pytest.mark.django_db
+class TestDriverIndexSync:
+    def test_reads_the_locations_written_elsewhere(self, driver, rider):
+        index = DriverIndex(ttl_seconds=300, sync_seconds=60)
+        now = timezone.now()
+        DriverLocation.objects.create(
+            driver=driver, latitude=14.5995, longitude=120.9842
+        )
+        DriverLocation.objects.create(
+            driver=rider,
+            latitude=14.6,
+            longitude=120.99,
+            updated_at=now - timedelta(hours=1),
+            received_at=now - timedelta(hours=1),
+        )
+        index.sync()
+        assert [d.driver_id for d in index.nearest(14.6, 121, 5)] == [
+            driver.id
+        ]
+
+        now = timezone.now()
+        DriverLocation.objects.filter(driver=driver).update(
+            is_available=False, updated_at=now, received_at=now
+        )
+        # Not yet due
+        index.sync()
+        assert len(index) == 1
+        index.sync(force=True)
+        assert len(index) == 0
+
+    def test_reads_pings_written_long_after_they_were_recorded(self, driver):
+        index = DriverIndex(ttl_seconds=300, sync_seconds=60)
+        index.sync()
+
+        recorded_at = timezone.now() - timedelta(seconds=20)
+        write_pings([Ping(driver.id, 14.5995, 120.9842, recorded_at, True)])
+        index.sync(force=True)
+
+        nearest = index.nearest(14.6, 121, 5)
+        assert [d.driver_id for d in nearest] == [driver.id]
+        assert nearest[0].updated_at == recorded_at
+
+
+@pytest.mark.django_db
+class TestDriversAPI:
+    locations_url = "/drivers/locations/"
+    nearest_url = "/drivers/nearest/"
+
+    @pytest.fixture
+    def drivers(self):
+        return [
+            User.objects.create_user(
+                username=f"driver{index}",
+                password="pass",
+                email=f"driver{index}@example.com",
+            )
+            for index in range(3)
+        ]
+
+    def test_reports_and_finds_drivers(self, authenticated_client, drivers):
+        for index, driver in enumerate(drivers):
+            response = authenticated_client.post(
+                self.locations_url,
+                {
+                    "driver": driver.id,
+                    "latitude": 14.5995 + index / 100,
+                    "longitude": 120.9842,
+                },
+                format="json",
+            )
+            assert response.status_code == 200
+        # Reporting again updates the same location
+        response = authenticated_client.post(
+            self.locations_url,
+            {
+                "driver": drivers[0].id,
+                "latitude": 14.7,
+                "longitude": 120.9842,
+            },
+            format="json",
+        )
+        assert response.data["latitude"] == 14.7
+        assert DriverLocation.objects.count() == 3
+
+        response = authenticated_client.get(
+            self.nearest_url, {"lat": 14.5995, "lon": 120.9842, "k": 2}
+        )
+
+        assert response.status_code == 200
+        results = response.data["results"]
+        assert [result["driver_id"] for result in results] == [
+            drivers[1].id,
+            drivers[2].id,
+        ]
+        assert results[0]["distance_km"] == pytest.approx(1.112, abs=0.001)
+
+    def test_nearest_does_not_query(self, authenticated_client, drivers):
+        for driver in drivers:
+            DriverLocation.objects.create(
+                driver=driver, latitude=14.5995, longitude=120.9842
+            )
+        authenticated_client.get(self.nearest_url, {"lat": 14, "lon": 121})
+
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get(
+                self.nearest_url, {"lat": 14, "lon": 121}
+            )
+
+        assert len(response.data["results"]) == 3
+        assert not [
+            query
+            for query in context.captured_queries
+            if "rideshare_driverlocation" in query["sql"]
+        ]
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"lat": 14},
+            {"lat": "north", "lon": 121},
+            {"lat": 91, "lon": 121},
+            {"lat": 14, "lon": 121, "k": 0},
+            {"lat": 14, "lon": 121, "k": 51},
+        ],
+    )
+    def test_nearest_validates_params(self, authenticated_client, params):
+        response = authenticated_client.get(self.nearest_url, params)
+        assert response.status_code == 400
+
+    def test_rejects_invalid_locations(self, authenticated_client, driver):
+        response = authenticated_client.post(
+            self.locations_url,
+            {"driver": driver.id, "latitude": 100, "longitude": 120},
+            format="json",
+        )
+        assert response.status_code == 400
+
+    def test_requires_admin(self, api_client, driver):
+        api_client.force_authenticate(user=driver)
+        response = api_client.get(self.nearest_url, {"lat": 14, "lon": 121})
+        assert response.status_code == 403
+
+
+class TestPingBuffer:
+    def test_keeps_the_latest_ping_of_each_driver(self):
+        ping_buffer = PingBuffer(max_size=10, flush_seconds=60)
+        now = timezone.now()
+        earlier = now - timedelta(seconds=5)
+
+        assert ping_buffer.add(
+            [
+                Ping(1, 14.0, 121.0, earlier, True),
+                Ping(1, 14.1, 121.0, now, True),
+                # Arrived late
+                Ping(1, 14.2, 121.0, earlier, True),
+                Ping(2, 10.0, 123.0, now, True),
+            ]
+        )
+
+        assert ping_buffer.pending[1].latitude == 14.1
+        stats = ping_buffer.get_stats()
+        assert stats["queue_depth"] == 2
+        assert stats["received"] == 4
+        assert stats["coalesced"] == 2
+
+    def test_turns_away_batches_once_full(self):
+        ping_buffer = PingBuffer(max_size=2, flush_seconds=60)
+        now = timezone.now()
+        ping_buffer.add([Ping(1, 14, 121, now, True)])
+
+        assert not ping_buffer.add(
+            [Ping(2, 14, 121, now, True), Ping(3, 14, 121, now, True)]
+        )
+        # Drivers already waiting always fit
+        assert ping_buffer.add(
+            [Ping(1, 15, 121, now, True), Ping(2, 14, 121, now, True)]
+        )
+        stats = ping_buffer.get_stats()
+        assert stats["rejected"] == 2
+        assert stats["queue_depth"] == 2
+
+    @pytest.mark.django_db
+    def test_flush_upserts_in_one_query(self, driver, rider, driver_index):
+        ping_buffer = PingBuffer(max_size=10, flush_seconds=60)
+        now = timezone.now()
+        DriverLocation.objects.create(
+            driver=driver,
+            latitude=0,
+            longitude=0,
+            updated_at=now - timedelta(hours=1),
+        )
+        ping_buffer.add(
+            [
+                Ping(driver.id, 14.5995, 120.9842, now, True),
+                Ping(rider.id, 10.3157, 123.8854, now, False),
+            ]
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            assert ping_buffer.flush() == 2
+
+        writes = [
+            query
+            for query in context.captured_queries
+            if "rideshare_driverlocation" in query["sql"]
+        ]
+        assert len(writes) == 1
+        assert "ON CONFLICT" in writes[0]["sql"]
+        location = DriverLocation.objects.get(driver=driver)
+        assert (location.latitude, location.longitude) == (14.5995, 120.9842)
+        assert not DriverLocation.objects.get(driver=rider).is_available
+        assert [d.driver_id for d in driver_index.nearest(14, 121, 5)] == [
+            driver.id
+        ]
+        assert ping_buffer.get_stats()["queue_depth"] == 0
+        assert ping_buffer.get_stats()["flushes"] == 1
+
+
+@pytest.mark.django_db
+class TestDriverPingsAPI:
+    url = "/drivers/pings/"
+
+    def test_takes_in_a_batch(self, authenticated_client, driver, rider):
+        response = authenticated_client.post(
+            self.url,
+            [
+                {"driver": driver.id, "latitude": 14.5, "longitude": 121},
+                {"driver": driver.id, "latitude": 14.6, "longitude": 121},
+                {"driver": rider.id, "latitude": 10.3, "longitude": 123.9},
+            ],
+            format="json",
+        )
+
+        assert response.status_code == 202
+        assert response.data == {"accepted": 3, "errors": []}
+        # Written right away, the tests' ping buffers don't wait to flush
+        assert DriverLocation.objects.get(driver=driver).latitude == 14.6
+        assert DriverLocation.objects.count() == 2
+
+        response = authenticated_client.get(self.url + "stats/")
+        assert response.data["received"] == 3
+        assert response.data["coalesced"] == 1
+        assert response.data["flushed"] == 2
+
+    def test_reports_invalid_pings(self, authenticated_client, driver):
+        response = authenticated_client.post(
+            self.url,
+            [
+                {"driver": driver.id, "latitude": 14.5, "longitude": 121},
+                {"driver": driver.id, "latitude": 91, "longitude": 121},
+                {"driver": 999, "latitude": 14.5, "longitude": 121},
+            ],
+            format="json",
+        )
+
+        assert response.status_code == 207
+        assert response.data["accepted"] == 1
+        assert [error["index"] for error in response.data["errors"]] == [1, 2]
+
+    def test_holds_back_future_pings(self, authenticated_client, driver):
+        authenticated_client.post(
+            self.url,
+            [
+                {
+                    "driver": driver.id,
+                    "latitude": 14.5,
+                    "longitude": 121,
+                    "recorded_at": "2999-01-01T00:00:00Z",
+                }
+            ],
+            format="json",
+        )
+
+        location = DriverLocation.objects.get(driver=driver)
+        assert location.updated_at <= timezone.now()
+
+    def test_pushes_back_when_full(
+        self, authenticated_client, ping_buffer, driver, rider
+    ):
+        ping_buffer.flush_seconds = 2
+        ping_buffer.max_size = 1
+        ping_buffer.add([Ping(rider.id, 14, 121, timezone.now(), True)])
+
+        response = authenticated_client.post(
+            self.url,
+            [{"driver": driver.id, "latitude": 14.5, "longitude": 121}],
+            format="json",
+        )
+
+        assert response.status_code == 503
+        assert response["Retry-After"] == "2"
+        assert not DriverLocation.objects.exists()
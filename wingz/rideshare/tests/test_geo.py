@@ -0,0 +1,65 @@
+import pytest
+from rideshare.geo import (
+    GRID_COLUMNS,
+    get_bounding_box,
+    get_cell_ranges,
+    get_grid_cell,
+    haversine_km,
+)
+
+
+class TestGeo:
+    def test_haversine_matches_known_distance(self):
+        """Cebu City to Manila is roughly 570 km"""
+        distance = haversine_km(10.3157, 123.8854, 14.5995, 120.9842)
+        assert distance == pytest.approx(571, abs=5)
+
+    @pytest.mark.parametrize(
+        "latitude, longitude, radius_km",
+        [
+            (10.3168, 123.8906, 5),
+            (10.3168, 123.8906, 300),
+            (0.0, 179.98, 20),
+            (0.0, -179.98, 20),
+            (89.9, 0.0, 50),
+        ],
+    )
+    def test_cell_ranges_cover_points_within_radius(
+        self, latitude, longitude, radius_km
+    ):
+        """Every point inside the radius lies in one of the cell ranges"""
+
+        cell_ranges = get_cell_ranges(latitude, longitude, radius_km)
+
+        for step in range(-10, 11):
+            for other_step in range(-10, 11):
+                point_latitude = latitude + step * radius_km / 1200
+                point_longitude = longitude + other_step * radius_km / 1200
+                point_longitude = (point_longitude + 180) % 360 - 180
+                if not -90 <= point_latitude <= 90:
+                    continue
+                distance = haversine_km(
+                    latitude, longitude, point_latitude, point_longitude
+                )
+                if distance > radius_km:
+                    continue
+
+                cell = get_grid_cell(point_latitude, point_longitude)
+                assert any(low <= cell <= high for low, high in cell_ranges)
+
+    def test_bounding_box_splits_on_antimeridian(self):
+        """A box crossing the antimeridian has two longitude ranges"""
+        _, _, longitude_ranges = get_bounding_box(0.0, 179.98, 20)
+
+        assert len(longitude_ranges) == 2
+        assert longitude_ranges[0][1] == 180.0
+        assert longitude_ranges[1][0] == -180.0
+
+    def test_cell_ranges_fall_back_to_row_band(self):
+        """Large radii use whole grid rows instead of many small ranges"""
+        cell_ranges = get_cell_ranges(10.3168, 123.8906, 1000)
+
+        assert len(cell_ranges) == 1
+        low, high = cell_ranges[0]
+        assert low % GRID_COLUMNS == 0
+        assert (high + 1) % GRID_COLUMNS == 0
@@ -0,0 +1,143 @@
+import re
+
+import pytest
+from rideshare.metrics import RequestMetrics, get_request_metrics, timed
+
+
+def get_sample(text: str, name: str, **labels: str) -> float:
+    """Value of the sample of the metric with exactly the given labels"""
+    rendered = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(
+        rf"^{re.escape(f'{name}{{{rendered}}}')} (\S+)$", text, re.MULTILINE
+    )
+    assert match, f"No {name}{{{rendered}}} in:\n{text}"
+    return float(match.group(1))
+
+
+def test_renders_the_histogram():
+    metrics = RequestMetrics(sample_rate=1)
+    metrics.record("GET", "rides/", 200, 0.02, {"active": set()})
+    metrics.record("GET", "rides/", 200, 0.3, None)
+    metrics.record("GET", "rides/", 400, 20, None)
+    metrics.record("GET", 'say "hi"\\', 200, 0.001, None)
+
+    text = metrics.render()
+
+    labels = {"method": "GET", "endpoint": "rides/"}
+    bucket = "wingz_http_request_duration_seconds_bucket"
+    assert get_sample(text, bucket, **labels, le="0.01") == 0
+    assert get_sample(text, bucket, **labels, le="0.025") == 1
+    assert get_sample(text, bucket, **labels, le="0.5") == 2
+    assert get_sample(text, bucket, **labels, le="10.0") == 2
+    assert get_sample(text, bucket, **labels, le="+Inf") == 3
+    assert get_sample(
+        text, "wingz_http_request_duration_seconds_sum", **labels
+    ) == pytest.approx(20.32)
+    assert get_sample(text, "wingz_sampled_requests_total", **labels) == 1
+    assert (
+        get_sample(text, "wingz_http_requests_total", **labels, status="400")
+        == 1
+    )
+    assert 'endpoint="say \\"hi\\"\\\\"' in text
+
+
+def test_timed_only_counts_sampled_requests():
+    with timed("serialize"):
+        pass
+
+    assert get_request_metrics().endpoints == {}
+
+
+@pytest.mark.django_db
+class TestMetricsMiddleware:
+    url = "/metrics/"
+    params = {"lat": 10.31445, "lon": 123.9781}
+
+    def test_breaks_down_every_endpoint(
+        self, authenticated_client, ride, ride_event
+    ):
+        authenticated_client.get("/rides/", self.params)
+        authenticated_client.get("/rides/", {**self.params, "page_size": 1})
+        authenticated_client.get(f"/rides/{ride.id}/", self.params)
+        authenticated_client.get("/nowhere/")
+
+        response = authenticated_client.get(self.url)
+
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+        text = response.content.decode()
+        rides = {"method": "GET", "endpoint": "rides/"}
+        assert (
+            get_sample(
+                text, "wingz_http_requests_total", **rides, status="200"
+            )
+            == 2
+        )
+        assert get_sample(text, "wingz_db_queries_total", **rides) >= 2
+        assert (
+            get_sample(text, "wingz_db_query_duration_seconds_total", **rides)
+            > 0
+        )
+        assert (
+            get_sample(
+                text, "wingz_serializer_duration_seconds_total", **rides
+            )
+            > 0
+        )
+        assert (
+            get_sample(
+                text,
+                "wingz_http_requests_total",
+                method="GET",
+                endpoint="rides/<int:pk>/",
+                status="200",
+            )
+            == 1
+        )
+        assert (
+            get_sample(
+                text,
+                "wingz_http_requests_total",
+                method="GET",
+                endpoint="<unmatched>",
+                status="404",
+            )
+            == 1
+        )
+
+    def test_counts_the_queries_of_async_views(self, token_client, ride):
+        token_client.get("/async/rides/", self.params)
+
+        text = get_request_metrics().render()
+        assert (
+            get_sample(
+                text,
+                "wingz_db_queries_total",
+                method="GET",
+                endpoint="async/rides/",
+            )
+            >= 2
+        )
+
+    def test_samples(self, authenticated_client, settings, ride):
+        settings.METRICS_SAMPLE_RATE = 0
+        authenticated_client.get("/rides/", self.params)
+
+        text = get_request_metrics().render()
+        rides = {"method": "GET", "endpoint": "rides/"}
+        assert (
+            get_sample(
+                text, "wingz_http_requests_total", **rides, status="200"
+            )
+            == 1
+        )
+        assert get_sample(text, "wingz_sampled_requests_total", **rides) == 0
+        assert get_sample(text, "wingz_db_queries_total", **rides) == 0
+
+    def test_requires_admin(self, api_client, rider):
+        response = api_client.get(self.url)
+        assert response.status_code == 401
+
+        api_client.force_authenticate(user=rider)
+        response = api_client.get(self.url)
+        assert response.status_code == 403
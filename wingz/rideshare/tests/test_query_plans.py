@@ -0,0 +1,101 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rideshare.models import Ride, RideEvent
+from rideshare.views.rides import RideViewSet
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != "sqlite", reason="EXPLAIN QUERY PLAN is SQLite's"
+)
+
+
+def explain(sql: str) -> str:
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return "\n".join(row[-1] for row in cursor.fetchall())
+
+
+def get_list_query_plans(query_params: dict) -> list[str]:
+    """Query plans of every query run to list rides, in order"""
+
+    view = RideViewSet()
+    queryset = Ride.objects.select_related("rider").select_related("driver")
+    queryset = view.apply_filter_on_status(queryset, query_params)
+    queryset = view.apply_filter_on_email(queryset, query_params)
+    queryset = view.apply_distance_annotation(queryset, query_params)
+    queryset = view.apply_radius_filter(queryset, query_params)
+    queryset = view.apply_sort_key(queryset, query_params)
+    queryset = view.apply_prefetch_on_ride_events(queryset)
+
+    with CaptureQueriesContext(connection) as context:
+        list(queryset)
+
+    # Silk may run its own EXPLAIN on the queries, those are left out
+    return [
+        explain(query["sql"])
+        for query in context.captured_queries
+        if not query["sql"].startswith("EXPLAIN")
+    ]
+
+
+@pytest.mark.django_db
+class TestListQueryPlans:
+    @pytest.fixture(autouse=True)
+    def setup_rides(self, ride, ride_event):
+        """One ride, with one event that falls in the past 24 hours"""
+        ride_event.created_at = timezone.now()
+        ride_event.save()
+
+    @pytest.mark.parametrize(
+        "query_params, expected_index",
+        [
+            ({}, "ride_pickup_time_idx"),
+            ({"status": "init"}, "ride_status_pickup_time_idx"),
+        ],
+    )
+    def test_pickup_time_sort_is_served_by_index(
+        self, query_params, expected_index
+    ):
+        """Rides come out of the index already in pickup_time order"""
+        plans = get_list_query_plans({"lat": 10, "lon": 120, **query_params})
+
+        assert expected_index in plans[0]
+        assert "TEMP B-TREE" not in plans[0]
+
+    def test_status_filter_with_distance_sort_uses_index(self):
+        plans = get_list_query_plans(
+            {"lat": 10, "lon": 120, "status": "init", "sort_by": "distance"}
+        )
+
+        assert "ride_status_pickup_time_idx" in plans[0]
+
+    def test_email_filter_uses_lowercased_email_index(self, rider):
+        plans = get_list_query_plans(
+            {"lat": 10, "lon": 120, "email": rider.email.upper()}
+        )
+
+        assert "user_email_lower_idx" in plans[0]
+        assert "ride_rider_pickup_time_idx" in plans[0]
+
+    def test_radius_filter_uses_grid_cell_index(self):
+        plans = get_list_query_plans(
+            {"lat": 10, "lon": 120, "radius_km": 50, "sort_by": "distance"}
+        )
+
+        assert "pickup_grid_cell" in plans[0]
+        assert "SCAN rideshare_ride" not in plans[0]
+
+    def test_todays_ride_events_prefetch_uses_index(self):
+        plans = get_list_query_plans({"lat": 10, "lon": 120})
+
+        assert len(plans) == 2
+        assert "rideevent_ride_created_at_idx" in plans[1]
+
+    def test_ride_event_list_uses_index(self):
+        queryset = RideEvent.objects.all().order_by("created_at")
+
+        plan = explain(str(queryset[:10].query))
+
+        assert "rideevent_created_at_idx" in plan
+        assert "TEMP B-TREE" not in plan
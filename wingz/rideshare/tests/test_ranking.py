@@ -0,0 +1,181 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rideshare import ranking
+from rideshare.enums import RideStatusChoices
+from rideshare.geo import get_grid_cell, haversine_km
+from rideshare.models import Ride
+
+LAT, LON = 14.5995, 120.9842
+
+
+@pytest.fixture(params=["numpy", "python"])
+def vectorized(request, settings, monkeypatch):
+    """The vectorized engine, with NumPy and with its pure Python fallback"""
+    if request.param == "numpy" and ranking.np is None:
+        pytest.skip("NumPy is not installed")
+    if request.param == "python":
+        monkeypatch.setattr(ranking, "np", None)
+    settings.RIDE_DISTANCE_ENGINE = ranking.VECTORIZED
+    return request.param
+
+
+@pytest.fixture
+def rides(rider, driver):
+    rng = random.Random(0)
+    pickup_time = datetime(2025, 3, 1, 0, 0, 0, 0, pytz.UTC)
+    coordinates = [
+        (LAT + rng.gauss(0, 0.3), LON + rng.gauss(0, 0.3)) for _ in range(40)
+    ]
+    # Ties on the distance are broken on the id
+    coordinates += [(LAT + 0.01, LON)] * 5
+    # Far enough to be left out of the first rings searched
+    coordinates += [(10.3157, 123.8854)] * 3
+    return Ride.objects.bulk_create(
+        Ride(
+            status=(
+                RideStatusChoices.DROPOFF
+                if index % 3
+                else RideStatusChoices.INIT
+            ),
+            rider=rider,
+            driver=driver,
+            pickup_latitude=latitude,
+            pickup_longitude=longitude,
+            pickup_time=pickup_time + timedelta(minutes=index),
+            pickup_grid_cell=get_grid_cell(latitude, longitude),
+        )
+        for index, (latitude, longitude) in enumerate(coordinates)
+    )
+
+
+def test_compute_distances(monkeypatch):
+    coordinates = [(10.3157, 123.8854), (LAT, LON), (-33.8688, 151.2093)]
+    expected = [haversine_km(LAT, LON, *pair) for pair in coordinates]
+    latitudes, longitudes = zip(*coordinates)
+
+    if ranking.np is not None:
+        distances = ranking.compute_distances(
+            LAT, LON, ranking.np.array(latitudes), ranking.np.array(longitudes)
+        )
+        assert list(distances) == pytest.approx(expected)
+    monkeypatch.setattr(ranking, "np", None)
+    distances = ranking.compute_distances(LAT, LON, latitudes, longitudes)
+    assert distances == pytest.approx(expected)
+
+
+@pytest.mark.django_db
+class TestVectorizedEngine:
+    url = "/rides/"
+
+    def list_rides(self, client, settings, engine: str, params: dict):
+        settings.RIDE_DISTANCE_ENGINE = engine
+        response = client.get(
+            self.url,
+            {"lat": LAT, "lon": LON, "sort_by": "distance", **params},
+        )
+        assert response.status_code == 200
+        return response.data
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {},
+            {"page": "2", "page_size": "7"},
+            {"page_size": "50"},
+            {"radius_km": "20"},
+            {"radius_km": "50", "status": RideStatusChoices.DROPOFF},
+        ],
+    )
+    def test_lists_the_same_page_as_sql(
+        self, authenticated_client, settings, vectorized, rides, params
+    ):
+        ranked = self.list_rides(
+            authenticated_client, settings, ranking.VECTORIZED, params
+        )
+        expected = self.list_rides(
+            authenticated_client, settings, ranking.SQL, params
+        )
+
+        assert ranked["count"] == expected["count"]
+        assert [ride["id"] for ride in ranked["results"]] == [
+            ride["id"] for ride in expected["results"]
+        ]
+        assert [ride["distance"] for ride in ranked["results"]] == (
+            pytest.approx([ride["distance"] for ride in expected["results"]])
+        )
+
+    def test_walks_every_cursor_page(
+        self, authenticated_client, settings, vectorized, rides
+    ):
+        seen = []
+        params = {"pagination": "cursor", "page_size": "4"}
+        while True:
+            page = self.list_rides(
+                authenticated_client, settings, ranking.VECTORIZED, params
+            )
+            seen += [
+                (ride["distance"], ride["id"]) for ride in page["results"]
+            ]
+            if page["next"] is None:
+                break
+            params["cursor"] = page["next"].split("cursor=")[1].split("&")[0]
+
+        assert len(seen) == len(rides)
+        assert seen == sorted(seen)
+
+    def test_cursor_pages_skip_count(
+        self, authenticated_client, settings, vectorized, rides
+    ):
+        """The count query only runs when the client asks for it"""
+        params = {"pagination": "cursor", "page_size": "4"}
+
+        with CaptureQueriesContext(connection) as context:
+            page = self.list_rides(
+                authenticated_client, settings, ranking.VECTORIZED, params
+            )
+        assert "count" not in page
+        assert not any(
+            "COUNT(" in query["sql"] for query in context.captured_queries
+        )
+
+        page = self.list_rides(
+            authenticated_client,
+            settings,
+            ranking.VECTORIZED,
+            {**params, "with_count": "true"},
+        )
+        assert page["count"] == len(rides)
+
+    def test_exports_in_order(
+        self, authenticated_client, settings, vectorized, rides
+    ):
+        settings.RIDE_DISTANCE_ENGINE = ranking.VECTORIZED
+        response = authenticated_client.get(
+            "/rides/export/",
+            {"lat": LAT, "lon": LON, "sort_by": "distance"},
+        )
+
+        lines = b"".join(response.streaming_content).splitlines()
+        exported = [json.loads(line) for line in lines]
+        assert len(exported) == len(rides)
+        assert [(ride["distance"], ride["id"]) for ride in exported] == sorted(
+            (ride["distance"], ride["id"]) for ride in exported
+        )
+
+    def test_sorting_by_pickup_time_stays_in_sql(
+        self, authenticated_client, settings, rides
+    ):
+        page = self.list_rides(
+            authenticated_client,
+            settings,
+            ranking.VECTORIZED,
+            {"sort_by": "pickup_time", "radius_km": "20"},
+        )
+        pickup_times = [ride["pickup_time"] for ride in page["results"]]
+        assert pickup_times == sorted(pickup_times)
@@ -0,0 +1,54 @@
+import io
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+import pytz
+from phonenumber_field.phonenumber import PhoneNumber
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rideshare.management.commands.benchmark_renderers import build_ride_page
+from rideshare.parsers import ORJSONParser
+from rideshare.renderers import ORJSONRenderer
+from rideshare.serializers import RideComplexSerializer
+
+
+class TestORJSONRenderer:
+    def test_ride_list_page_matches_json_renderer(self):
+        """Rendering a ride list page gives the same bytes as DRF's"""
+        rides = build_ride_page(rides=5, events_per_ride=2)
+        data = {"results": RideComplexSerializer(rides, many=True).data}
+
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_renders_native_types(self):
+        data = {
+            "created_at": datetime(2025, 3, 1, 0, 0, 1, 0, pytz.UTC),
+            "fare": Decimal("12.50"),
+            "phone_number": PhoneNumber.from_string("+639231234567"),
+        }
+
+        assert ORJSONRenderer().render(data) == (
+            b'{"created_at":"2025-03-01T00:00:01Z","fare":12.5,'
+            b'"phone_number":"+639231234567"}'
+        )
+
+    def test_indent(self):
+        content = ORJSONRenderer().render(
+            {"id": 1}, "application/json; indent=4"
+        )
+        assert content == b'{\n  "id": 1\n}'
+
+
+class TestORJSONParser:
+    def test_parse(self):
+        stream = io.BytesIO(b'{"ride": 1, "description": "Ride started"}')
+
+        assert ORJSONParser().parse(stream) == {
+            "ride": 1,
+            "description": "Ride started",
+        }
+
+    def test_parse_error(self):
+        with pytest.raises(ParseError, match="JSON parse error"):
+            ORJSONParser().parse(io.BytesIO(b'{"ride": '))
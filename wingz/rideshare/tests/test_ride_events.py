@@ -1,5 +1,13 @@
+from datetime import timedelta
+from io import StringIO
+
 import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+from rideshare.models import RideEvent, RideEventArchive
+from rideshare.summaries import refresh_event_summaries
 
 
 @pytest.mark.django_db
@@ -20,3 +28,257 @@ class TestRideEvents:
         response = client.post("/ride-events/", payload, format="json")
         assert response.status_code == 201
         assert response.data["description"] == "Passenger picked up"
+
+    def test_writes_refresh_the_ride_summary(self, authenticated_client, ride):
+        client = authenticated_client
+        created_at = timezone.now()
+        response = client.post(
+            "/ride-events/",
+            {
+                "ride": ride.id,
+                "description": "Ride started",
+                "created_at": created_at,
+            },
+            format="json",
+        )
+        ride.refresh_from_db()
+        assert ride.last_event_at == created_at
+        assert ride.last_event_description == "Ride started"
+        assert ride.recent_events == [response.data]
+
+        url = f"/ride-events/{response.data['id']}/"
+        client.patch(url, {"description": "Ride resumed"}, format="json")
+        ride.refresh_from_db()
+        assert ride.last_event_description == "Ride resumed"
+        assert ride.recent_events[0]["description"] == "Ride resumed"
+
+        client.delete(url)
+        ride.refresh_from_db()
+        assert ride.last_event_at is None
+        assert ride.recent_events == []
+
+    def test_repair_event_summaries(self, ride):
+        """Ride events written outside the API are picked up by the repair
+        command
+        """
+        RideEvent.objects.create(
+            ride=ride, description="Ride started", created_at=timezone.now()
+        )
+
+        out = StringIO()
+        call_command("repair_event_summaries", stdout=out)
+        assert "Repaired 1 of 1 rides" in out.getvalue()
+        ride.refresh_from_db()
+        assert ride.last_event_description == "Ride started"
+        assert len(ride.recent_events) == 1
+
+        out = StringIO()
+        call_command("repair_event_summaries", stdout=out)
+        assert "Repaired 0 of 1 rides" in out.getvalue()
+
+    def test_bulk_create_ride_events(self, authenticated_client, ride):
+        """Every event is written, with one query to check their rides"""
+        payload = [
+            {
+                "ride": ride.id,
+                "description": f"Status changed to {status}",
+                "created_at": "2025-03-01T14:31:00Z",
+            }
+            for status in ("pickup", "enroute", "dropoff")
+        ]
+
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.post(
+                "/ride-events/bulk/", payload, format="json"
+            )
+
+        assert response.status_code == 201
+        assert len(response.data["created"]) == 3
+        assert not response.data["errors"]
+        assert RideEvent.objects.filter(ride=ride).count() == 3
+
+        ride_queries = [
+            query
+            for query in context.captured_queries
+            if query["sql"].startswith('SELECT "rideshare_ride"')
+        ]
+        assert len(ride_queries) == 1
+
+    def test_bulk_reports_errors_per_item(
+        self, authenticated_client, ride, ride_event
+    ):
+        """Invalid items are reported, the valid ones are still written"""
+        payload = [
+            {"id": ride_event.id, "description": "Ride resumed"},
+            {"ride": ride.id, "description": "No timestamp"},
+            {
+                "ride": 404,
+                "description": "Unknown ride",
+                "created_at": "2025-03-01T14:31:00Z",
+            },
+            {
+                "ride": ride.id,
+                "description": "Ride ended",
+                "created_at": "2025-03-01T14:32:00Z",
+            },
+            {"id": 404, "description": "Unknown event"},
+            "not an event",
+        ]
+
+        response = authenticated_client.post(
+            "/ride-events/bulk/", payload, format="json"
+        )
+
+        assert response.status_code == 207
+        assert [item["description"] for item in response.data["created"]] == [
+            "Ride ended"
+        ]
+        assert [item["description"] for item in response.data["updated"]] == [
+            "Ride resumed"
+        ]
+        errors = {
+            item["index"]: item["errors"] for item in response.data["errors"]
+        }
+        assert set(errors) == {1, 2, 4, 5}
+        assert "created_at" in errors[1]
+        assert "ride" in errors[2]
+        assert "id" in errors[4]
+
+        ride_event.refresh_from_db()
+        assert ride_event.description == "Ride resumed"
+
+    def test_bulk_rejects_everything_invalid(self, authenticated_client):
+        response = authenticated_client.post(
+            "/ride-events/bulk/", [{"ride": "abc"}], format="json"
+        )
+        assert response.status_code == 400
+
+        response = authenticated_client.post(
+            "/ride-events/bulk/", {"ride": 1}, format="json"
+        )
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestRideEventArchive:
+
+    @pytest.fixture
+    def hot_ride_event(self, ride):
+        return RideEvent.objects.create(
+            ride=ride,
+            description="Status changed to pickup",
+            created_at=timezone.now(),
+        )
+
+    @pytest.fixture
+    def archived_ride_event(self, ride, hot_ride_event):
+        """A ride event that the archive command has moved"""
+        old_ride_event = RideEvent.objects.create(
+            ride=ride,
+            description="Status changed to dropoff",
+            created_at=timezone.now() - timedelta(days=30),
+        )
+        call_command("archive_ride_events", stdout=StringIO())
+        return RideEventArchive.objects.get(id=old_ride_event.id)
+
+    def test_archive_moves_old_ride_events_only(
+        self, ride, hot_ride_event, archived_ride_event
+    ):
+        assert archived_ride_event.ride_id == ride.id
+        assert list(RideEvent.objects.values_list("id", flat=True)) == [
+            hot_ride_event.id
+        ]
+
+    def test_archive_keeps_edits_made_since_an_earlier_run(self, ride):
+        old_ride_event = RideEvent.objects.create(
+            ride=ride,
+            description="Status changed to dropoff",
+            created_at=timezone.now() - timedelta(days=30),
+        )
+        # Copied by a run that stopped before deleting it from the hot table
+        RideEventArchive.objects.create(
+            id=old_ride_event.id,
+            ride=ride,
+            description="Status changed to pickup",
+            created_at=old_ride_event.created_at,
+        )
+
+        call_command("archive_ride_events", stdout=StringIO())
+
+        assert not RideEvent.objects.exists()
+        archived = RideEventArchive.objects.get(id=old_ride_event.id)
+        assert archived.description == "Status changed to dropoff"
+
+    def test_summary_falls_back_to_the_archive(self, ride):
+        RideEvent.objects.create(
+            ride=ride,
+            description="Status changed to dropoff",
+            created_at=timezone.now() - timedelta(days=30),
+        )
+        call_command("archive_ride_events", stdout=StringIO())
+
+        refresh_event_summaries([ride.id])
+
+        ride.refresh_from_db()
+        assert ride.last_event_description == "Status changed to dropoff"
+        assert ride.recent_events == []
+
+    def test_list_reads_both_tiers(
+        self, authenticated_client, hot_ride_event, archived_ride_event
+    ):
+        response = authenticated_client.get("/ride-events/")
+
+        assert response.status_code == 200
+        assert [item["id"] for item in response.data["results"]] == [
+            archived_ride_event.id,
+            hot_ride_event.id,
+        ]
+
+    def test_recent_since_reads_hot_table_only(
+        self, authenticated_client, hot_ride_event, archived_ride_event
+    ):
+        since = (timezone.now() - timedelta(hours=1)).isoformat()
+
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get(
+                "/ride-events/", {"since": since}
+            )
+
+        assert response.status_code == 200
+        assert [item["id"] for item in response.data["results"]] == [
+            hot_ride_event.id
+        ]
+        assert not any(
+            "rideshare_rideeventarchive" in query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith("SELECT")
+        )
+
+    def test_updating_archived_ride_event_changes_the_list(
+        self, authenticated_client, archived_ride_event
+    ):
+        etag = authenticated_client.get("/ride-events/")["ETag"]
+
+        authenticated_client.patch(
+            f"/ride-events/{archived_ride_event.id}/",
+            {"description": "Ride ended"},
+            format="json",
+        )
+        response = authenticated_client.get(
+            "/ride-events/", HTTP_IF_NONE_MATCH=etag
+        )
+
+        assert response.status_code == 200
+        assert "Ride ended" in [
+            item["description"] for item in response.data["results"]
+        ]
+
+    def test_retrieve_archived_ride_event(
+        self, authenticated_client, archived_ride_event
+    ):
+        response = authenticated_client.get(
+            f"/ride-events/{archived_ride_event.id}/"
+        )
+
+        assert response.status_code == 200
+        assert response.data["description"] == "Status changed to dropoff"
@@ -1,11 +1,19 @@
+import csv
+import io
+import json
 from copy import deepcopy
 from datetime import timedelta
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError
+from rideshare.checks import check_response_cache
 from rideshare.enums import RideStatusChoices
-from rideshare.models import Ride
+from rideshare.geo import get_grid_cell
+from rideshare.models import Ride, RideEvent
+from rideshare.summaries import refresh_event_summaries
 from rideshare.views.rides import RideViewSet
 
 
@@ -28,6 +36,282 @@ class TestRidesAPI:
                 and obj["todays_ride_events"] is not None
             )
 
+    def test_get_rides_list_within_radius(self, authenticated_client, ride):
+        """Rides outside the given radius are left out of the list"""
+        response = authenticated_client.get(
+            "/rides/?lat=10.31445&lon=123.9781&radius_km=5"
+        )
+        assert response.status_code == 200
+        assert response.data["count"] == 0
+
+        response = authenticated_client.get(
+            "/rides/?lat=10.31445&lon=123.9781&radius_km=50&sort_by=distance"
+        )
+        assert response.status_code == 200
+        assert response.data["count"] == 1
+        assert response.data["results"][0]["distance"] <= 50
+
+    def test_get_rides_list_counts_every_ride_sorted_by_distance(
+        self, authenticated_client, ride
+    ):
+        """The rings of grid cells searched for the nearest rides don't
+        change the count, whichever page they stop at
+        """
+        for index in range(1, 6):
+            other_ride = deepcopy(ride)
+            other_ride.pk = None
+            other_ride.pickup_latitude += index / 10
+            other_ride.save()
+
+        params = "lat=10.31445&lon=123.9781&sort_by=distance&page_size=1"
+        for page in (1, 3, 6):
+            response = authenticated_client.get(
+                f"/rides/?{params}&page={page}"
+            )
+            assert response.status_code == 200
+            assert response.data["count"] == 6
+
+        url = f"/rides/?{params}&pagination=cursor&with_count=true"
+        while url:
+            response = authenticated_client.get(url)
+            assert response.status_code == 200
+            assert response.data["count"] == 6
+            url = response.data["next"]
+
+    @pytest.mark.parametrize("sort_by", ["pickup_time", "distance"])
+    def test_get_rides_list_with_cursor(
+        self, authenticated_client, ride, sort_by
+    ):
+        """Pages fetched through cursors hold every ride exactly once"""
+
+        for offset in range(4):
+            other_ride = deepcopy(ride)
+            other_ride.pickup_latitude += offset * 0.1
+            other_ride.pickup_time += timedelta(minutes=offset % 2)
+            other_ride.pk = None
+            other_ride.save()
+
+        url = (
+            "/rides/?lat=10.31445&lon=123.9781&pagination=cursor"
+            f"&page_size=2&sort_by={sort_by}"
+        )
+        seen_ids = []
+        while url:
+            response = authenticated_client.get(url)
+            assert response.status_code == 200
+            assert "count" not in response.data
+            seen_ids.extend(obj["id"] for obj in response.data["results"])
+            url = response.data["next"]
+
+        expected = RideViewSet().apply_sort_key(
+            RideViewSet().apply_distance_annotation(
+                Ride.objects.all(), {"lat": 10.31445, "lon": 123.9781}
+            ),
+            {"sort_by": sort_by},
+        )
+        assert seen_ids == [obj.id for obj in expected]
+
+    def test_get_rides_list_with_cursor_skips_count(
+        self, authenticated_client, ride
+    ):
+        """The count query only runs when the client asks for it"""
+        url = "/rides/?lat=10.31445&lon=123.9781&pagination=cursor"
+
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get(url)
+        assert response.status_code == 200
+        assert "count" not in response.data
+        assert not any(
+            "COUNT(" in query["sql"] for query in context.captured_queries
+        )
+
+        response = authenticated_client.get(f"{url}&with_count=true")
+        assert response.data["count"] == 1
+
+    def test_get_rides_list_with_invalid_cursor(self, authenticated_client):
+        response = authenticated_client.get(
+            "/rides/?lat=10.31445&lon=123.9781&cursor=garbage"
+        )
+        assert response.status_code == 404
+
+    def test_get_rides_list_with_sparse_fields(
+        self, authenticated_client, ride, ride_event
+    ):
+        """Only the requested fields are rendered, and only the queries they
+        need are made
+        """
+
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get(
+                "/rides/?lat=10.31445&lon=123.9781"
+                "&fields=id,status,rider,distance&expand="
+            )
+
+        assert response.status_code == 200
+        result = response.data["results"][0]
+        assert list(result) == ["id", "status", "rider", "distance"]
+        assert result["rider"] == ride.rider_id
+
+        selects = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith('SELECT "rideshare_')
+        ]
+        assert not any("rideshare_rideevent" in sql for sql in selects)
+        assert not any("JOIN" in sql for sql in selects)
+        assert not any('"dropoff_latitude"' in sql for sql in selects)
+
+    def test_get_rides_list_with_expansions(
+        self, authenticated_client, ride, rider
+    ):
+        response = authenticated_client.get(
+            "/rides/?lat=10.31445&lon=123.9781&expand=rider"
+        )
+
+        assert response.status_code == 200
+        result = response.data["results"][0]
+        assert result["rider"]["email"] == rider.email
+        assert result["driver"] == ride.driver_id
+        assert "todays_ride_events" not in result
+
+    def test_get_rides_list_with_sparse_fields_and_cursor(
+        self, authenticated_client, ride
+    ):
+        """The sort key is loaded for the cursor, even if not rendered"""
+        other_ride = deepcopy(ride)
+        other_ride.pk = None
+        other_ride.save()
+
+        response = authenticated_client.get(
+            "/rides/?lat=10.31445&lon=123.9781&pagination=cursor&page_size=1"
+            "&fields=id"
+        )
+        assert response.data["results"] == [{"id": ride.id}]
+
+        response = authenticated_client.get(response.data["next"])
+        assert response.data["results"] == [{"id": other_ride.id}]
+
+    @pytest.mark.parametrize("params", ["", "&fields=id,todays_ride_events"])
+    def test_get_rides_list_in_single_query(
+        self, authenticated_client, ride, params
+    ):
+        """Today's ride events are read from the rides, and match the
+        prefetched ones
+        """
+
+        for minutes in (60 * 25, 5):
+            authenticated_client.post(
+                "/ride-events/",
+                {
+                    "ride": ride.id,
+                    "description": f"{minutes} minutes ago",
+                    "created_at": timezone.now() - timedelta(minutes=minutes),
+                },
+                format="json",
+            )
+        url = f"/rides/?lat=10.31445&lon=123.9781{params}"
+        prefetched = authenticated_client.get(url).data["results"]
+
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get(f"{url}&single_query=true")
+
+        results = response.data["results"]
+        assert results == prefetched
+        assert [
+            ride_event["description"]
+            for ride_event in results[0]["todays_ride_events"]
+        ] == ["5 minutes ago"]
+        assert not [
+            query
+            for query in context.captured_queries
+            if 'FROM "rideshare_rideevent"' in query["sql"]
+        ]
+
+    def test_single_query_reads_capped_recent_events(self, token_client, ride):
+        """Rides with more of today's ride events than `recent_events` keeps
+        render every one of them, read with one query for the whole page
+        """
+
+        rides = [ride]
+        for _ in range(2):
+            other_ride = deepcopy(ride)
+            other_ride.pk = None
+            other_ride.save()
+            rides.append(other_ride)
+        now = timezone.now()
+        RideEvent.objects.bulk_create(
+            RideEvent(
+                ride=each_ride,
+                description=f"{minutes} minutes ago",
+                created_at=now - timedelta(minutes=minutes),
+            )
+            for each_ride in rides
+            for minutes in range(Ride.RECENT_EVENTS_LIMIT + 5, 0, -1)
+        )
+        refresh_event_summaries([each_ride.id for each_ride in rides])
+        params = "lat=10.31445&lon=123.9781"
+
+        prefetched = token_client.get(f"/rides/?{params}").json()
+        params += "&single_query=true"
+        with CaptureQueriesContext(connection) as context:
+            response = token_client.get(f"/rides/?{params}")
+
+        assert response.json() == prefetched
+        assert [
+            len(result["todays_ride_events"])
+            for result in prefetched["results"]
+        ] == [Ride.RECENT_EVENTS_LIMIT + 5] * 3
+        assert (
+            len(
+                [
+                    query
+                    for query in context.captured_queries
+                    if query["sql"].startswith('SELECT "rideshare_rideevent"')
+                ]
+            )
+            == 1
+        )
+
+        response = token_client.get(f"/async/rides/?{params}")
+        assert response.json() == prefetched
+
+        response = token_client.get(f"/rides/export/?{params}")
+        lines = b"".join(response.streaming_content).splitlines()
+        assert [json.loads(line) for line in lines] == prefetched["results"]
+
+    def test_last_event_fields_are_opt_in(
+        self, authenticated_client, ride, ride_event
+    ):
+        url = "/rides/?lat=10.31445&lon=123.9781"
+        refresh_event_summaries([ride.id])
+        ride.refresh_from_db()
+        assert ride.last_event_description
+
+        result = authenticated_client.get(url).data["results"][0]
+        assert "last_event_at" not in result
+        assert "last_event_description" not in result
+
+        response = authenticated_client.get(
+            f"{url}&fields=id,last_event_description"
+        )
+        assert response.data["results"] == [
+            {
+                "id": ride.id,
+                "last_event_description": ride.last_event_description,
+            }
+        ]
+
+    @pytest.mark.parametrize(
+        "params", ["fields=id,password", "expand=rider,payments"]
+    )
+    def test_get_rides_list_with_unknown_fields(
+        self, authenticated_client, params
+    ):
+        response = authenticated_client.get(
+            f"/rides/?lat=10.31445&lon=123.9781&{params}"
+        )
+        assert response.status_code == 400
+
     def test_create_ride(self, authenticated_client, rider, driver):
         payload = {
             "status": RideStatusChoices.INIT,
@@ -101,6 +385,16 @@ class TestRidesListUtils:
         assert ride in results
         assert len(results) == 1
 
+    def test_email_filter_non_ascii_email(self, ride):
+        """Emails match whatever case their non-ASCII letters are in"""
+        ride.rider.email = "Émile@example.com"
+        ride.rider.save()
+        query_params = {"email": "ÉMILE@example.com"}
+        queryset = Ride.objects.all()
+        results = RideViewSet().apply_filter_on_email(queryset, query_params)
+
+        assert list(results) == [ride]
+
     def test_email_filter_unmatched_args(self):
         """Provided email is not a rider"""
         query_params = {"email": "unmatched@example.com"}
@@ -255,3 +549,332 @@ class TestRidesListUtils:
         assert event_today == today_event_list[0]
         assert irrelevant_event_today not in today_event_list
         assert irrelevant_event_yesterday not in today_event_list
+
+    def test_pickup_grid_cell_follows_pickup_coordinates(self, ride):
+        """The grid cell is recomputed whenever the ride is saved"""
+
+        assert ride.pickup_grid_cell == get_grid_cell(
+            ride.pickup_latitude, ride.pickup_longitude
+        )
+
+        ride.pickup_latitude, ride.pickup_longitude = -33.8688, 151.2093
+        ride.save(update_fields=["pickup_latitude", "pickup_longitude"])
+        ride.refresh_from_db()
+
+        assert ride.pickup_grid_cell == get_grid_cell(-33.8688, 151.2093)
+
+    @pytest.mark.parametrize("radius_km", ["abc", "0", "-5"])
+    def test_radius_filter_invalid_radius(self, radius_km):
+        """Provided radius_km is not a positive float"""
+        query_params = {"lat": 45, "lon": 130, "radius_km": radius_km}
+        queryset = Ride.objects.all()
+
+        with pytest.raises(ValidationError, match="radius_km must"):
+            RideViewSet().apply_radius_filter(queryset, query_params)
+
+    def test_radius_filter_excludes_farther_rides(self, ride):
+        """Only rides with a pickup inside the radius are kept"""
+
+        farther_ride = deepcopy(ride)
+        farther_ride.pickup_latitude = 14.5995
+        farther_ride.pickup_longitude = 120.9842
+        farther_ride.pk = None
+        farther_ride.save()
+
+        query_params = {"lat": 10.31445, "lon": 123.9781, "radius_km": 50}
+        queryset = Ride.objects.all()
+        queryset = RideViewSet().apply_distance_annotation(
+            queryset, query_params
+        )
+        results = RideViewSet().apply_radius_filter(queryset, query_params)
+
+        assert len(results) == 1
+        assert ride == results[0]
+        assert results[0].distance <= 50
+
+    def test_radius_filter_walks_cells_until_page_is_filled(self, ride):
+        """Without a radius, only the nearest rides needed are kept"""
+
+        nearby_ride = deepcopy(ride)
+        nearby_ride.pickup_latitude += 0.5
+        nearby_ride.pk = None
+        nearby_ride.save()
+
+        farther_ride = deepcopy(ride)
+        farther_ride.pickup_latitude = -1 * ride.pickup_latitude
+        farther_ride.pickup_longitude = -1 * ride.pickup_longitude
+        farther_ride.pk = None
+        farther_ride.save()
+
+        query_params = {
+            "lat": ride.pickup_latitude,
+            "lon": ride.pickup_longitude,
+            "sort_by": "distance",
+        }
+        queryset = Ride.objects.all()
+        queryset = RideViewSet().apply_distance_annotation(
+            queryset, query_params
+        )
+        results = RideViewSet().apply_radius_filter(
+            queryset, query_params, rows_needed=2
+        )
+
+        assert set(results) == {ride, nearby_ride}
+
+        # Everything is kept when the page needs more rides than there are
+        results = RideViewSet().apply_radius_filter(
+            queryset, query_params, rows_needed=10
+        )
+        assert len(results) == 3
+
+
+@pytest.mark.django_db
+class TestRidesExport:
+    @pytest.fixture
+    def rides(self, ride, ride_event):
+        """Five rides, each with one ride event from the past 24 hours"""
+        rides = [ride]
+        for _ in range(4):
+            other_ride = deepcopy(ride)
+            other_ride.pk = None
+            other_ride.save()
+            rides.append(other_ride)
+
+        for each_ride in rides:
+            event = deepcopy(ride_event)
+            event.pk = None
+            event.ride = each_ride
+            event.created_at = timezone.now()
+            event.save()
+        return rides
+
+    def test_export_ndjson_matches_list(self, authenticated_client, rides):
+        """Every ride is exported, the same way the list shows it"""
+        params = "lat=10.31445&lon=123.9781&sort_by=distance"
+
+        response = authenticated_client.get(f"/rides/export/?{params}")
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/x-ndjson"
+        lines = b"".join(response.streaming_content).splitlines()
+        exported = [json.loads(line) for line in lines]
+
+        listed = authenticated_client.get(f"/rides/?{params}").json()
+        assert exported == listed["results"]
+
+    def test_export_csv(self, authenticated_client, rides, rider):
+        response = authenticated_client.get(
+            "/rides/export/?lat=10.31445&lon=123.9781&file_format=csv",
+            HTTP_ACCEPT="text/csv",
+        )
+        assert response.status_code == 200
+        assert response["Content-Type"] == "text/csv"
+        content = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+
+        assert len(rows) == len(rides)
+        assert rows[0]["rider_email"] == rider.email
+        assert "rider" not in rows[0]
+        assert len(json.loads(rows[0]["todays_ride_events"])) == 1
+
+    def test_export_csv_with_unexpanded_users(
+        self, authenticated_client, rides, rider, driver
+    ):
+        response = authenticated_client.get(
+            "/rides/export/?lat=10.31445&lon=123.9781&file_format=csv"
+            "&expand=events",
+            HTTP_ACCEPT="text/csv",
+        )
+        assert response.status_code == 200
+        content = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+
+        assert len(rows) == len(rides)
+        assert rows[0]["rider_id"] == str(rider.id)
+        assert rows[0]["driver_id"] == str(driver.id)
+        assert "rider_email" not in rows[0]
+        assert len(json.loads(rows[0]["todays_ride_events"])) == 1
+
+    def test_export_fetches_ride_events_per_chunk(
+        self, authenticated_client, rides, monkeypatch
+    ):
+        """Ride events are looked up once per chunk of rides"""
+        monkeypatch.setattr(RideViewSet, "EXPORT_CHUNK_SIZE", 2)
+
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get(
+                "/rides/export/?lat=10.31445&lon=123.9781"
+            )
+            lines = b"".join(response.streaming_content).splitlines()
+
+        ride_event_queries = [
+            query
+            for query in context.captured_queries
+            if query["sql"].startswith('SELECT "rideshare_rideevent"')
+        ]
+        assert len(lines) == 5
+        assert len(ride_event_queries) == 3
+
+    def test_export_unsupported_format(self, authenticated_client):
+        response = authenticated_client.get(
+            "/rides/export/?lat=10.31445&lon=123.9781&file_format=xml"
+        )
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestRidesTransition:
+    def test_transition_moves_rides_and_records_events(
+        self, authenticated_client, ride
+    ):
+        other_ride = deepcopy(ride)
+        other_ride.pk = None
+        other_ride.save()
+
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.post(
+                "/rides/transition/",
+                {"ids": [ride.id, other_ride.id], "status": "pickup"},
+                format="json",
+            )
+
+        assert response.status_code == 200
+        assert response.data["moved"] == [ride.id, other_ride.id]
+        assert not response.data["errors"]
+        assert set(Ride.objects.values_list("status", flat=True)) == {
+            RideStatusChoices.PICKUP
+        }
+        assert sorted(
+            RideEvent.objects.values_list("ride_id", "description")
+        ) == [
+            (ride.id, "Status changed to pickup"),
+            (other_ride.id, "Status changed to pickup"),
+        ]
+
+        updates = [
+            query
+            for query in context.captured_queries
+            if query["sql"].startswith('UPDATE "rideshare_ride" SET "status"')
+        ]
+        assert len(updates) == 1
+
+    def test_transition_reports_disallowed_moves(
+        self, authenticated_client, ride
+    ):
+        finished_ride = deepcopy(ride)
+        finished_ride.status = RideStatusChoices.DROPOFF
+        finished_ride.pk = None
+        finished_ride.save()
+
+        response = authenticated_client.post(
+            "/rides/transition/",
+            {"ids": [ride.id, finished_ride.id, 404], "status": "pickup"},
+            format="json",
+        )
+
+        assert response.status_code == 207
+        assert response.data["moved"] == [ride.id]
+        assert [error["id"] for error in response.data["errors"]] == [
+            finished_ride.id,
+            404,
+        ]
+        finished_ride.refresh_from_db()
+        assert finished_ride.status == RideStatusChoices.DROPOFF
+        assert not RideEvent.objects.filter(ride=finished_ride).exists()
+
+    def test_transition_rejects_invalid_payload(
+        self, authenticated_client, ride
+    ):
+        response = authenticated_client.post(
+            "/rides/transition/",
+            {"ids": [ride.id], "status": "teleported"},
+            format="json",
+        )
+        assert response.status_code == 400
+
+        response = authenticated_client.post(
+            "/rides/transition/",
+            {"ids": [ride.id], "status": "dropoff"},
+            format="json",
+        )
+        assert response.status_code == 400
+        assert not response.data["moved"]
+
+
+@pytest.mark.django_db
+class TestRidesListCache:
+    url = "/rides/?lat=10.31445&lon=123.9781"
+
+    def get_selects(self, context):
+        return [
+            query
+            for query in context.captured_queries
+            if query["sql"].startswith('SELECT "rideshare_')
+        ]
+
+    def test_identical_requests_hit_the_cache(
+        self, authenticated_client, ride
+    ):
+        first = authenticated_client.get(self.url)
+        assert first["X-Cache"] == "MISS"
+
+        # Nearby coordinates round to the same key
+        with CaptureQueriesContext(connection) as context:
+            second = authenticated_client.get(
+                "/rides/?lon=123.97812&lat=10.314451&status="
+            )
+
+        assert second["X-Cache"] == "HIT"
+        assert second.json() == first.json()
+        assert not self.get_selects(context)
+
+    def test_writes_invalidate_cached_pages(
+        self, authenticated_client, ride, ride_event
+    ):
+        authenticated_client.get(self.url)
+
+        ride.status = RideStatusChoices.PICKUP
+        ride.save()
+        response = authenticated_client.get(self.url)
+        assert response["X-Cache"] == "MISS"
+        assert response.data["results"][0]["status"] == "pickup"
+
+        authenticated_client.post(
+            "/rides/transition/",
+            {"ids": [ride.id], "status": "enroute"},
+            format="json",
+        )
+        response = authenticated_client.get(self.url)
+        assert response["X-Cache"] == "MISS"
+        assert response.data["results"][0]["status"] == "enroute"
+
+        authenticated_client.delete(f"/ride-events/{ride_event.id}/")
+        assert authenticated_client.get(self.url)["X-Cache"] == "MISS"
+
+    def test_cache_stats(self, authenticated_client, ride):
+        authenticated_client.get(self.url)
+        authenticated_client.get(self.url)
+
+        response = authenticated_client.get("/rides/cache-stats/")
+
+        assert response.status_code == 200
+        assert response.data == {
+            "enabled": True,
+            "hits": 1,
+            "misses": 1,
+            "hit_ratio": 0.5,
+        }
+
+    def test_warns_of_a_cache_local_to_each_process(self, settings):
+        assert [warning.id for warning in check_response_cache(None)] == [
+            "rideshare.W001"
+        ]
+
+        settings.CACHES = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+            }
+        }
+        assert check_response_cache(None) == []
+
+        settings.RESPONSE_CACHE_BACKEND = ""
+        assert check_response_cache(None) == []
@@ -0,0 +1,138 @@
+import pytest
+from rideshare.caching import get_response_cache
+from rideshare.checks import check_replica_pinning
+from rideshare.models import Ride
+from rideshare.routers import (
+    ReplicaRouter,
+    is_pinned_to_primary,
+    pin_to_primary,
+    replica_reads_allowed,
+)
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DATABASE_REPLICA_ALIASES = ["replica0"]
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    """A default cache shared by every process, in files"""
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(tmp_path),
+        }
+    }
+    get_response_cache.cache_clear()
+    yield
+    get_response_cache.cache_clear()
+
+
+@pytest.fixture
+def allow_replica_reads():
+    token = replica_reads_allowed.set(True)
+    yield
+    replica_reads_allowed.reset(token)
+
+
+class TestReplicaRouter:
+    def test_reads_stay_on_primary_by_default(self, replicas):
+        assert ReplicaRouter().db_for_read(Ride) == "default"
+
+    def test_allowed_reads_go_to_a_replica(
+        self, replicas, allow_replica_reads
+    ):
+        assert ReplicaRouter().db_for_read(Ride) == "replica0"
+
+    def test_reads_stay_on_primary_without_replicas(self, allow_replica_reads):
+        assert ReplicaRouter().db_for_read(Ride) == "default"
+
+    def test_reads_after_a_write_go_to_primary(
+        self, replicas, allow_replica_reads
+    ):
+        router = ReplicaRouter()
+        assert router.db_for_write(Ride) == "default"
+        assert router.db_for_read(Ride) == "default"
+
+
+@pytest.mark.django_db
+class TestPrimaryPinning:
+    def test_pin_to_primary(self, rider):
+        assert not is_pinned_to_primary(rider)
+
+        pin_to_primary(rider)
+        assert is_pinned_to_primary(rider)
+
+    def test_writes_pin_the_user(
+        self, settings, shared_cache, authenticated_client, admin, ride
+    ):
+        # Routing to "default" as a replica keeps the test on one database
+        settings.DATABASE_REPLICA_ALIASES = ["default"]
+        authenticated_client.get("/users/")
+        assert not is_pinned_to_primary(admin)
+
+        response = authenticated_client.patch(
+            f"/rides/{ride.id}/?lat=10.31445&lon=123.9781",
+            {"status": "pickup"},
+            format="json",
+        )
+        assert response.status_code == 200
+        assert is_pinned_to_primary(admin)
+
+    def test_no_pinning_without_replicas(
+        self, authenticated_client, admin, ride
+    ):
+        authenticated_client.patch(
+            f"/rides/{ride.id}/?lat=10.31445&lon=123.9781",
+            {"status": "pickup"},
+            format="json",
+        )
+        assert not is_pinned_to_primary(admin)
+
+    def test_no_pinning_without_a_shared_cache(
+        self, settings, authenticated_client, admin, ride
+    ):
+        settings.DATABASE_REPLICA_ALIASES = ["default"]
+        assert [warning.id for warning in check_replica_pinning(None)] == [
+            "rideshare.W002"
+        ]
+
+        authenticated_client.patch(
+            f"/rides/{ride.id}/?lat=10.31445&lon=123.9781",
+            {"status": "pickup"},
+            format="json",
+        )
+        assert not is_pinned_to_primary(admin)
+
+
+@pytest.mark.django_db
+class TestReplicaResponses:
+    url = "/rides/?lat=10.31445&lon=123.9781"
+
+    def test_replica_reads_are_not_cached(
+        self, settings, shared_cache, authenticated_client, ride
+    ):
+        settings.DATABASE_REPLICA_ALIASES = ["default"]
+        assert check_replica_pinning(None) == []
+
+        for _ in range(2):
+            response = authenticated_client.get(self.url)
+            assert response["X-Cache"] == "MISS"
+            assert not response.has_header("ETag")
+
+    def test_primary_reads_are_cached(
+        self, settings, shared_cache, authenticated_client, ride
+    ):
+        settings.DATABASE_REPLICA_ALIASES = ["default"]
+        authenticated_client.patch(
+            f"/rides/{ride.id}/?lat=10.31445&lon=123.9781",
+            {"status": "pickup"},
+            format="json",
+        )
+
+        # Pinned to the primary by the write
+        assert authenticated_client.get(self.url)["X-Cache"] == "MISS"
+        response = authenticated_client.get(self.url)
+        assert response["X-Cache"] == "HIT"
+        assert response.has_header("ETag")
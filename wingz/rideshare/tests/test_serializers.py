@@ -0,0 +1,82 @@
+from copy import deepcopy
+
+import pytest
+from django.utils import timezone
+from rest_framework import serializers
+from rideshare.management.commands.benchmark_renderers import build_ride_page
+from rideshare.management.commands.benchmark_serializers import (
+    PerItemRideSerializer,
+)
+from rideshare.models import Ride
+from rideshare.serializers import (
+    RideComplexSerializer,
+    RideEventSerializer,
+    UserSerializer,
+)
+from rideshare.views.rides import RideViewSet
+
+
+def serialize_per_item(serializer_class, instances) -> list:
+    """The stock DRF way, `Serializer.to_representation` for every item"""
+    return serializers.ListSerializer(
+        child=serializer_class(), instance=instances
+    ).data
+
+
+@pytest.mark.django_db
+class TestPlannedListSerializer:
+    def test_ride_list_parity(self, ride, ride_event, rider):
+        """Rides from the list queryset serialize the same on both paths"""
+
+        rider.phone_number = "+639231234567"
+        rider.save()
+        ride_event.created_at = timezone.now()
+        ride_event.save()
+
+        other_ride = deepcopy(ride)
+        other_ride.pk = None
+        other_ride.save()
+
+        query_params = {"lat": 10.31445, "lon": 123.9781}
+        view = RideViewSet()
+        queryset = view.apply_distance_annotation(
+            Ride.objects.select_related("rider", "driver"), query_params
+        )
+        rides = list(view.apply_prefetch_on_ride_events(queryset))
+
+        planned = RideComplexSerializer(rides, many=True).data
+        per_item = serialize_per_item(PerItemRideSerializer, rides)
+
+        assert planned == per_item
+        assert planned[0]["todays_ride_events"]
+        assert not planned[1]["todays_ride_events"]
+
+    def test_ride_list_parity_without_annotations(self, ride):
+        """Fields missing from the instances are left out the same way"""
+        rides = list(Ride.objects.all())
+
+        planned = RideComplexSerializer(rides, many=True).data
+        per_item = serialize_per_item(PerItemRideSerializer, rides)
+
+        assert planned == per_item
+        assert "distance" not in planned[0]
+        assert planned[0]["todays_ride_events"] == []
+
+    def test_generated_page_parity(self):
+        rides = build_ride_page(rides=20, events_per_ride=3)
+
+        planned = RideComplexSerializer(rides, many=True).data
+        per_item = serialize_per_item(PerItemRideSerializer, rides)
+
+        assert planned == per_item
+
+    def test_ride_event_and_user_list_parity(self, ride_event, admin):
+        events = [ride_event]
+        users = [admin, ride_event.ride.rider]
+
+        assert RideEventSerializer(
+            events, many=True
+        ).data == serialize_per_item(RideEventSerializer, events)
+        assert UserSerializer(users, many=True).data == serialize_per_item(
+            UserSerializer, users
+        )
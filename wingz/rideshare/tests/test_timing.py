@@ -0,0 +1,107 @@
+import json
+import logging
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def parse_server_timing(header: str) -> dict[str, dict]:
+    metrics = {}
+    for metric in header.split(", "):
+        name, *params = metric.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    return metrics
+
+
+@pytest.mark.django_db
+class TestServerTiming:
+    url = "/rides/"
+    params = {"lat": 10.31445, "lon": 123.9781}
+
+    @pytest.fixture(autouse=True)
+    def without_silk(self, settings):
+        """Silk writes its own queries after the view returns"""
+        settings.MIDDLEWARE = [
+            middleware
+            for middleware in settings.MIDDLEWARE
+            if not middleware.startswith("silk.")
+        ]
+
+    @pytest.mark.parametrize("sample_rate", [1, 0])
+    def test_breaks_down_the_list(
+        self, authenticated_client, settings, ride_event, sample_rate
+    ):
+        # Timed whether or not the request metrics sample the request
+        settings.METRICS_SAMPLE_RATE = sample_rate
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get(self.url, self.params)
+
+        metrics = parse_server_timing(response["Server-Timing"])
+        assert list(metrics) == [
+            "queryset",
+            "evaluate",
+            "prefetch",
+            "serialize",
+            "render",
+            "sql",
+            "total",
+        ]
+        assert all(float(metric["dur"]) >= 0 for metric in metrics.values())
+        # Along with the EXPLAIN of each that Silk may still run
+        queries = len(context.captured_queries)
+        assert metrics["sql"]["desc"] == f'"{queries} queries"'
+        assert float(metrics["total"]["dur"]) >= float(
+            metrics["evaluate"]["dur"]
+        )
+
+    def test_breaks_down_the_detail(self, authenticated_client, ride):
+        response = authenticated_client.get(
+            f"{self.url}{ride.id}/", self.params
+        )
+
+        metrics = parse_server_timing(response["Server-Timing"])
+        assert set(metrics) == {
+            "queryset",
+            "evaluate",
+            "serialize",
+            "render",
+            "sql",
+            "total",
+        }
+
+    def test_cached_responses_skip_the_database(
+        self, authenticated_client, ride
+    ):
+        authenticated_client.get(self.url, self.params)
+        response = authenticated_client.get(self.url, self.params)
+
+        assert response["X-Cache"] == "HIT"
+        metrics = parse_server_timing(response["Server-Timing"])
+        assert "evaluate" not in metrics
+        assert "render" in metrics
+
+    def test_logs_slow_requests(
+        self, authenticated_client, settings, caplog, ride
+    ):
+        settings.SERVER_TIMING_LOG_MS = 0
+        with (
+            caplog.at_level(logging.INFO, logger="rideshare.views.timing"),
+            CaptureQueriesContext(connection) as context,
+        ):
+            authenticated_client.get(self.url, self.params)
+
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record["path"] == self.url
+        assert record["action"] == "list"
+        assert record["status"] == 200
+        assert record["queries"] == len(context.captured_queries)
+        assert set(record["timings_ms"]) >= {"queryset", "evaluate", "total"}
+
+    def test_can_be_turned_off(self, authenticated_client, settings, ride):
+        settings.SERVER_TIMING_ENABLED = False
+        settings.METRICS_SAMPLE_RATE = 0
+        response = authenticated_client.get(self.url, self.params)
+
+        assert response.status_code == 200
+        assert "Server-Timing" not in response
@@ -1,6 +1,21 @@
 from django.urls import path
 
+from .views.analytics import LongTripsView
+from .views.asynchronous import (
+    AsyncRideDetailView,
+    AsyncRideListView,
+    AsyncUserLoginView,
+    AsyncUserLogoutView,
+    AsyncUserSignupView,
+)
 from .views.auth import UserLoginView, UserLogoutView, UserSignupView
+from .views.drivers import (
+    DriverLocationView,
+    DriverPingStatsView,
+    DriverPingsView,
+    NearestDriversView,
+)
+from .views.metrics import MetricsView
 from .views.rides import RideEventViewSet, RideViewSet, UserViewSet
 
 user_list = UserViewSet.as_view({"get": "list", "post": "create"})
@@ -14,6 +29,9 @@ user_detail = UserViewSet.as_view(
 )
 
 ride_list = RideViewSet.as_view({"get": "list", "post": "create"})
+ride_export = RideViewSet.as_view({"get": "export"})
+ride_cache_stats = RideViewSet.as_view({"get": "cache_stats"})
+ride_transition = RideViewSet.as_view({"post": "transition"})
 ride_detail = RideViewSet.as_view(
     {
         "get": "retrieve",
@@ -24,6 +42,7 @@ ride_detail = RideViewSet.as_view(
 )
 
 ride_event_list = RideEventViewSet.as_view({"get": "list", "post": "create"})
+ride_event_bulk = RideEventViewSet.as_view({"post": "bulk"})
 ride_event_detail = RideEventViewSet.as_view(
     {
         "get": "retrieve",
@@ -43,8 +62,57 @@ urlpatterns = [
     path("users/<int:pk>/", user_detail, name="user-detail"),
     # Ride endpoints
     path("rides/", ride_list, name="ride-list"),
+    path("rides/export/", ride_export, name="ride-export"),
+    path("rides/transition/", ride_transition, name="ride-transition"),
+    path("rides/cache-stats/", ride_cache_stats, name="ride-cache-stats"),
     path("rides/<int:pk>/", ride_detail, name="ride-detail"),
     # RideEvent endpoints
     path("ride-events/", ride_event_list, name="rideevent-list"),
+    path("ride-events/bulk/", ride_event_bulk, name="rideevent-bulk"),
     path("ride-events/<int:pk>/", ride_event_detail, name="rideevent-detail"),
+    # Analytics endpoints
+    path(
+        "analytics/long-trips/",
+        LongTripsView.as_view(),
+        name="analytics-long-trips",
+    ),
+    # Driver endpoints
+    path(
+        "drivers/locations/",
+        DriverLocationView.as_view(),
+        name="driver-locations",
+    ),
+    path("drivers/pings/", DriverPingsView.as_view(), name="driver-pings"),
+    path(
+        "drivers/pings/stats/",
+        DriverPingStatsView.as_view(),
+        name="driver-ping-stats",
+    ),
+    path(
+        "drivers/nearest/",
+        NearestDriversView.as_view(),
+        name="driver-nearest",
+    ),
+    # Request metrics, in the Prometheus text format
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+    # Async versions of the auth and ride endpoints, for ASGI deployments
+    path(
+        "async/auth/signup/",
+        AsyncUserSignupView.as_view(),
+        name="async-signup",
+    ),
+    path(
+        "async/auth/login/", AsyncUserLoginView.as_view(), name="async-login"
+    ),
+    path(
+        "async/auth/logout/",
+        AsyncUserLogoutView.as_view(),
+        name="async-logout",
+    ),
+    path("async/rides/", AsyncRideListView.as_view(), name="async-ride-list"),
+    path(
+        "async/rides/<int:pk>/",
+        AsyncRideDetailView.as_view(),
+        name="async-ride-detail",
+    ),
 ]
@@ -0,0 +1,56 @@
+"""Reports served from the rollups of `refresh_trip_summaries`"""
+
+from datetime import timedelta
+
+from django.db.models import Count
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rideshare.models import RideTripSummary, RollupWatermark
+from rideshare.permissions import IsAdminUser
+
+LONG_TRIP_DURATION = timedelta(hours=1)
+
+
+class LongTripsView(APIView):
+    """Trips longer than an hour per month and driver, the report of the
+    README's bonus SQL.
+
+    Reads the trip summaries rather than pairing up ride events, so it
+    covers the ride events up to the last run of `refresh_trip_summaries`.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        rows = (
+            RideTripSummary.objects.filter(duration__gt=LONG_TRIP_DURATION)
+            .values(
+                "month",
+                "driver_id",
+                "driver__first_name",
+                "driver__last_name",
+            )
+            .annotate(count_of_trips_gt_1hr=Count("ride"))
+            .order_by("month", "driver__first_name", "driver__last_name")
+        )
+        watermark = RollupWatermark.objects.filter(
+            name=RideTripSummary.WATERMARK_NAME
+        ).first()
+
+        return Response(
+            {
+                "last_event_id": watermark.last_event_id if watermark else 0,
+                "results": [
+                    {
+                        "month": row["month"],
+                        "driver_id": row["driver_id"],
+                        "driver": (
+                            f"{row['driver__first_name']} "
+                            f"{row['driver__last_name'][:1]}"
+                        ),
+                        "count_of_trips_gt_1hr": row["count_of_trips_gt_1hr"],
+                    }
+                    for row in rows
+                ],
+            }
+        )
@@ -0,0 +1,209 @@
+"""Async views, served without holding a thread under ASGI
+
+DRF views are synchronous, so these are plain Django async views. They reuse
+the querysets, paginators and serializers of the DRF views, only awaiting the
+database through the async ORM, and render the same JSON.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aauthenticate
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.request import Request
+from rideshare.authentication import CachedTokenAuthentication
+from rideshare.models import Ride
+from rideshare.parsers import ORJSONParser
+from rideshare.permissions import IsAdminUser
+from rideshare.ranking import RankedRides
+from rideshare.renderers import ORJSONRenderer
+from rideshare.serializers import UserSerializer
+
+from .rides import RideViewSet
+
+
+class AsyncAPIView(View):
+    """Authenticates, checks permissions and renders errors the way DRF's
+    `APIView` does, for async handlers.
+    """
+
+    authentication_class = CachedTokenAuthentication
+    permission_classes = [IsAdminUser]
+    parser_classes = [ORJSONParser, FormParser, MultiPartParser]
+    renderer = ORJSONRenderer()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Authentication is by token only, so there's no session to protect
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        if method == "options":
+            return await self.options(request, *args, **kwargs)
+        if method not in self.http_method_names or not hasattr(self, method):
+            return await self.http_method_not_allowed(request, *args, **kwargs)
+
+        request = Request(
+            request, parsers=[parser() for parser in self.parser_classes]
+        )
+        self.request = request
+        try:
+            await self.initial(request)
+            data, response_status = await getattr(self, method)(
+                request, *args, **kwargs
+            )
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+        return self.render(data, response_status)
+
+    async def initial(self, request):
+        """Authenticate the request, then check its permissions"""
+
+        authenticator = self.authentication_class()
+        request.user, request.auth = AnonymousUser(), None
+        self.authenticate_header = authenticator.authenticate_header(request)
+        user_auth_tuple = await authenticator.aauthenticate(request)
+        if user_auth_tuple is not None:
+            request.user, request.auth = user_auth_tuple
+
+        for permission_class in self.permission_classes:
+            permission = permission_class()
+            if not await permission.ahas_permission(request, self):
+                if request.auth is None:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(
+                    getattr(permission, "message", None)
+                )
+
+    def handle_exception(self, exc: exceptions.APIException) -> HttpResponse:
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {"detail": exc.detail}
+
+        response = self.render(data, exc.status_code)
+        if isinstance(
+            exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+        ):
+            response.status_code = status.HTTP_401_UNAUTHORIZED
+            response["WWW-Authenticate"] = self.authenticate_header
+        return response
+
+    def render(self, data, response_status: int) -> HttpResponse:
+        return HttpResponse(
+            self.renderer.render(data),
+            content_type=self.renderer.media_type,
+            status=response_status,
+        )
+
+
+class AsyncRideMixin:
+    """Builds the rides queryset through `RideViewSet`"""
+
+    def get_ride_view(self, request, action: str, **kwargs) -> RideViewSet:
+        return RideViewSet(
+            request=request,
+            action=action,
+            args=(),
+            kwargs=kwargs,
+            format_kwarg=None,
+        )
+
+
+class AsyncRideListView(AsyncRideMixin, AsyncAPIView):
+    """Async version of the ride list, with the same parameters"""
+
+    async def get(self, request):
+        view = self.get_ride_view(request, "list")
+
+        # Sorting by distance may count rides in growing rings to build the
+        # queryset, which `RideViewSet` does synchronously
+        queryset = await sync_to_async(view.get_queryset)()
+
+        paginator = view.paginator
+        is_ranked = isinstance(queryset, RankedRides)
+        if is_ranked:
+            # Ranked outside of SQL, the rides are loaded synchronously
+            page = await sync_to_async(paginator.paginate_queryset)(
+                queryset, request, view
+            )
+        else:
+            page = await paginator.apaginate_queryset(queryset, request, view)
+        if page is None:
+            if is_ranked:
+                rides = await sync_to_async(list)(queryset)
+            else:
+                rides = [ride async for ride in queryset.aiterator()]
+            await sync_to_async(view.prefetch_capped_ride_events)(rides)
+            data = view.get_serializer(rides, many=True).data
+            return data, status.HTTP_200_OK
+
+        await sync_to_async(view.prefetch_capped_ride_events)(page)
+        data = view.get_serializer(page, many=True).data
+        return paginator.get_paginated_response(data).data, status.HTTP_200_OK
+
+
+class AsyncRideDetailView(AsyncRideMixin, AsyncAPIView):
+    """Async version of the ride detail, with the same parameters"""
+
+    async def get(self, request, pk: int):
+        view = self.get_ride_view(request, "retrieve", pk=pk)
+        try:
+            ride = await view.get_queryset().aget(pk=pk)
+        except Ride.DoesNotExist:
+            raise exceptions.NotFound()
+        return view.get_serializer(ride).data, status.HTTP_200_OK
+
+
+class AsyncUserSignupView(AsyncAPIView):
+    """Async version of `UserSignupView`"""
+
+    permission_classes = []
+
+    async def post(self, request):
+        serializer = UserSerializer(data=request.data)
+
+        # Validation looks up whether the username is taken, and saving
+        # hashes the password, neither of which the serializer does async
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        await sync_to_async(serializer.save)()
+        return serializer.data, status.HTTP_201_CREATED
+
+
+class AsyncUserLoginView(AsyncAPIView):
+    """Async version of `UserLoginView`"""
+
+    permission_classes = []
+
+    async def post(self, request):
+        user = await aauthenticate(
+            username=request.data.get("username"),
+            password=request.data.get("password"),
+        )
+        if not user:
+            data = {"error": "Invalid credentials"}
+            return data, status.HTTP_401_UNAUTHORIZED
+
+        token, _ = await Token.objects.aget_or_create(user=user)
+        return {"token": token.key}, status.HTTP_200_OK
+
+
+class AsyncUserLogoutView(AsyncAPIView):
+    """Async version of `UserLogoutView`"""
+
+    permission_classes = []
+
+    async def delete(self, request):
+        """Delete the user's token, if it exists, to log them out"""
+        if request.auth is None:
+            return {"message": "Goodbye"}, status.HTTP_200_OK
+
+        await Token.objects.filter(key=request.auth.key).adelete()
+        data = {"message": "You have successfully logged out."}
+        return data, status.HTTP_200_OK
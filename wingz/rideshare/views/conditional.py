@@ -0,0 +1,102 @@
+"""For conditional GET and cached responses"""
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+from rideshare.caching import get_response_cache
+from rideshare.routers import reads_from_replicas
+
+
+class ConditionalResponseMixin:
+    """Adds ETag and Last-Modified validators to list and retrieve responses,
+    and answers conditional requests with `304 Not Modified` before any
+    serialization or database work. List responses can also be served from
+    the response cache.
+
+    Both rely on the generation counters of `rideshare.caching`, and are off
+    when the response cache is. Responses read from a replica are neither
+    cached nor validated, as the replica may not have caught up with the
+    generations they would be stored under.
+    """
+
+    # Generation counters of the models the responses are built from
+    list_depends_on: tuple[str, ...] = ()
+    detail_depends_on: tuple[str, ...] = ()
+
+    # Whether list responses are cached, and not only validated
+    cache_list_responses = False
+
+    # Seconds after which list responses are considered changed anyway, for
+    # those that also change as time passes
+    list_max_age: int | None = None
+
+    def list(self, request, *args, **kwargs):
+        return self.respond_conditionally(
+            request,
+            super().list,
+            args,
+            kwargs,
+            depends_on=self.list_depends_on,
+            use_cache=self.cache_list_responses,
+            period=self.list_max_age,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.respond_conditionally(
+            request,
+            super().retrieve,
+            args,
+            kwargs,
+            depends_on=self.detail_depends_on,
+        )
+
+    def respond_conditionally(
+        self,
+        request,
+        get_response,
+        args: tuple,
+        kwargs: dict,
+        depends_on: tuple[str, ...],
+        use_cache: bool = False,
+        period: int | None = None,
+    ):
+        response_cache = get_response_cache()
+        if response_cache is None or not depends_on:
+            return get_response(request, *args, **kwargs)
+
+        digest, last_modified = response_cache.describe(
+            request, depends_on, period
+        )
+        etag = f'"{digest[:32]}"'
+        last_modified = int(last_modified)
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None and use_cache:
+            data = response_cache.get(digest)
+            if data is not None:
+                response = Response(data, headers={"X-Cache": "HIT"})
+
+        from_replica = False
+        if response is None:
+            # Writes made while responding only move later reads to the
+            # primary
+            from_replica = reads_from_replicas()
+            response = get_response(request, *args, **kwargs)
+            if use_cache:
+                if (
+                    response.status_code == status.HTTP_200_OK
+                    and not from_replica
+                ):
+                    response_cache.set(digest, response.data)
+                response["X-Cache"] = "MISS"
+
+        if not from_replica and response.status_code in (
+            status.HTTP_200_OK,
+            status.HTTP_304_NOT_MODIFIED,
+        ):
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
@@ -0,0 +1,208 @@
+"""Driver locations, and the search of the nearest available drivers"""
+
+import math
+
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rideshare.drivers import get_driver_index
+from rideshare.ingestion import Ping, get_ping_buffer
+from rideshare.models import DriverLocation, User
+from rideshare.permissions import IsAdminUser
+from rideshare.serializers import (
+    DriverLocationSerializer,
+    DriverPingSerializer,
+)
+
+
+class DriverLocationView(APIView):
+    """Report where a driver is, and whether they take rides"""
+
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = DriverLocationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        now = timezone.now()
+        location, _ = DriverLocation.objects.update_or_create(
+            driver=serializer.validated_data["driver"],
+            defaults={
+                "latitude": serializer.validated_data["latitude"],
+                "longitude": serializer.validated_data["longitude"],
+                "is_available": serializer.validated_data.get(
+                    "is_available", True
+                ),
+                "updated_at": now,
+                "received_at": now,
+            },
+        )
+        get_driver_index().update(
+            location.driver_id,
+            location.latitude,
+            location.longitude,
+            location.updated_at,
+            location.is_available,
+        )
+        return Response(DriverLocationSerializer(location).data)
+
+
+class DriverPingsView(APIView):
+    """Take in batches of driver location pings, written in the background.
+
+    Only the latest ping of each driver is kept until the next flush, see
+    `rideshare.ingestion`. Invalid pings are reported back with their index
+    in the request, and don't keep the valid ones from being taken in.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    MAX_BATCH_SIZE = 1000
+
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError("Expected a list of pings")
+        if len(items) > self.MAX_BATCH_SIZE:
+            raise ValidationError(
+                f"At most {self.MAX_BATCH_SIZE} pings can be sent at once"
+            )
+
+        serializer = DriverPingSerializer()
+        valid_items, errors = {}, {}
+        for index, item in enumerate(items):
+            try:
+                valid_items[index] = serializer.run_validation(item)
+            except ValidationError as exc:
+                errors[index] = exc.detail
+
+        # Resolve every driver of the batch in one query
+        known_driver_ids = set(
+            User.objects.filter(
+                id__in={data["driver"] for data in valid_items.values()},
+                is_active=True,
+            ).values_list("id", flat=True)
+        )
+        now = timezone.now()
+        pings = []
+        for index, data in valid_items.items():
+            if data["driver"] not in known_driver_ids:
+                errors[index] = {
+                    "driver": [
+                        f'Invalid pk "{data["driver"]}" - object does not '
+                        "exist."
+                    ]
+                }
+                continue
+            pings.append(
+                Ping(
+                    driver_id=data["driver"],
+                    latitude=data["latitude"],
+                    longitude=data["longitude"],
+                    # Clocks running ahead would pin a driver in place
+                    recorded_at=min(data.get("recorded_at", now), now),
+                    is_available=data["is_available"],
+                )
+            )
+
+        ping_buffer = get_ping_buffer()
+        if pings and not ping_buffer.add(pings):
+            return Response(
+                {"error": "Too many pings are waiting to be written"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={
+                    "Retry-After": str(
+                        max(math.ceil(ping_buffer.flush_seconds), 1)
+                    )
+                },
+            )
+
+        if not errors:
+            response_status = status.HTTP_202_ACCEPTED
+        elif pings:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        data = {
+            "accepted": len(pings),
+            "errors": [
+                {"index": index, "errors": errors[index]}
+                for index in sorted(errors)
+            ],
+        }
+        return Response(data, status=response_status)
+
+
+class DriverPingStatsView(APIView):
+    """Counters of this process's ping buffer and of its flushes"""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_ping_buffer().get_stats())
+
+
+class NearestDriversView(APIView):
+    """The available drivers closest to the given coordinates, closest first.
+
+    Answered from the driver index of the process, see `rideshare.drivers`,
+    which reads back the locations reported through other processes at most
+    once every DRIVER_INDEX_SYNC_SECONDS.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    DEFAULT_K = 5
+    MAX_K = 50
+
+    def get(self, request):
+        latitude, longitude = self.get_input_coordinates(request.query_params)
+        k = self.get_k(request.query_params)
+
+        driver_index = get_driver_index()
+        driver_index.sync()
+        return Response(
+            {
+                "results": [
+                    {
+                        "driver_id": driver.driver_id,
+                        "latitude": driver.latitude,
+                        "longitude": driver.longitude,
+                        "distance_km": round(driver.distance_km, 3),
+                        "updated_at": driver.updated_at,
+                    }
+                    for driver in driver_index.nearest(latitude, longitude, k)
+                ]
+            }
+        )
+
+    def get_input_coordinates(self, query_params) -> tuple[float, float]:
+        """Parse the required `lat` and `lon` parameters"""
+
+        try:
+            latitude = float(query_params["lat"])
+            longitude = float(query_params["lon"])
+        except KeyError as e:
+            raise ValidationError(
+                "You must provide values for lat and lon"
+            ) from e
+        except ValueError as e:
+            raise ValidationError("lat and lon must both be float type") from e
+
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValidationError("lat and lon must be valid coordinates")
+        return latitude, longitude
+
+    def get_k(self, query_params) -> int:
+        """Parse the `k` parameter, the number of drivers to return"""
+
+        try:
+            k = int(query_params.get("k") or self.DEFAULT_K)
+        except ValueError as e:
+            raise ValidationError("k must be an integer") from e
+
+        if not 1 <= k <= self.MAX_K:
+            raise ValidationError(f"k must be between 1 and {self.MAX_K}")
+        return k
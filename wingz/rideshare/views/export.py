@@ -0,0 +1,81 @@
+"""For streaming exports of serialized rows"""
+
+import csv
+from collections.abc import Iterable, Iterator
+
+import orjson
+from rideshare.renderers import ORJSONRenderer, default
+
+# Rows are written out in blocks of about this many bytes
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+
+class Echo:
+    """File-like object that hands back what is written to it"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def buffered(lines: Iterable[bytes]) -> Iterator[bytes]:
+    """Join lines into blocks, rather than sending each on its own"""
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_BUFFER_SIZE:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def iter_ndjson(rows: Iterable[dict]) -> Iterator[bytes]:
+    """One JSON document per row, each on its own line"""
+    options = ORJSONRenderer.options | orjson.OPT_APPEND_NEWLINE
+    return buffered(
+        orjson.dumps(row, default=default, option=options) for row in rows
+    )
+
+
+def flatten_ride(row: dict) -> dict:
+    """Flatten a ride for CSV, keeping the ids and emails of its rider and
+    driver, only their ids unless they're expanded, and its ride events as a
+    JSON list.
+    """
+
+    flat_row = {}
+    for key, value in row.items():
+        if key in ("rider", "driver") and not isinstance(value, dict):
+            flat_row[f"{key}_id"] = value
+        elif key in ("rider", "driver"):
+            flat_row[f"{key}_id"] = value["id"]
+            flat_row[f"{key}_email"] = value["email"]
+        elif isinstance(value, (dict, list)):
+            flat_row[key] = orjson.dumps(
+                value, default=default, option=ORJSONRenderer.options
+            ).decode()
+        else:
+            flat_row[key] = value
+    return flat_row
+
+
+def iter_csv(rows: Iterable[dict]) -> Iterator[bytes]:
+    """A header line, then one line per flattened ride"""
+
+    writer = csv.writer(Echo())
+
+    def lines():
+        header = None
+        for row in rows:
+            flat_row = flatten_ride(row)
+            if header is None:
+                header = list(flat_row)
+                yield writer.writerow(header).encode()
+            yield writer.writerow(
+                [flat_row.get(column) for column in header]
+            ).encode()
+
+    return buffered(lines())
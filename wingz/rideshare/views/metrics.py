@@ -0,0 +1,23 @@
+"""Request metrics of the process, for Prometheus to scrape"""
+
+from django.http import HttpResponse
+from rest_framework.views import APIView
+from rideshare.metrics import get_request_metrics
+from rideshare.permissions import IsAdminUser
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsView(APIView):
+    """Request counts, latency histograms, and the SQL and serializer time of
+    every endpoint, see `rideshare.metrics`
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(
+            get_request_metrics().render(),
+            content_type=PROMETHEUS_CONTENT_TYPE,
+        )
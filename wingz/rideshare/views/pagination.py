@@ -1,6 +1,28 @@
 """For paginators"""
 
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rideshare.ranking import RankedRides
+
+
+def get_count_queryset(queryset: QuerySet, view=None) -> QuerySet:
+    """What to count for the total of a list. Views narrowing down where the
+    rows of a page are looked for, e.g. `RideViewSet` sorting by distance,
+    give the queryset they narrowed down as their `count_queryset`.
+    """
+
+    count_queryset = getattr(view, "count_queryset", None)
+    return queryset if count_queryset is None else count_queryset
 
 
 class BasicPagination(PageNumberPagination):
@@ -9,3 +31,262 @@ class BasicPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"  # Allow client to override
     max_page_size = 50
+
+    def get_rows_needed(self, request) -> int | None:
+        """Number of leading rows needed to fill the requested page, plus one
+        to know whether a next page exists.
+
+        Returns None if it can't be told up front, e.g. for the last page.
+        """
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        page_number = request.query_params.get(self.page_query_param) or 1
+        try:
+            page_number = int(page_number)
+        except (TypeError, ValueError):
+            return None
+        if page_number < 1:
+            return None
+
+        return page_number * page_size + 1
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None):
+        """Same as DRF's, with the count of `get_count_queryset`"""
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = get_count_queryset(queryset, view).count()
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        self.request = request
+        return list(self.page)
+
+    def get_position(self, request, sort_key: str) -> tuple | None:
+        """Page numbers are resolved with an OFFSET, not from a position"""
+        return None
+
+    def get_position_filter(self, request, sort_key: str) -> Q | None:
+        """Page numbers are resolved with an OFFSET, not with a filter"""
+        return None
+
+    async def apaginate_queryset(self, queryset: QuerySet, request, view=None):
+        """Async version of `paginate_queryset`, for the async views"""
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await get_count_queryset(queryset, view).acount()
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        self.page.object_list = [
+            row async for row in self.page.object_list.aiterator(page_size)
+        ]
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        self.request = request
+        return list(self.page)
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination over a queryset ordered by `(<sort key>, id)`.
+
+    The cursor is an opaque token holding the sort key value and id of the
+    last row of the previous page, so every page is fetched with an indexed
+    `WHERE` instead of an `OFFSET`. The total count is only computed when the
+    client asks for it.
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"  # Allow client to override
+    max_page_size = 50
+    cursor_query_param = "cursor"
+    count_query_param = "with_count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, TypeError, ValueError):
+            return self.page_size
+        if page_size < 1:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_rows_needed(self, request) -> int:
+        """Rows needed after the cursor to fill the page, plus one to know
+        whether a next page exists.
+        """
+        return self.get_page_size(request) + 1
+
+    def get_position(self, request, sort_key: str) -> tuple | None:
+        """Sort key value and id of the last row before the requested
+        cursor
+        """
+
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            return None
+
+        cursor_sort_key, value, last_id = cursor
+        if cursor_sort_key != sort_key:
+            raise NotFound(self.invalid_cursor_message)
+        return value, last_id
+
+    def get_position_filter(self, request, sort_key: str) -> Q | None:
+        """Filter for the rows that come after the requested cursor"""
+
+        position = self.get_position(request, sort_key)
+        if position is None:
+            return None
+
+        value, last_id = position
+        return Q(**{f"{sort_key}__gt": value}) | Q(
+            **{sort_key: value, "id__gt": last_id}
+        )
+
+    def get_sort_key(self, queryset: QuerySet) -> str:
+        ordering = queryset.query.order_by
+        if len(ordering) != 2 or ordering[1] != "id":
+            raise ValueError("Queryset must be ordered by (<sort key>, id)")
+        return ordering[0]
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if isinstance(queryset, RankedRides):
+            return self.paginate_ranked_rides(queryset, request)
+        self.sort_key = self.get_sort_key(queryset)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) == "true":
+            self.count = get_count_queryset(queryset, view).count()
+
+        position_filter = self.get_position_filter(request, self.sort_key)
+        if position_filter is not None:
+            queryset = queryset.filter(position_filter)
+
+        results = list(queryset[: self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def paginate_ranked_rides(self, rides: RankedRides, request) -> list:
+        """Rides ranked outside of SQL are ranked past the cursor already,
+        see `RideViewSet.rank_by_distance`
+        """
+
+        self.sort_key = rides.sort_key
+        self.count = None
+        if request.query_params.get(self.count_query_param) == "true":
+            self.count = rides.count()
+
+        results = rides[: self.page_size + 1]
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    async def apaginate_queryset(self, queryset: QuerySet, request, view=None):
+        """Async version of `paginate_queryset`, for the async views"""
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.sort_key = self.get_sort_key(queryset)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) == "true":
+            self.count = await get_count_queryset(queryset, view).acount()
+
+        position_filter = self.get_position_filter(request, self.sort_key)
+        if position_filter is not None:
+            queryset = queryset.filter(position_filter)
+
+        rows_needed = self.page_size + 1
+        results = [
+            row async for row in queryset[:rows_needed].aiterator(rows_needed)
+        ]
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        response_data = {"next": self.get_next_link(), "results": data}
+        if self.count is not None:
+            response_data = {"count": self.count, **response_data}
+        return Response(response_data)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "count": {"type": "integer", "example": 123},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next:
+            return None
+
+        last_row = self.page[-1]
+        cursor = self.encode_cursor(
+            self.sort_key, getattr(last_row, self.sort_key), last_row.id
+        )
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def encode_cursor(self, sort_key: str, value, last_id: int) -> str:
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        position = json.dumps([sort_key, value, last_id]).encode()
+        return urlsafe_b64encode(position).decode().rstrip("=")
+
+    def decode_cursor(self, request) -> tuple[str, object, int] | None:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padding = "=" * (-len(encoded) % 4)
+            position = urlsafe_b64decode(encoded + padding)
+            sort_key, value, last_id = json.loads(position)
+            if isinstance(value, str):
+                # Datetimes are the only values encoded as strings
+                value = parse_datetime(value)
+            if not isinstance(value, (int, float, datetime)):
+                raise ValueError(value)
+            if not isinstance(sort_key, str) or not isinstance(last_id, int):
+                raise ValueError(position)
+        except (BinasciiError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return sort_key, value, last_id
@@ -0,0 +1,37 @@
+"""For views reading from the read replicas"""
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rideshare.routers import (
+    can_pin_to_primary,
+    is_pinned_to_primary,
+    pin_to_primary,
+    replica_reads_allowed,
+)
+
+
+class ReplicaReadsMixin:
+    """Safe requests read from the replicas, unless the user wrote recently.
+    Unsafe requests pin the user to the primary for a while.
+
+    Authentication runs before replica reads are allowed, so tokens are
+    always looked up on the primary. Without a shared cache to pin users in,
+    every request reads from the primary.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        token = replica_reads_allowed.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            replica_reads_allowed.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not settings.DATABASE_REPLICA_ALIASES or not can_pin_to_primary():
+            return
+
+        if request.method not in SAFE_METHODS:
+            pin_to_primary(request.user)
+        elif not is_pinned_to_primary(request.user):
+            replica_reads_allowed.set(True)
@@ -1,52 +1,259 @@
+from collections.abc import Iterator
 from datetime import timedelta
+from functools import reduce
+from itertools import islice
+from operator import or_
 
+from django.conf import settings
+from django.db import transaction
 from django.db.models import (
     ExpressionWrapper,
     F,
     FloatField,
     Prefetch,
+    Q,
     QuerySet,
     Value,
+    prefetch_related_objects,
 )
-from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
-from django.http import QueryDict
+from django.db.models.functions import (
+    ASin,
+    Cos,
+    Lower,
+    Power,
+    Radians,
+    Sin,
+    Sqrt,
+)
+from django.db.models.lookups import Exact
+from django.http import Http404, QueryDict, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
 from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
-from rideshare.enums import RideStatusChoices
-from rideshare.models import Ride, RideEvent, User
+from rideshare.caching import (
+    RIDE_EVENTS,
+    RIDES,
+    USERS,
+    bump_generations,
+    get_response_cache,
+)
+from rideshare.enums import RIDE_STATUS_TRANSITIONS, RideStatusChoices
+from rideshare.geo import MAX_DISTANCE_KM, get_cell_ranges
+from rideshare.metrics import timed
+from rideshare.models import Ride, RideEvent, RideEventArchive, User
 from rideshare.permissions import IsAdminUser
+from rideshare.ranking import VECTORIZED, RankedRides, rank_by_distance
 from rideshare.serializers import (
     RideBasicSerializer,
     RideComplexSerializer,
+    RideEventBulkItemSerializer,
     RideEventSerializer,
+    RideStatusTransitionSerializer,
     UserSerializer,
+    get_model_columns,
+)
+from rideshare.summaries import (
+    get_recent_cutoff,
+    may_be_truncated,
+    refresh_event_summaries,
 )
 
-from .pagination import BasicPagination
+from .conditional import ConditionalResponseMixin
+from .export import iter_csv, iter_ndjson
+from .pagination import BasicPagination, KeysetPagination
+from .replicas import ReplicaReadsMixin
+from .timing import PrefetchQuerySet, ServerTimingMixin
 
 
-class UserViewSet(ModelViewSet):
+class UserViewSet(ReplicaReadsMixin, ConditionalResponseMixin, ModelViewSet):
     """API endpoint that allows users to be viewed or edited."""
 
     queryset = User.objects.all().order_by("username")
     serializer_class = UserSerializer
     permission_classes = [IsAdminUser]
     pagination_class = BasicPagination
+    list_depends_on = detail_depends_on = (USERS,)
 
 
-class RideViewSet(ModelViewSet):
+class RideViewSet(
+    ServerTimingMixin,
+    ReplicaReadsMixin,
+    ConditionalResponseMixin,
+    ModelViewSet,
+):
     """API endpoint that allows rides to be viewed or edited."""
 
     permission_classes = [IsAdminUser]
     pagination_class = BasicPagination
 
+    # List pages show the riders, drivers and today's ride events of the
+    # rides. The latter also change as time passes, hence the max age.
+    list_depends_on = (RIDES, RIDE_EVENTS, USERS)
+    detail_depends_on = (RIDES,)
+    cache_list_responses = True
+    list_max_age = settings.RESPONSE_CACHE_TTL
+
+    # What the list paginators count, see `get_count_queryset`
+    count_queryset: QuerySet | None = None
+
+    SORT_BY_PICKUP_TIME = "pickup_time"
+    SORT_BY_DISTANCE = "distance"
+
+    # Radius of the first ring of grid cells searched for the nearest rides,
+    # and how much it grows each time it comes up short.
+    NEAREST_RIDES_INITIAL_RADIUS_KM = 5.0
+    NEAREST_RIDES_RADIUS_GROWTH = 4
+
+    # Rides are read, and their ride events prefetched, this many at a time
+    EXPORT_CHUNK_SIZE = 2000
+    EXPORT_FORMATS = {
+        "ndjson": ("application/x-ndjson", iter_ndjson),
+        "csv": ("text/csv", iter_csv),
+    }
+
+    @property
+    def paginator(self):
+        """Use keyset pagination when the client asks for `pagination=cursor`
+        or sends back a cursor.
+        """
+        if not hasattr(self, "_paginator"):
+            query_params = self.request.query_params
+            if (
+                query_params.get("pagination") == "cursor"
+                or KeysetPagination.cursor_query_param in query_params
+            ):
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     def get_serializer_class(self, *args, **kwargs):
         """Use the more complex serialiizer for GET requests"""
-        if self.action == "list":
+        if self.action in ("list", "export"):
             return RideComplexSerializer
         return RideBasicSerializer
 
+    def perform_content_negotiation(self, request, force=False):
+        """Exports aren't rendered, whatever the client accepts is fine"""
+        if self.action == "export":
+            force = True
+        return super().perform_content_negotiation(request, force=force)
+
+    def cache_stats(self, request, *args, **kwargs):
+        """Hit/miss counters of the ride list's response cache"""
+        response_cache = get_response_cache()
+        if response_cache is None:
+            return Response({"enabled": False})
+        return Response({"enabled": True, **response_cache.get_stats()})
+
+    def transition(self, request, *args, **kwargs):
+        """Move many rides to a new status with a single UPDATE, and record
+        the change with a "Status changed to <status>" ride event for each.
+
+        Rides that can't move to the new status are reported back, and don't
+        keep the others from moving.
+        """
+
+        serializer = RideStatusTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ride_ids = list(dict.fromkeys(serializer.validated_data["ids"]))
+        new_status = serializer.validated_data["status"]
+        allowed_from = {
+            from_status
+            for from_status, targets in RIDE_STATUS_TRANSITIONS.items()
+            if new_status in targets
+        }
+
+        with transaction.atomic():
+            current_statuses = dict(
+                Ride.objects.select_for_update()
+                .filter(id__in=ride_ids)
+                .values_list("id", "status")
+            )
+
+            moved_ids, errors = [], []
+            for ride_id in ride_ids:
+                current_status = current_statuses.get(ride_id)
+                if current_status is None:
+                    errors.append({"id": ride_id, "error": "Ride not found."})
+                elif current_status not in allowed_from:
+                    errors.append(
+                        {
+                            "id": ride_id,
+                            "error": (
+                                f"Cannot change status from {current_status} "
+                                f"to {new_status}."
+                            ),
+                        }
+                    )
+                else:
+                    moved_ids.append(ride_id)
+
+            if moved_ids:
+                Ride.objects.filter(
+                    id__in=moved_ids, status__in=allowed_from
+                ).update(status=new_status)
+                now = timezone.now()
+                RideEvent.objects.bulk_create(
+                    RideEvent.for_status_change(ride_id, new_status, now)
+                    for ride_id in moved_ids
+                )
+                refresh_event_summaries(moved_ids)
+                bump_generations(RIDES, RIDE_EVENTS)
+
+        if not errors:
+            response_status = status.HTTP_200_OK
+        elif moved_ids:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        data = {"status": new_status, "moved": moved_ids, "errors": errors}
+        return Response(data, status=response_status)
+
+    def export(self, request, *args, **kwargs):
+        """Stream every ride matching the list filters, as NDJSON (default)
+        or CSV depending on the `file_format` parameter.
+
+        The rides are read from the database in chunks, with their ride
+        events fetched once per chunk, so memory use doesn't grow with the
+        number of rides.
+        """
+
+        file_format = request.query_params.get("file_format") or "ndjson"
+        if file_format not in self.EXPORT_FORMATS:
+            raise ValidationError(
+                f"file_format must be in {str(tuple(self.EXPORT_FORMATS))}"
+            )
+        content_type, iter_content = self.EXPORT_FORMATS[file_format]
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rides = self.iter_prefetching_capped_ride_events(
+            queryset.iterator(chunk_size=self.EXPORT_CHUNK_SIZE)
+        )
+        serializer = self.get_serializer(many=True)
+
+        response = StreamingHttpResponse(
+            iter_content(serializer.iter_representation(rides)),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="rides.{file_format}"'
+        )
+        return response
+
+    def paginate_queryset(self, queryset):
+        # Timed along with the rest of reading the page
+        with timed("evaluate"):
+            page = super().paginate_queryset(queryset)
+            if page is not None:
+                self.prefetch_capped_ride_events(page)
+        return page
+
+    @timed("queryset")
     def get_queryset(self):
         """Custom implementation as specified by instructions
 
@@ -55,21 +262,211 @@ class RideViewSet(ModelViewSet):
         """
 
         query_params = self.request.GET
-        queryset = Ride.objects.select_related("rider").select_related(
-            "driver"
-        )
+        serializer = self.get_list_serializer()
+        # Other actions render `RideBasicSerializer`, which only shows the ids
+        # of the rider and driver, and no ride events
+        expanded = serializer.expanded if serializer is not None else set()
+
+        queryset = Ride.objects.all()
+        if "rider" in expanded:
+            queryset = queryset.select_related("rider")
+        if "driver" in expanded:
+            queryset = queryset.select_related("driver")
         queryset = self.apply_filter_on_status(queryset, query_params)
         queryset = self.apply_filter_on_email(queryset, query_params)
-        queryset = self.apply_distance_annotation(queryset, query_params)
-
-        queryset = self.apply_sort_key(queryset, query_params)
+        is_ranked = self.is_ranked_outside_sql(query_params)
+        if not is_ranked:
+            queryset = self.apply_distance_annotation(queryset, query_params)
+            if self.get_radius_km(query_params) is None:
+                # Rings of grid cells may narrow down where the page's rides
+                # are looked for, the total counts every ride all the same
+                self.count_queryset = queryset
+            queryset = self.apply_radius_filter(
+                queryset,
+                query_params,
+                rows_needed=self.get_rows_needed(),
+                position_filter=self.get_position_filter(query_params),
+            )
+            queryset = self.apply_sort_key(queryset, query_params)
+
+        if serializer is None:
+            # Leave the denormalized fields alone when saving a ride, they
+            # are only written along with its ride events
+            queryset = queryset.defer(*Ride.EVENT_SUMMARY_FIELDS)
+        elif self.is_sparse(query_params):
+            queryset = self.apply_only_rendered_columns(
+                queryset, serializer, query_params
+            )
+        else:
+            # Of the denormalized fields, only the ride events of single
+            # query mode are rendered by default
+            deferred = set(Ride.EVENT_SUMMARY_FIELDS)
+            if serializer.recent_events_since is not None:
+                deferred.discard("recent_events")
+            queryset = queryset.defer(*deferred)
 
         # Apply prefetch last, so that the Rides queryset will be as lean as
-        # can be before the secondary database query.
-        queryset = self.apply_prefetch_on_ride_events(queryset)
+        # can be before the secondary database query. In single query mode,
+        # today's ride events are read from the rides themselves.
+        if "events" in expanded and not self.is_single_query(query_params):
+            queryset = self.apply_prefetch_on_ride_events(queryset)
 
+        if is_ranked:
+            return self.rank_by_distance(queryset, query_params)
         return queryset
 
+    def get_serializer(self, *args, **kwargs):
+        """Lists and exports render the `fields` and `expand` requested"""
+        if self.action in ("list", "export"):
+            query_params = self.request.query_params
+            kwargs.setdefault("fields", self.get_fields_param(query_params))
+            kwargs.setdefault("expand", self.get_expand_param(query_params))
+            kwargs.setdefault(
+                "recent_events_since",
+                (
+                    get_recent_cutoff()
+                    if self.is_single_query(query_params)
+                    else None
+                ),
+            )
+        return super().get_serializer(*args, **kwargs)
+
+    def get_list_serializer(self) -> RideComplexSerializer | None:
+        """Serializer of a single ride of the list or export, if that's what
+        the request is for
+        """
+        if getattr(self, "request", None) is None:
+            return None
+        if self.action not in ("list", "export"):
+            return None
+        return self.get_serializer()
+
+    def is_sparse(self, query_params: QueryDict) -> bool:
+        """Whether the client picked the fields or expansions to render"""
+        return "fields" in query_params or "expand" in query_params
+
+    def is_single_query(self, query_params: QueryDict) -> bool:
+        """Whether the client asked for today's ride events to be read from
+        the rides rather than prefetched
+        """
+        return query_params.get("single_query") == "true"
+
+    def is_ranked_outside_sql(self, query_params: QueryDict) -> bool:
+        """Whether the rides are sorted by distance with the "vectorized"
+        RIDE_DISTANCE_ENGINE, see `rideshare.ranking`
+        """
+        return (
+            settings.RIDE_DISTANCE_ENGINE == VECTORIZED
+            and self.action in ("list", "export")
+            and self.get_sort_key(query_params) == self.SORT_BY_DISTANCE
+        )
+
+    def get_fields_param(self, query_params: QueryDict) -> set[str] | None:
+        """Parse the optional `fields` parameter"""
+
+        fields = self.split_param(query_params.get("fields"))
+        if not fields:
+            return None
+
+        unknown = fields - set(RideComplexSerializer.Meta.fields)
+        if unknown:
+            raise ValidationError(
+                f"fields must be in {str(RideComplexSerializer.Meta.fields)}"
+            )
+        return fields
+
+    def get_expand_param(self, query_params: QueryDict) -> set[str] | None:
+        """Parse the optional `expand` parameter, an empty one expands
+        nothing
+        """
+
+        expand = self.split_param(query_params.get("expand"))
+        if expand is None:
+            return None
+
+        expansions = tuple(RideComplexSerializer.EXPANSIONS)
+        if expand - set(expansions):
+            raise ValidationError(f"expand must be in {str(expansions)}")
+        return expand
+
+    def split_param(self, value: str | None) -> set[str] | None:
+        if value is None:
+            return None
+        return {item.strip() for item in value.split(",") if item.strip()}
+
+    def apply_only_rendered_columns(
+        self,
+        queryset: QuerySet,
+        serializer: RideComplexSerializer,
+        query_params: QueryDict,
+    ) -> QuerySet:
+        """Only load the columns that the serializer renders, and the sort
+        key which cursors are built from
+        """
+
+        columns = get_model_columns(serializer)
+        if (
+            "events" in serializer.expanded
+            and serializer.recent_events_since is not None
+        ):
+            columns.append("recent_events")
+        sort_key = self.get_sort_key(query_params)
+        if sort_key != self.SORT_BY_DISTANCE:
+            columns.append(sort_key)
+        return queryset.only("id", *columns)
+
+    def get_rows_needed(self) -> int | None:
+        """Number of nearest rides the current list page needs, if known"""
+        request = getattr(self, "request", None)
+        if request is None or self.action != "list" or self.paginator is None:
+            return None
+        return self.paginator.get_rows_needed(request)
+
+    def get_position_filter(self, query_params: QueryDict) -> Q | None:
+        """Filter for the rows past the current list page's cursor, if any"""
+        request = getattr(self, "request", None)
+        if request is None or self.action != "list" or self.paginator is None:
+            return None
+        sort_key = self.get_sort_key(query_params)
+        return self.paginator.get_position_filter(request, sort_key)
+
+    def get_position(self, query_params: QueryDict) -> tuple | None:
+        """Sort key value and id of the row before the current list page's
+        cursor, if any
+        """
+        request = getattr(self, "request", None)
+        if request is None or self.action != "list" or self.paginator is None:
+            return None
+        sort_key = self.get_sort_key(query_params)
+        return self.paginator.get_position(request, sort_key)
+
+    def get_input_coordinates(
+        self, query_params: QueryDict
+    ) -> tuple[float, float]:
+        """Parse the required `lat` and `lon` parameters"""
+
+        input_latitude = query_params.get("lat") or None
+        input_longitude = query_params.get("lon") or None
+
+        if not all([input_latitude, input_longitude]):
+            raise ValidationError("You must provide values for lat and lon")
+
+        try:
+            return float(input_latitude), float(input_longitude)
+        except (ValueError, TypeError) as e:
+            raise ValidationError("lat and lon must both be float type") from e
+
+    def get_sort_key(self, query_params: QueryDict) -> str:
+        """Parse the `sort_by` parameter, defaulting to pickup_time"""
+
+        allowed_sort_keys = (self.SORT_BY_PICKUP_TIME, self.SORT_BY_DISTANCE)
+        sort_key = query_params.get("sort_by") or self.SORT_BY_PICKUP_TIME
+        if sort_key not in allowed_sort_keys:
+            raise ValidationError(
+                f"sort_key must be in {str(allowed_sort_keys)}"
+            )
+        return sort_key
+
     def apply_filter_on_status(
         self, queryset: QuerySet, query_params: QueryDict
     ) -> QuerySet:
@@ -94,14 +491,20 @@ class RideViewSet(ModelViewSet):
     ) -> QuerySet:
         """Apply a filter lookup depending on given `email` parameter
 
-        Email filter matching is case-insensitive.
+        Email filter matching is case-insensitive. It's written as a match on
+        the lowercased email, rather than `iexact`, so that the lowercased
+        email index can serve it.
         """
 
         email = query_params.get("email") or ""
         if not email:
             return queryset
 
-        return queryset.filter(rider__email__iexact=email)
+        # Lowered by the database on both sides, as Python lowercases more
+        # characters than some databases do, e.g. SQLite only folds ASCII
+        return queryset.filter(
+            Exact(Lower("rider__email"), Lower(Value(email)))
+        )
 
     def apply_distance_annotation(
         self, queryset: QuerySet, query_params: QueryDict
@@ -127,17 +530,9 @@ class RideViewSet(ModelViewSet):
             )
         )
         """
-        input_latitude = query_params.get("lat") or None
-        input_longitude = query_params.get("lon") or None
-
-        if not all([input_latitude, input_longitude]):
-            raise ValidationError("You must provide values for lat and lon")
-
-        try:
-            input_latitude = float(input_latitude)
-            input_longitude = float(input_longitude)
-        except (ValueError, TypeError) as e:
-            raise ValidationError("lat and lon must both be float type") from e
+        input_latitude, input_longitude = self.get_input_coordinates(
+            query_params
+        )
 
         haversine_equation = (
             Value(6371)
@@ -176,46 +571,388 @@ class RideViewSet(ModelViewSet):
 
         return queryset
 
-    def apply_sort_key(
-        self, queryset: QuerySet, query_params: QueryDict
+    def apply_radius_filter(
+        self,
+        queryset: QuerySet,
+        query_params: QueryDict,
+        rows_needed: int | None = None,
+        position_filter: Q | None = None,
     ) -> QuerySet:
-        """Apply the sort order depending on given `sort_by` parameter"""
+        """Only keep the rides whose pickup is within `radius_km` of the input
+        coordinates. Must be applied after the distance annotation.
 
-        SORT_BY_PICKUP_TIME = "pickup_time"
-        SORT_BY_DISTANCE = "distance"
+        Without a `radius_km`, rides sorted by distance are searched for in
+        rings of grid cells growing outward, until `rows_needed` are found
+        past the `position_filter` of the requested page.
+        """
 
-        allowed_sort_keys = (SORT_BY_PICKUP_TIME, SORT_BY_DISTANCE)
-        sort_key = query_params.get("sort_by") or SORT_BY_PICKUP_TIME
-        if sort_key not in allowed_sort_keys:
-            raise ValidationError(
-                f"sort_key must be in {str(allowed_sort_keys)}"
+        radius_km = self.get_radius_km(query_params)
+        input_latitude, input_longitude = self.get_input_coordinates(
+            query_params
+        )
+
+        if radius_km is not None:
+            return self.filter_within_radius(
+                queryset, input_latitude, input_longitude, radius_km
+            )
+
+        sort_key = self.get_sort_key(query_params)
+        if sort_key != self.SORT_BY_DISTANCE or not rows_needed:
+            return queryset
+
+        remaining_rides = queryset
+        if position_filter is not None:
+            remaining_rides = queryset.filter(position_filter)
+
+        # Not worth narrowing down if every ride fits in the page anyway
+        if remaining_rides[:rows_needed].count() < rows_needed:
+            return queryset
+
+        radius_km = self.NEAREST_RIDES_INITIAL_RADIUS_KM
+        while radius_km < MAX_DISTANCE_KM:
+            nearby_rides = self.filter_within_radius(
+                remaining_rides, input_latitude, input_longitude, radius_km
             )
+            if nearby_rides[:rows_needed].count() >= rows_needed:
+                return self.filter_within_radius(
+                    queryset, input_latitude, input_longitude, radius_km
+                )
+            radius_km *= self.NEAREST_RIDES_RADIUS_GROWTH
+
+        return queryset
+
+    def get_radius_km(self, query_params: QueryDict) -> float | None:
+        """Parse the optional `radius_km` parameter"""
+
+        radius_km = query_params.get("radius_km") or None
+        if radius_km is None:
+            return None
+
+        try:
+            radius_km = float(radius_km)
+        except (ValueError, TypeError) as e:
+            raise ValidationError("radius_km must be float type") from e
+        if radius_km <= 0:
+            raise ValidationError("radius_km must be greater than 0")
+        return radius_km
+
+    def rank_by_distance(
+        self, queryset: QuerySet, query_params: QueryDict
+    ) -> RankedRides:
+        """Rank the rides by distance outside of SQL, past the current list
+        page's cursor. Like `apply_radius_filter`, only the rides within
+        `radius_km` are kept, or the rides in growing rings of grid cells
+        until the page can be filled.
+        """
 
-        return queryset.order_by(sort_key)
+        input_latitude, input_longitude = self.get_input_coordinates(
+            query_params
+        )
+        return rank_by_distance(
+            queryset,
+            input_latitude,
+            input_longitude,
+            radius_km=self.get_radius_km(query_params),
+            rows_needed=self.get_rows_needed(),
+            after=self.get_position(query_params),
+            initial_radius_km=self.NEAREST_RIDES_INITIAL_RADIUS_KM,
+            radius_growth=self.NEAREST_RIDES_RADIUS_GROWTH,
+        )
+
+    def filter_within_radius(
+        self,
+        queryset: QuerySet,
+        input_latitude: float,
+        input_longitude: float,
+        radius_km: float,
+    ) -> QuerySet:
+        """Narrow down to the grid cells around the input coordinates using
+        the index, before the exact distance is checked on what remains.
+        """
+
+        if radius_km >= MAX_DISTANCE_KM:
+            return queryset
+
+        cell_ranges = get_cell_ranges(
+            input_latitude, input_longitude, radius_km
+        )
+        in_nearby_cells = reduce(
+            or_,
+            (
+                Q(pickup_grid_cell__range=cell_range)
+                for cell_range in cell_ranges
+            ),
+        )
+        return queryset.filter(in_nearby_cells, distance__lte=radius_km)
+
+    def apply_sort_key(
+        self, queryset: QuerySet, query_params: QueryDict
+    ) -> QuerySet:
+        """Apply the sort order depending on given `sort_by` parameter"""
+
+        sort_key = self.get_sort_key(query_params)
+        # Break ties on the id, so that the order is stable across pages
+        return queryset.order_by(sort_key, "id")
 
     def apply_prefetch_on_ride_events(self, queryset: QuerySet) -> QuerySet:
         """Prefetch the Ride Events, belonging to the Ride objects, that have
         occurred in the past 24 hours
+
+        These are never older than `RIDE_EVENT_HOT_HOURS`, so they're all in
+        the hot table and the archive is left alone.
         """
 
-        twenty_four__hours_ago = timezone.now() - timedelta(hours=24)
-        ride_events_in_past_24_hrs = RideEvent.objects.filter(
-            created_at__gte=twenty_four__hours_ago
-        ).order_by("created_at")
-        queryset = queryset.prefetch_related(
-            Prefetch(
-                "ride_events",
-                queryset=ride_events_in_past_24_hrs,
-                to_attr="todays_ride_events",
-            )
+        return queryset.prefetch_related(self.get_ride_events_prefetch())
+
+    def get_ride_events_prefetch(self) -> Prefetch:
+        ride_events_in_past_24_hrs = (
+            PrefetchQuerySet(RideEvent)
+            .filter(created_at__gte=get_recent_cutoff())
+            .order_by("created_at")
         )
-        return queryset
+        return Prefetch(
+            "ride_events",
+            queryset=ride_events_in_past_24_hrs,
+            to_attr="todays_ride_events",
+        )
+
+    def prefetch_capped_ride_events(self, rides: list[Ride]):
+        """In single query mode, prefetch today's Ride Events of the rides
+        whose `recent_events` may have been cut short, with one query for all
+        of them. The other rides render theirs from `recent_events`.
+        """
+
+        if not self.is_single_query(self.request.query_params):
+            return
+
+        since = get_recent_cutoff()
+        capped_rides = [
+            ride
+            for ride in rides
+            # Deferred unless today's ride events are rendered
+            if "recent_events" not in ride.get_deferred_fields()
+            and may_be_truncated(ride.recent_events, since)
+        ]
+        if capped_rides:
+            prefetch_related_objects(
+                capped_rides, self.get_ride_events_prefetch()
+            )
 
+    def iter_prefetching_capped_ride_events(
+        self, rides: Iterator[Ride]
+    ) -> Iterator[Ride]:
+        """`prefetch_capped_ride_events` applied to every chunk of rides"""
+        while chunk := list(islice(rides, self.EXPORT_CHUNK_SIZE)):
+            self.prefetch_capped_ride_events(chunk)
+            yield from chunk
 
-class RideEventViewSet(ModelViewSet):
+
+class RideEventViewSet(
+    ReplicaReadsMixin, ConditionalResponseMixin, ModelViewSet
+):
     """API endpoint that allows ride events to be viewed or edited."""
 
     queryset = RideEvent.objects.all().order_by("created_at")
     serializer_class = RideEventSerializer
     permission_classes = [IsAdminUser]
     pagination_class = BasicPagination
+    list_depends_on = detail_depends_on = (RIDE_EVENTS,)
+
+    MAX_BULK_SIZE = 1000
+
+    def get_queryset(self):
+        """Ride events are read from both the hot table and the archive,
+        unless `since` is recent enough for the hot table alone to hold them.
+        """
+
+        queryset = super().get_queryset()
+        if self.action != "list":
+            return queryset
+
+        since = self.get_since(self.request.query_params)
+        if since is not None:
+            queryset = queryset.filter(created_at__gte=since)
+            if since >= self.get_hot_cutoff():
+                return queryset
+
+        archived_queryset = RideEventArchive.objects.all()
+        if since is not None:
+            archived_queryset = archived_queryset.filter(created_at__gte=since)
+
+        return (
+            queryset.order_by()
+            .union(archived_queryset.order_by(), all=True)
+            .order_by("created_at")
+        )
+
+    def get_object(self):
+        """Fall back to the archive for ride events no longer in the hot
+        table
+        """
+
+        try:
+            return super().get_object()
+        except Http404:
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            ride_event = RideEventArchive.objects.filter(
+                pk=self.kwargs[lookup_url_kwarg]
+            ).first()
+            if ride_event is None:
+                raise
+            self.check_object_permissions(self.request, ride_event)
+            return ride_event
+
+    # Every write bumps the generation itself: archived ride events have no
+    # signal receivers, and ride events no delete one, see rideshare.signals
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+            refresh_event_summaries([serializer.instance.ride_id])
+        bump_generations(RIDE_EVENTS)
+
+    def perform_update(self, serializer):
+        # The ride event may move to another ride, both need a refresh
+        ride_ids = [serializer.instance.ride_id]
+        with transaction.atomic():
+            super().perform_update(serializer)
+            refresh_event_summaries([*ride_ids, serializer.instance.ride_id])
+        bump_generations(RIDE_EVENTS)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            super().perform_destroy(instance)
+            refresh_event_summaries([instance.ride_id])
+        bump_generations(RIDE_EVENTS)
+
+    def get_since(self, query_params: QueryDict):
+        """Parse the optional `since` parameter"""
+
+        since = query_params.get("since") or None
+        if since is None:
+            return None
+
+        try:
+            parsed_since = parse_datetime(since)
+        except ValueError:
+            parsed_since = None
+        if parsed_since is None:
+            raise ValidationError("since must be an ISO 8601 datetime")
+
+        if timezone.is_naive(parsed_since):
+            parsed_since = timezone.make_aware(parsed_since)
+        return parsed_since
+
+    def get_hot_cutoff(self):
+        """Ride events created from this time on are all in the hot table"""
+        return timezone.now() - timedelta(hours=settings.RIDE_EVENT_HOT_HOURS)
+
+    def bulk(self, request, *args, **kwargs):
+        """Create or update many ride events in one transaction.
+
+        Items with an `id` update that ride event, the others create one.
+        Invalid items are reported back with their index in the request, and
+        don't keep the valid ones from being written.
+        """
+
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError("Expected a list of ride events")
+        if len(items) > self.MAX_BULK_SIZE:
+            raise ValidationError(
+                f"At most {self.MAX_BULK_SIZE} ride events can be written "
+                "at once"
+            )
+
+        valid_items, errors = self.validate_bulk_items(items)
+
+        # Resolve every ride referenced by the batch in one query
+        ride_ids = {
+            data["ride_id"]
+            for data in valid_items.values()
+            if "ride_id" in data
+        }
+        known_ride_ids = set(
+            Ride.objects.filter(id__in=ride_ids).values_list("id", flat=True)
+        )
+        update_ids = {
+            data["id"] for data in valid_items.values() if "id" in data
+        }
+        ride_events = (
+            RideEvent.objects.in_bulk(update_ids) if update_ids else {}
+        )
+
+        to_create, to_update = [], []
+        previous_ride_ids = set()
+        for index, data in valid_items.items():
+            if "ride_id" in data and data["ride_id"] not in known_ride_ids:
+                errors[index] = {
+                    "ride": [
+                        f'Invalid pk "{data["ride_id"]}" - object does not '
+                        "exist."
+                    ]
+                }
+            elif "id" not in data:
+                to_create.append(RideEvent(**data))
+            elif data["id"] not in ride_events:
+                errors[index] = {"id": ["Ride event does not exist."]}
+            else:
+                ride_event = ride_events[data["id"]]
+                # The ride the ride event may be moved away from
+                previous_ride_ids.add(ride_event.ride_id)
+                for attr, value in data.items():
+                    setattr(ride_event, attr, value)
+                to_update.append(ride_event)
+
+        with transaction.atomic():
+            RideEvent.objects.bulk_create(to_create)
+            RideEvent.objects.bulk_update(
+                to_update, ["ride", "description", "created_at"]
+            )
+            refresh_event_summaries(
+                previous_ride_ids.union(
+                    ride_event.ride_id for ride_event in to_create + to_update
+                )
+            )
+            if to_create or to_update:
+                bump_generations(RIDE_EVENTS)
+
+        if not errors:
+            response_status = (
+                status.HTTP_201_CREATED if to_create else status.HTTP_200_OK
+            )
+        elif to_create or to_update:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        data = {
+            "created": RideEventSerializer(to_create, many=True).data,
+            "updated": RideEventSerializer(to_update, many=True).data,
+            "errors": [
+                {"index": index, "errors": errors[index]}
+                for index in sorted(errors)
+            ],
+        }
+        return Response(data, status=response_status)
+
+    def validate_bulk_items(self, items: list) -> tuple[dict, dict]:
+        """Validate each item on its own, without touching the database.
+
+        Returns the validated data and the errors, both keyed on the index of
+        the item in the request.
+        """
+
+        create_serializer = RideEventBulkItemSerializer()
+        update_serializer = RideEventBulkItemSerializer(partial=True)
+
+        valid_items, errors = {}, {}
+        for index, item in enumerate(items):
+            is_update = isinstance(item, dict) and "id" in item
+            serializer = update_serializer if is_update else create_serializer
+            try:
+                valid_items[index] = serializer.run_validation(item)
+            except ValidationError as exc:
+                errors[index] = exc.detail
+
+        return valid_items, errors
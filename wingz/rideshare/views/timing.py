@@ -0,0 +1,115 @@
+"""For views breaking their response time down in a Server-Timing header"""
+
+import logging
+import time
+
+import orjson
+from django.conf import settings
+from django.db.models import QuerySet
+from rideshare.metrics import current_timings, timed
+
+logger = logging.getLogger(__name__)
+
+# Phases reported, in the order they run. "evaluate" reads the rides of the
+# page, "prefetch" their ride events, which Django does while reading them.
+PHASES = ("queryset", "evaluate", "prefetch", "serialize", "render")
+
+
+class PrefetchQuerySet(QuerySet):
+    """Queryset whose reads are timed as the "prefetch" phase, for the
+    querysets of `Prefetch` objects
+    """
+
+    def _fetch_all(self):
+        with timed("prefetch"):
+            super()._fetch_all()
+
+
+class ServerTimingMixin:
+    """Breaks the response time down into the phases of `PHASES` and the time
+    spent in SQL, and reports them in a `Server-Timing` header, in
+    milliseconds.
+
+    `get_queryset` has to be decorated with `timed("queryset")`, and the
+    querysets prefetched built from `PrefetchQuerySet`. With
+    SERVER_TIMING_LOG_MS set, requests taking at least that long are also
+    logged as one JSON line.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        self.timing_started = time.perf_counter()
+        token = None
+        if settings.SERVER_TIMING_ENABLED and current_timings.get() is None:
+            # Unless the request metrics are already timing this request
+            token = current_timings.set({"active": set()})
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if token is not None:
+                current_timings.reset(token)
+
+    def paginate_queryset(self, queryset):
+        with timed("evaluate"):
+            return super().paginate_queryset(queryset)
+
+    def get_object(self):
+        with timed("evaluate"):
+            return super().get_object()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        timings = current_timings.get()
+        if timings is None or not settings.SERVER_TIMING_ENABLED:
+            return response
+
+        # Rendered here rather than by Django once the view returns, so that
+        # rendering can be timed too. Streamed responses aren't rendered.
+        if hasattr(response, "render") and not response.is_rendered:
+            with timed("render"):
+                response.render()
+
+        durations = self.get_durations(timings)
+        response["Server-Timing"] = ", ".join(
+            (
+                f'sql;desc="{timings.get("queries", 0)} queries";'
+                f"dur={duration}"
+                if phase == "sql"
+                else f"{phase};dur={duration}"
+            )
+            for phase, duration in durations.items()
+        )
+
+        log_ms = settings.SERVER_TIMING_LOG_MS
+        if log_ms is not None and durations["total"] >= log_ms:
+            logger.info(
+                orjson.dumps(
+                    {
+                        "method": request.method,
+                        "path": request.path,
+                        "action": getattr(self, "action", None),
+                        "status": response.status_code,
+                        "queries": timings.get("queries", 0),
+                        "timings_ms": durations,
+                    }
+                ).decode()
+            )
+        return response
+
+    def get_durations(self, timings: dict) -> dict[str, float]:
+        """Milliseconds spent in each phase that ran, in SQL and in total"""
+
+        seconds = {
+            phase: timings[phase] for phase in PHASES if phase in timings
+        }
+        if "evaluate" in seconds:
+            # Without the prefetch it waits for
+            seconds["evaluate"] -= seconds.get("prefetch", 0.0)
+        if "sql" in timings:
+            seconds["sql"] = timings["sql"]
+        seconds["total"] = time.perf_counter() - self.timing_started
+        return {
+            phase: round(elapsed * 1000, 3)
+            for phase, elapsed in seconds.items()
+        }
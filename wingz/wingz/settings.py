@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import json
 from pathlib import Path
 
 from decouple import config
@@ -42,7 +43,6 @@ INSTALLED_APPS = [
     "rest_framework",
     "rest_framework.authtoken",
     "django_extensions",
-    "silk",
 ]
 
 MIDDLEWARE = [
@@ -53,9 +53,37 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "silk.middleware.SilkyMiddleware",
 ]
 
+# In-memory request metrics, served to admins at /metrics/ in the Prometheus
+# text format. Every request is counted and timed, METRICS_SAMPLE_RATE of them
+# (0 to 1) are broken down into SQL and serializer time.
+METRICS_ENABLED = config("METRICS_ENABLED", default=True, cast=bool)
+METRICS_SAMPLE_RATE = config("METRICS_SAMPLE_RATE", default=1.0, cast=float)
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, "rideshare.metrics.MetricsMiddleware")
+
+# The ride API breaks its response time down in a Server-Timing header. Ride
+# requests taking at least SERVER_TIMING_LOG_MS are also logged, with the
+# same breakdown, as one JSON line. Empty to log none.
+SERVER_TIMING_ENABLED = config(
+    "SERVER_TIMING_ENABLED", default=True, cast=bool
+)
+SERVER_TIMING_LOG_MS = config(
+    "SERVER_TIMING_LOG_MS",
+    default="",
+    cast=lambda value: float(value) if value else None,
+)
+
+# Silk profiles every request, writing each one and its queries to the
+# database, too slow to keep on in production. Its middleware is sync only, so
+# under ASGI it also runs every request, async views included, through a
+# thread. Turned off, its app and its pages are left out too.
+SILK_ENABLED = config("SILK_ENABLED", default=True, cast=bool)
+if SILK_ENABLED:
+    INSTALLED_APPS.append("silk")
+    MIDDLEWARE.append("silk.middleware.SilkyMiddleware")
+
 ROOT_URLCONF = "wingz.urls"
 
 TEMPLATES = [
@@ -83,16 +111,136 @@ WSGI_APPLICATION = "wingz.wsgi.application"
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": config("DATABASE_NAME", default=str(BASE_DIR / "db.sqlite3")),
     }
 }
 
+# "production" tunes SQLite for concurrent readers and writers. WAL lets reads
+# carry on during a write, and writers take the lock when their transaction
+# starts, waiting up to the busy timeout for it instead of failing with
+# "database is locked" halfway through. Connections are kept open between
+# requests, and checked before being reused.
+DATABASE_PROFILE = config("DATABASE_PROFILE", default="development")
+if DATABASE_PROFILE == "production":
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": config("SQLITE_MMAP_SIZE", default=268435456, cast=int),
+        # Negative sizes are in KiB, this is 64 MiB
+        "cache_size": config("SQLITE_CACHE_SIZE", default=-65536, cast=int),
+        "busy_timeout": config(
+            "SQLITE_BUSY_TIMEOUT_MS", default=5000, cast=int
+        ),
+        "temp_store": "MEMORY",
+    }
+    DATABASES["default"]["OPTIONS"] = {
+        "init_command": ";".join(
+            f"PRAGMA {name}={value}" for name, value in SQLITE_PRAGMAS.items()
+        ),
+        "transaction_mode": "IMMEDIATE",
+    }
+    DATABASES["default"]["CONN_MAX_AGE"] = config(
+        "CONN_MAX_AGE", default=600, cast=int
+    )
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+# Read replicas, as a JSON list of the settings that differ from "default" for
+# each, e.g. '[{"NAME": "db.replica.sqlite3"}]'. Safe requests to the User,
+# Ride and Ride Event APIs read from them. After a write, the user's reads stay
+# on "default" for DATABASE_REPLICA_STICKY_SECONDS to cover replication lag.
+DATABASE_REPLICAS = config("DATABASE_REPLICAS", default="[]", cast=json.loads)
+DATABASE_REPLICA_ALIASES = []
+for index, replica in enumerate(DATABASE_REPLICAS):
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        **replica,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICA_ALIASES.append(f"replica{index}")
+DATABASE_REPLICA_STICKY_SECONDS = config(
+    "DATABASE_REPLICA_STICKY_SECONDS", default=5, cast=int
+)
+DATABASE_ROUTERS = ["rideshare.routers.ReplicaRouter"]
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "rideshare.authentication.CachedTokenAuthentication",
+    ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "rideshare.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
     ],
+    "DEFAULT_PARSER_CLASSES": [
+        "rideshare.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
+# The Django cache, shared by every process unless it is the default local
+# memory cache, e.g. "django.core.cache.backends.redis.RedisCache" with
+# CACHE_LOCATION="redis://127.0.0.1:6379", or
+# "django.core.cache.backends.db.DatabaseCache" with CACHE_LOCATION set to a
+# table made by `createcachetable`.
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": config("CACHE_LOCATION", default=""),
+    }
 }
 
+# Cache of token key -> (user id, role, is_active) for authentication. The
+# alias of a Django cache, which has to be shared by every process for logouts
+# and role changes to reach them all right away, or "local" for a bounded LRU
+# in each process, only fit for a single process.
+TOKEN_CACHE_BACKEND = config("TOKEN_CACHE_BACKEND", default="default")
+TOKEN_CACHE_TTL = config("TOKEN_CACHE_TTL", default=300, cast=int)
+TOKEN_CACHE_MAX_SIZE = config("TOKEN_CACHE_MAX_SIZE", default=10000, cast=int)
+
+# Cache of ride list pages, invalidated whenever rides, ride events or users
+# are written. The alias of a Django cache shared by every process, as a write
+# only drops the pages cached by the processes sharing it, or empty to turn it
+# off. Coordinates are rounded to this many decimals before building a key (4
+# is about 11 meters).
+RESPONSE_CACHE_BACKEND = config("RESPONSE_CACHE_BACKEND", default="")
+RESPONSE_CACHE_TTL = config("RESPONSE_CACHE_TTL", default=300, cast=int)
+RESPONSE_CACHE_COORDINATE_PRECISION = config(
+    "RESPONSE_CACHE_COORDINATE_PRECISION", default=4, cast=int
+)
+
+# Ride events older than this many hours are moved out of the hot RideEvent
+# table by the `archive_ride_events` command. Never less than 24, the ride
+# list reads today's ride events from the hot table only.
+RIDE_EVENT_HOT_HOURS = config("RIDE_EVENT_HOT_HOURS", default=48, cast=int)
+
+# How the ride list computes distances to sort by them. "sql" annotates them
+# with a Haversine expression, "vectorized" reads the candidates' coordinates
+# and ranks them in Python, with NumPy when it's installed.
+RIDE_DISTANCE_ENGINE = config("RIDE_DISTANCE_ENGINE", default="sql")
+
+# The nearest driver search only considers drivers who reported their location
+# in the last DRIVER_LOCATION_TTL_SECONDS. Each process reads the locations
+# reported through the others at most once every DRIVER_INDEX_SYNC_SECONDS.
+DRIVER_LOCATION_TTL_SECONDS = config(
+    "DRIVER_LOCATION_TTL_SECONDS", default=300, cast=int
+)
+DRIVER_INDEX_SYNC_SECONDS = config(
+    "DRIVER_INDEX_SYNC_SECONDS", default=1.0, cast=float
+)
+
+# Driver location pings are buffered, keeping the latest of each driver, and
+# written every DRIVER_PING_FLUSH_SECONDS (0 writes each batch right away).
+# Batches are turned away while DRIVER_PING_BUFFER_SIZE drivers are waiting.
+DRIVER_PING_FLUSH_SECONDS = config(
+    "DRIVER_PING_FLUSH_SECONDS", default=2.0, cast=float
+)
+DRIVER_PING_BUFFER_SIZE = config(
+    "DRIVER_PING_BUFFER_SIZE", default=50000, cast=int
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators